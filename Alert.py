@@ -4,9 +4,14 @@ from utils import format_time
 class Alert:
     """
     Class that defines Alert objects
+
+    The alerts are compact records (no __dict__), many alerts can be kept
+    in memory or read back from an AlertHistory.
     """
 
-    def __init__(self, start_time, hits, end_time=None):
+    __slots__ = ("start_time", "hits", "end_time", "resolved", "rule", "unit", "id")
+
+    def __init__(self, start_time, hits, end_time=None, rule=None, unit="req/s", id=None):
         """
         Parameters
         ----------
@@ -16,15 +21,25 @@ class Alert:
             Value of the average traffic that first exceeded the threshold
         end_time : float or None
             Date of the end of the alert in seconds (if the alert was resolved)
+        rule : str or None
+            Name of the alert rule that triggered the alert, None for the high traffic alert
+        unit : str
+            Unit of the hits
+        id : int or None
+            Id of the alert in the AlertHistory where it is stored, if any
         """
 
         self.start_time = start_time
         self.hits = hits
-        self.resolved = False
+        self.end_time = end_time
+        self.resolved = end_time is not None
+        self.rule = rule
+        self.unit = unit
+        self.id = id
 
-        if end_time is not None:
-            self.resolved = True
-            self.end_time = end_time
+    def __repr__(self):
+        return f"Alert(start_time={self.start_time}, hits={self.hits:.2f}, end_time={self.end_time}, " \
+               f"rule={self.rule!r})"
 
     def resolve(self, end_time):
         """
@@ -45,7 +60,10 @@ class Alert:
         """
 
         report = ""
-        report += f"- /!\ High traffic generated an alert - hits {self.hits:.2f} req/s, "
+        if self.rule is None:
+            report += f"- /!\ High traffic generated an alert - hits {self.hits:.2f} {self.unit}, "
+        else:
+            report += f"- /!\ Rule {self.rule} generated an alert - hits {self.hits:.2f} {self.unit}, "
         report += f"triggered at time {format_time(self.start_time)}\n"
         if self.resolved:
             report += f"      └─> End of alert, "
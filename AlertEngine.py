@@ -0,0 +1,314 @@
+import json
+from collections import Counter
+
+from AlertHistory import AlertHistory
+from AlertRule import RULE_FIELDS, AlertRule
+from log_analyse_fcts import get_section_from_route
+
+
+# Value of each field of a rule filter from a (section, status, host, method) key
+FIELD_GETTERS = {"section": lambda key: key[0],
+                 "status": lambda key: key[1],
+                 "status_class": lambda key: key[1]//100,
+                 "host": lambda key: key[2],
+                 "method": lambda key: key[3]}
+
+
+def count_requests(logs, sections=None):
+    """
+    Function that counts logs per (section, status, host, method), the keys of the alert rules.
+
+    Parameters
+    ----------
+    logs : list of LogRecord
+        list of log objects
+    sections : dict or None
+        cache of the section of each route, filled in on the fly.
+
+    Returns
+    -------
+    requests : Counter
+        number of requests per key.
+    """
+
+    if sections is None:
+        sections = {}
+
+    requests = Counter()
+    for log in logs:
+        route = log.request.route
+        section = sections.get(route)
+        if section is None:
+            section = sections[route] = get_section_from_route(route)
+        requests[(section, log.status, log.remotehost, log.request.method)] += 1
+    return requests
+
+
+def count_batch_requests(batch, start=0, end=None):
+    """
+    Function that counts the logs of a columnar batch per (section, status, host, method).
+
+    Parameters
+    ----------
+    batch : LogBatch
+        batch of logs
+    start : int
+        index of the first log to count.
+    end : int or None
+        index after the last log to count, default to the end of the batch.
+
+    Returns
+    -------
+    requests : Counter
+        number of requests per key.
+    """
+
+    requests = Counter()
+    for (section, status, host, method), count in Counter(zip(
+            batch.section_ids[start:end], batch.status[start:end],
+            batch.host_ids[start:end], batch.method_ids[start:end])).items():
+        requests[(batch.sections.value(section), status,
+                  batch.hosts.value(host), batch.methods.value(method))] += count
+    return requests
+
+
+def load_rules(path):
+    """
+    Function that loads alert rules from a json config file.
+
+    The file contains a list of rules (or an object with a "rules" list), each
+    rule is an object with the parameters of AlertRule, for example:
+    {"name": "api 5xx", "section": "api", "status_class": "5xx",
+     "metric": "ratio", "threshold": 0.1, "clear_threshold": 0.05, "window": 60}
+
+    Parameters
+    ----------
+    path : str
+        path to the config file.
+
+    Returns
+    -------
+    rules : list of AlertRule
+        the rules of the file.
+
+    Raises
+    ------
+    ValueError
+        if a rule has unknown options or an invalid status, or if two rules have the same name
+        (the state and the alerts of the rules are stored by name).
+    """
+
+    with open(path) as f:
+        config = json.load(f)
+
+    if isinstance(config, dict):
+        config = config.get("rules", [])
+
+    rules = []
+    names = set()
+    for i, options in enumerate(config):
+        unknown = set(options) - set(RULE_FIELDS) - {"name", "threshold", "window", "metric",
+                                                     "clear_threshold"}
+        if unknown:
+            raise ValueError(f"Unknown options in the rule {i} of {path}: {', '.join(sorted(unknown))}")
+        options = dict(options)
+        name = options.pop("name", f"rule_{i}")
+        if name in names:
+            raise ValueError(f"Duplicate name of the rule {name} in {path}")
+        names.add(name)
+
+        # the status of the logs are integers
+        if options.get("status") is not None:
+            try:
+                options["status"] = int(options["status"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid status in the rule {name} of {path}: {options['status']!r}")
+
+        rules.append(AlertRule(name, **options))
+
+    return rules
+
+
+class AlertEngine:
+    """
+    Class that evaluates many alert rules every second.
+
+    The logs of the current second are first counted per distinct
+    (section, status, host, method). At each update, these counts are
+    summed once for each set of filtered fields, then every rule reads its
+    count and updates its window in O(1). So an update costs
+    O(logs + distinct keys * sets of fields + rules).
+    """
+
+    def __init__(self, rules=(), alert_history=None):
+        """
+        Parameters
+        ----------
+        rules : iterable of AlertRule
+            rules to evaluate.
+        alert_history : AlertHistory or None
+            where to record the alerts, default to a new in-memory history.
+        """
+
+        self.rules = list(rules)
+
+        # rules grouped by the fields of their filter
+        self.groups = {}
+        for rule in self.rules:
+            self.groups.setdefault(rule.fields, []).append(rule)
+
+        # number of requests of the current second per (section, status, host, method)
+        self.requests = Counter()
+        self.sections = {}
+
+        # date of the last update
+        self.last_date = None
+
+        # history of the alerts triggered by the rules
+        self.alert_history = alert_history if alert_history is not None else AlertHistory()
+
+    def __len__(self):
+        return len(self.rules)
+
+    @property
+    def max_window(self):
+        """
+        Size of the largest window of the rules in seconds (0 without rules).
+        """
+
+        return max((rule.window for rule in self.rules), default=0)
+
+    def is_idle(self):
+        """
+        Function that tells if the windows of all the rules are empty.
+
+        Returns
+        -------
+        idle : bool
+            True if no rule has a request in its window.
+        """
+
+        return not self.requests and not any(rule.nb_total for rule in self.rules)
+
+    def add_logs(self, logs):
+        """
+        Function that counts logs of the current second.
+
+        Parameters
+        ----------
+        logs : list of LogRecord
+            list of log objects
+        """
+
+        if self.rules:
+            self.requests.update(count_requests(logs, self.sections))
+
+    def add_batch(self, batch, start=0, end=None):
+        """
+        Function that counts the logs of a columnar batch of the current second.
+
+        Parameters
+        ----------
+        batch : LogBatch
+            batch of logs
+        start : int
+            index of the first log to count.
+        end : int or None
+            index after the last log to count, default to the end of the batch.
+        """
+
+        if self.rules:
+            self.requests.update(count_batch_requests(batch, start, end))
+
+    def add_requests(self, requests):
+        """
+        Function that counts requests of the current second already grouped by
+        (section, status, host, method), for example merged from several nodes.
+
+        Parameters
+        ----------
+        requests : Counter
+            number of requests per (section, status, host, method).
+        """
+
+        if self.rules:
+            self.requests.update(requests)
+
+    def update(self, date):
+        """
+        Function that evaluates the rules with the logs of the last second.
+
+        Parameters
+        ----------
+        date : float
+            date of the update in seconds
+
+        Returns
+        -------
+        alerts : list of Alert
+            the alerts that were triggered or resolved by this update.
+        """
+
+        alerts = []
+        nb_total = sum(self.requests.values())
+
+        # some seconds were not evaluated (restart from a checkpoint): they had no request
+        if self.last_date is not None:
+            for _ in range(min(int(date - self.last_date) - 1, self.max_window)):
+                for rule in self.rules:
+                    alert = rule.update(0, 0, date)
+                    if alert is not None:
+                        self.alert_history.record(alert)
+                        alerts.append(alert)
+        self.last_date = date
+
+        for fields, rules in self.groups.items():
+
+            # number of requests for each value of the fields
+            getters = [FIELD_GETTERS[field] for field in fields]
+            counts = Counter()
+            for key, count in self.requests.items():
+                counts[tuple(getter(key) for getter in getters)] += count
+
+            for rule in rules:
+                alert = rule.update(counts.get(rule.key, 0), nb_total, date)
+                if alert is not None:
+                    self.alert_history.record(alert)
+                    alerts.append(alert)
+
+        self.requests.clear()
+
+        # forget the sections of the routes once there are too many
+        if len(self.sections) > 100000:
+            self.sections.clear()
+
+        return alerts
+
+    def get_state(self):
+        """
+        Function that returns the state of the rules, for a checkpoint.
+
+        Returns
+        -------
+        state : dict
+            date of the last update and state of each rule by name (see AlertRule.get_state).
+        """
+
+        return {"last_date": self.last_date, "rules": {rule.name: rule.get_state() for rule in self.rules}}
+
+    def set_state(self, state):
+        """
+        Function that restores the state of the rules from a checkpoint, the rules
+        that are new or whose window changed start with an empty window.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state.
+        """
+
+        self.last_date = state["last_date"]
+        for rule in self.rules:
+            rule_state = state["rules"].get(rule.name)
+            if rule_state is not None and rule_state["window"] == rule.window:
+                rule.set_state(rule_state)
@@ -0,0 +1,238 @@
+import sqlite3
+from collections import deque
+from threading import Lock
+
+from Alert import Alert
+
+
+class AlertHistory:
+    """
+    Class that stores the alerts triggered by the monitors and the alert rules.
+
+    Only the most recent alerts are kept in memory, with their report line,
+    so the memory and the cost of the report are bounded on a long running
+    instance. With a path, all the alerts are also written to a SQLite
+    database (alerts are never deleted, a resolution only sets the end of
+    the alert), which can be queried by time range. The alerts left active
+    by a previous run can never be resolved by the new monitors, so they are
+    closed at the last date of the database when it is opened.
+    """
+
+    def __init__(self, path=None, max_recent=100):
+        """
+        Parameters
+        ----------
+        path : str or None
+            path to the SQLite database of the alerts, None to only keep the recent alerts.
+        max_recent : int
+            maximum number of alerts kept in memory.
+        """
+
+        self.path = path
+        self.max_recent = max_recent
+
+        # most recent alerts and their report lines
+        self.recent = deque(maxlen=max_recent)
+        self.lines = {}
+        self.nb_alerts = 0
+
+        # last report, built again only when an alert changes
+        self.report_cache = None
+
+        # Instanciate Lock object to concurently access to the database.
+        self.lock = Lock()
+
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            with self.connection:
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS alerts (id INTEGER PRIMARY KEY, start_time REAL NOT NULL, "
+                    "end_time REAL, hits REAL NOT NULL, rule TEXT, unit TEXT NOT NULL)")
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS alerts_start_time ON alerts (start_time)")
+
+            # the alerts of the previous runs are part of the history, the active ones are closed
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE alerts SET end_time = (SELECT MAX(COALESCE(end_time, start_time)) FROM alerts) "
+                    "WHERE end_time IS NULL")
+            self.nb_alerts = self.connection.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+            rows = self.connection.execute("SELECT * FROM alerts ORDER BY id DESC LIMIT ?", (max_recent,))
+            for alert in reversed([self.from_row(row) for row in rows]):
+                self.recent.append(alert)
+                self.lines[alert] = alert.report()
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __iter__(self):
+        return iter(self.recent)
+
+    def __getitem__(self, index):
+        return self.recent[index]
+
+    @staticmethod
+    def from_row(row):
+        """
+        Function that creates an alert from a row of the database.
+
+        Parameters
+        ----------
+        row : tuple
+            (id, start_time, end_time, hits, rule, unit)
+
+        Returns
+        -------
+        alert : Alert
+            the alert of the row.
+        """
+
+        alert_id, start_time, end_time, hits, rule, unit = row
+        return Alert(start_time, hits, end_time, rule=rule, unit=unit, id=alert_id)
+
+    def record(self, alert):
+        """
+        Function that stores a new alert, or the resolution of a stored alert.
+
+        Parameters
+        ----------
+        alert : Alert
+            alert triggered or resolved.
+        """
+
+        with self.lock:
+
+            if alert.id is None:
+                # new alert
+                self.nb_alerts += 1
+                if self.connection is not None:
+                    with self.connection:
+                        cursor = self.connection.execute(
+                            "INSERT INTO alerts (start_time, end_time, hits, rule, unit) VALUES (?, ?, ?, ?, ?)",
+                            (alert.start_time, alert.end_time, alert.hits, alert.rule, alert.unit))
+                    alert.id = cursor.lastrowid
+                else:
+                    alert.id = self.nb_alerts
+
+                if len(self.recent) == self.max_recent:
+                    del self.lines[self.recent[0]]
+                self.recent.append(alert)
+
+            elif self.connection is not None:
+                with self.connection:
+                    self.connection.execute("UPDATE alerts SET end_time = ? WHERE id = ?",
+                                            (alert.end_time, alert.id))
+
+            # only the line of the alert changes in the report
+            if alert in self.lines or self.recent[-1] is alert:
+                self.lines[alert] = alert.report()
+                self.report_cache = None
+
+    def query(self, start=None, end=None):
+        """
+        Function that returns the alerts active during a time range.
+
+        Parameters
+        ----------
+        start : float or None
+            first date of the range in seconds, None for no lower bound.
+        end : float or None
+            last date of the range in seconds (excluded), None for no upper bound.
+
+        Returns
+        -------
+        alerts : list of Alert
+            the alerts triggered before the end and not resolved before the start,
+            sorted by date. Without database, only the recent alerts are searched.
+        """
+
+        if start is None:
+            start = float("-inf")
+        if end is None:
+            end = float("inf")
+
+        if self.connection is None:
+            with self.lock:
+                return [alert for alert in self.recent if alert.start_time < end and
+                        (alert.end_time is None or alert.end_time >= start)]
+
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM alerts WHERE start_time < ? AND (end_time IS NULL OR end_time >= ?) "
+                "ORDER BY start_time, id", (end, start)).fetchall()
+
+        return [self.from_row(row) for row in rows]
+
+    def report(self):
+        """
+        Function that reports the recent alerts.
+
+        Returns
+        -------
+        report : string
+            The formatted report, with a description line for each recent alert
+        """
+
+        with self.lock:
+            if self.report_cache is None:
+
+                # custom report if no alert ever triggered
+                if not self.recent:
+                    self.report_cache = "No alert triggered"
+                else:
+                    header = "List of alerts:\n"
+                    if self.nb_alerts > len(self.recent):
+                        header = f"List of alerts (last {len(self.recent)} of {self.nb_alerts}):\n"
+                    self.report_cache = header + "".join(self.lines[alert] for alert in self.recent)
+
+            return self.report_cache
+
+    def get_state(self):
+        """
+        Function that returns the recent alerts, for a checkpoint.
+
+        Returns
+        -------
+        state : dict
+            recent alerts and total number of alerts.
+        """
+
+        with self.lock:
+            return {"recent": list(self.recent), "nb_alerts": self.nb_alerts}
+
+    def set_state(self, state):
+        """
+        Function that restores the recent alerts from a checkpoint. The alerts
+        stored in the database after the checkpoint stay in the database, the
+        alerts active at the checkpoint are active again in the database.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state.
+        """
+
+        with self.lock:
+            self.recent = deque(state["recent"], maxlen=self.max_recent)
+            self.lines = {alert: alert.report() for alert in self.recent}
+            self.nb_alerts = max(self.nb_alerts, state["nb_alerts"])
+            self.report_cache = None
+
+            # the monitors restored from the checkpoint will resolve these alerts
+            if self.connection is not None:
+                with self.connection:
+                    self.connection.executemany("UPDATE alerts SET end_time = NULL WHERE id = ?",
+                                                [(alert.id,) for alert in self.recent if not alert.resolved])
+
+    def close(self):
+        """
+        Function that closes the database, if any.
+        """
+
+        if self.connection is not None:
+            with self.lock:
+                self.connection.close()
+                self.connection = None
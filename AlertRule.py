@@ -0,0 +1,189 @@
+from array import array
+
+from Alert import Alert
+
+
+# Fields of the logs that a rule can filter on
+RULE_FIELDS = ("section", "status", "status_class", "host", "method")
+
+
+class AlertRule:
+    """
+    Class that defines an alert rule on the traffic of the requests matching a filter.
+
+    Every second, the rule is fed with the number of matching requests and
+    the total number of requests of the last second. It keeps them in ring
+    buffers of the size of its window with their running sums, so an
+    evaluation costs O(1) whatever the size of the window.
+
+    The value of the rule is either the average rate of the matching requests
+    (metric "rate", in requests per second) or their share of all the requests
+    (metric "ratio"). An alert is triggered when the value reaches the threshold
+    and resolved when it goes below the clear threshold (hysteresis).
+    """
+
+    def __init__(self, name, threshold, window=120, metric="rate", clear_threshold=None,
+                 section=None, status=None, status_class=None, host=None, method=None):
+        """
+        Parameters
+        ----------
+        name : str
+            name of the rule in the alerts.
+        threshold : float
+            value of the rule that triggers an alert.
+        window : int
+            size of the sliding window in seconds.
+        metric : str
+            "rate" for the average number of matching requests per second,
+            "ratio" for the share of the matching requests among all the requests.
+        clear_threshold : float or None
+            value below which the alert is resolved, default to the threshold.
+        section : str or None
+            section of the matching requests (see get_section_from_route).
+        status : int or None
+            status of the matching requests.
+        status_class : int, str or None
+            class of the status of the matching requests (5 or "5xx").
+        host : str or None
+            remote host of the matching requests.
+        method : str or None
+            method of the matching requests.
+        """
+
+        if metric not in ("rate", "ratio"):
+            raise ValueError(f"Unknown metric: {metric}")
+        if window < 1:
+            raise ValueError("window should be a positive number of seconds")
+        if clear_threshold is None:
+            clear_threshold = threshold
+        if clear_threshold > threshold:
+            raise ValueError("clear_threshold should not be above the threshold")
+
+        if isinstance(status_class, str):
+            status_class = int(status_class.rstrip("xX"))
+
+        self.name = name
+        self.threshold = threshold
+        self.clear_threshold = clear_threshold
+        self.window = int(window)
+        self.metric = metric
+
+        # filter of the rule, the fields are sorted so that the rules
+        # filtering on the same fields share their counts
+        filters = {"section": section, "status": status, "status_class": status_class,
+                   "host": host, "method": method}
+        self.fields = tuple(field for field in RULE_FIELDS if filters[field] is not None)
+        self.key = tuple(filters[field] for field in self.fields)
+
+        # matching and total requests of each second of the window, and their sums
+        self.matching = array("q", bytes(8*self.window))
+        self.totals = array("q", bytes(8*self.window))
+        self.nb_matching = 0
+        self.nb_total = 0
+        self.position = 0
+
+        # alert in progress, if any
+        self.alert = None
+
+    def __repr__(self):
+        filters = ", ".join(f"{field}={value!r}" for field, value in zip(self.fields, self.key))
+        return f"AlertRule({self.name!r}, {self.metric} >= {self.threshold} over {self.window}s, {filters})"
+
+    @property
+    def unit(self):
+        """
+        Unit of the value of the rule.
+        """
+
+        return "req/s" if self.metric == "rate" else "of the requests"
+
+    def value(self):
+        """
+        Function that returns the value of the rule on the current window.
+
+        Returns
+        -------
+        value : float
+            average rate or share of the matching requests.
+        """
+
+        if self.metric == "rate":
+            return self.nb_matching/self.window
+
+        return self.nb_matching/self.nb_total if self.nb_total else 0.
+
+    def update(self, nb_matching, nb_total, date):
+        """
+        Function that adds the requests of the last second to the window
+        and triggers (or resolves) an alert.
+
+        Parameters
+        ----------
+        nb_matching : int
+            number of matching requests during the last second.
+        nb_total : int
+            number of requests during the last second.
+        date : float
+            date of the update in seconds.
+
+        Returns
+        -------
+        alert : Alert or None
+            the alert that was triggered or resolved by this update, if any.
+        """
+
+        # replace the oldest second of the window
+        self.nb_matching += nb_matching - self.matching[self.position]
+        self.nb_total += nb_total - self.totals[self.position]
+        self.matching[self.position] = nb_matching
+        self.totals[self.position] = nb_total
+        self.position = (self.position + 1) % self.window
+
+        value = self.value()
+
+        if self.alert is not None:
+            # resolve alert if the value went below the clear threshold
+            if value < self.clear_threshold:
+                alert, self.alert = self.alert, None
+                alert.resolve(date)
+                return alert
+        elif value >= self.threshold:
+            # trigger and alert if the threshold was reached
+            self.alert = Alert(date, value, rule=self.name, unit=self.unit)
+            return self.alert
+
+        return None
+
+    def get_state(self):
+        """
+        Function that returns the state of the window and of the alert, for a checkpoint.
+
+        Returns
+        -------
+        state : dict
+            window, counts of each second, position in the ring buffers and alert in progress.
+        """
+
+        return {"window": self.window, "matching": self.matching, "totals": self.totals,
+                "nb_matching": self.nb_matching, "nb_total": self.nb_total,
+                "position": self.position, "alert": self.alert}
+
+    def set_state(self, state):
+        """
+        Function that restores the state of the window and of the alert from a checkpoint.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state, for a window of the same size.
+        """
+
+        if state["window"] != self.window:
+            raise ValueError("The window of the rule changed since the checkpoint")
+
+        self.matching = array("q", state["matching"])
+        self.totals = array("q", state["totals"])
+        self.nb_matching = state["nb_matching"]
+        self.nb_total = state["nb_total"]
+        self.position = state["position"]
+        self.alert = state["alert"]
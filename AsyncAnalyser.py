@@ -0,0 +1,479 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from AlertEngine import AlertEngine
+from AlertHistory import AlertHistory
+from log_analyse_fcts import (compute_batch_stats, sections_stats_report, total_traffic_report,
+                              traffic_history_report)
+from log_formats import LOG_FORMATS, get_parser
+from LogBatch import LogBatch
+from TerminalRenderer import TerminalRenderer
+from TrafficMonitor import TrafficMonitor
+from utils import format_time
+
+
+class AsyncAnalyser:
+    """
+    Class that describes an asyncio variant of the analysis pipeline.
+
+    Several log sources (files or streams) run concurrently as coroutines
+    in the same event loop and push columnar batches into a bounded queue.
+    The analyser consumes the queue, counts the traffic every second, computes
+    the stats every 10 seconds, manages the alerts and notifies the renderer.
+
+    Without clock, the time is driven by the logs: the updates run up to the
+    oldest of the latest dates of the open sources, so a replay goes as fast
+    as the sources. With a SimulationClock, the updates follow the clock.
+    """
+
+    def __init__(self, avg_trafic_threshold=10, clock=None, verbose=False, queue_size=64, alert_rules=None,
+                 alert_db=None):
+        """
+        Parameters
+        ----------
+        avg_trafic_threshold : float
+            Average traffic threshold to trigger alerts (in requests per second).
+        clock : SimulationClock or None
+            clock that drives the updates, None to drive them with the log dates.
+        verbose : bool
+            Define the level of detail of the stats, default to False (low level of details)
+        queue_size : int
+            maximum number of batches waiting to be analysed.
+        alert_rules : list of AlertRule or None
+            additional alert rules evaluated every second (see load_rules).
+        alert_db : str or None
+            path to the SQLite database where all the alerts are stored (see AlertHistory),
+            None to only keep the recent alerts in memory.
+        """
+
+        self.clock = clock
+        self.verbose = verbose
+
+        # Queue of (source id, batch), a None batch closes the source
+        self.queue = asyncio.Queue(queue_size)
+
+        # Empty batch sharing the Interner objects of all the sources, the files and the
+        # streams are parsed by a single worker thread so that the interning is never concurrent.
+        self.prototype = LogBatch()
+        self.parser_executor = ThreadPoolExecutor(max_workers=1)
+
+        # Latest log date of each open source (None if no log yet)
+        self.sources = {}
+        self.nb_sources = 0
+
+        # History of all the alerts, only the recent ones are kept in memory
+        self.alert_history = AlertHistory(alert_db)
+
+        # Average traffic on a sliding window of 2 minutes and alerts
+        self.traffic_monitor = TrafficMonitor(avg_trafic_threshold, window_size=120,
+                                              alert_history=self.alert_history)
+
+        # Additional alert rules (per section, status, host...)
+        self.alert_engine = AlertEngine(alert_rules or (), alert_history=self.alert_history)
+
+        # Periods of the updates in seconds and dates of the next updates
+        self.stats_period = 10
+        self.request_period = 1
+        self.next_total_requests_update = None
+        self.next_stats_update = None
+
+        # batches received but not yet counted in the traffic with their read position,
+        # and logs of the current stats window
+        self.pending = []
+        self.window_logs = self.prototype.empty_copy()
+
+        # Variable that contains the reports to show on the console
+        self.sections_stats_report = ""
+        self.avg_total_traffic_report = ""
+        self.alert_report = self.alert_history.report()
+        self.last_update = None
+        self.report_changed = asyncio.Event()
+        self.done = False
+
+    def register_source(self):
+        """
+        Function that declares a new source of logs.
+
+        Returns
+        -------
+        source_id : int
+            id of the source to use with ingest and close_source.
+        """
+
+        source_id = self.nb_sources
+        self.nb_sources += 1
+        self.sources[source_id] = None
+        return source_id
+
+    async def ingest(self, source_id, batch):
+        """
+        Coroutine that pushes a batch of logs into the analyser, it waits
+        if the analyser is late (back-pressure).
+
+        Parameters
+        ----------
+        source_id : int
+            id of the source of the batch.
+        batch : LogBatch
+            logs of the source, built from the prototype of the analyser.
+        """
+
+        if len(batch):
+            await self.queue.put((source_id, batch))
+
+    async def close_source(self, source_id):
+        """
+        Coroutine that declares the end of a source of logs.
+
+        Parameters
+        ----------
+        source_id : int
+            id of the source.
+        """
+
+        await self.queue.put((source_id, None))
+
+    async def read_file(self, src_file, start_date=None, end_date=None, log_format=None):
+        """
+        Coroutine that reads a file of logs as a source. The file is parsed
+        in a worker thread so that the event loop is never blocked.
+
+        Parameters
+        ----------
+        src_file : str
+            path to the file containing the logs.
+        start_date : float or None
+            if given, the logs start from the first log of this date.
+        end_date : float or None
+            if given, the logs stop before the first log of this date.
+        log_format : str or None
+            format of the file (see log_formats), detected from the file if None.
+        """
+
+        source_id = self.register_source()
+        loop = asyncio.get_running_loop()
+
+        batches = get_parser(src_file, log_format, start_date=start_date,
+                             end_date=end_date).read_batches(self.prototype)
+
+        try:
+            while True:
+                batch = await loop.run_in_executor(self.parser_executor, next, batches, None)
+                if batch is None:
+                    break
+                await self.ingest(source_id, batch)
+        finally:
+            await self.close_source(source_id)
+
+    async def read_stream(self, reader, chunk_size=1 << 16, log_format="csv"):
+        """
+        Coroutine that reads lines of logs (without header) from a stream,
+        for example a socket opened with asyncio.open_connection. The lines
+        are parsed in the worker thread of the files.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream of lines of logs.
+        chunk_size : int
+            number of bytes to read at once.
+        log_format : str
+            format of the lines, name of a format of LOG_FORMATS.
+        """
+
+        source_id = self.register_source()
+        loop = asyncio.get_running_loop()
+        parser = LOG_FORMATS[log_format]()
+        schema = parser.get_schema()
+        remainder = b""
+
+        try:
+            while True:
+                chunk = await reader.read(chunk_size)
+                if not chunk:
+                    break
+
+                # only parse complete lines
+                chunk = remainder + chunk
+                last_line_end = chunk.rfind(b"\n") + 1
+                chunk, remainder = chunk[:last_line_end], chunk[last_line_end:]
+
+                if chunk:
+                    batch = await loop.run_in_executor(self.parser_executor, parser.parse_block, chunk.decode(),
+                                                       schema, self.prototype.empty_copy())
+                    await self.ingest(source_id, batch)
+
+            if remainder:
+                batch = await loop.run_in_executor(self.parser_executor, parser.parse_block,
+                                                   remainder.decode() + "\n", schema, self.prototype.empty_copy())
+                await self.ingest(source_id, batch)
+        finally:
+            await self.close_source(source_id)
+
+    async def run(self):
+        """
+        Coroutine that analyses the logs until all the sources are closed.
+
+        Returns
+        -------
+        alert_list : list of Alert
+            The recent alerts triggered during the analysis (see AlertHistory).
+        """
+
+        while True:
+
+            # with a clock, wake up at the next update even without logs
+            timeout = None
+            if self.clock is not None and self.next_total_requests_update is not None:
+                timeout = self.clock.time_until(min(self.next_total_requests_update,
+                                                    self.next_stats_update))
+
+            try:
+                source_id, batch = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                source_id, batch = None, None
+
+            if source_id is not None:
+                if batch is None:
+                    del self.sources[source_id]
+                else:
+                    self.receive(source_id, batch)
+
+            # all the sources are closed: flush the sliding window to close the alerts
+            if not self.sources and self.queue.empty():
+                if self.next_total_requests_update is not None:
+                    self.close_periods(self.next_total_requests_update +
+                                       max(self.traffic_monitor.window_size, self.alert_engine.max_window))
+                break
+
+            if self.next_total_requests_update is not None:
+                self.close_periods(self.now())
+
+        self.done = True
+        self.report_changed.set()
+        self.parser_executor.shutdown(wait=False)
+
+        return list(self.alert_history)
+
+    def receive(self, source_id, batch):
+        """
+        Function that stores a new batch until its logs are counted.
+
+        Parameters
+        ----------
+        source_id : int
+            id of the source of the batch.
+        batch : LogBatch
+            logs of the source.
+        """
+
+        self.pending.append([batch, 0])
+
+        latest = max(batch.dates)
+        if self.sources[source_id] is None or latest > self.sources[source_id]:
+            self.sources[source_id] = latest
+
+        # the first log gives the start date of the analysis
+        if self.next_total_requests_update is None:
+            start_date = batch.dates[0]
+            if self.clock is not None:
+                if not self.clock.is_started():
+                    self.clock.start(start_date)
+                start_date = self.clock.start_date
+            self.next_total_requests_update = start_date + self.request_period
+            self.next_stats_update = start_date + self.stats_period
+
+    def now(self):
+        """
+        Function that returns the date up to which all the logs were received.
+
+        Returns
+        -------
+        date : float
+            the date of the clock, or the oldest latest date of the open sources.
+        """
+
+        if self.clock is not None:
+            return self.clock.now()
+
+        if any(latest is None for latest in self.sources.values()):
+            return float("-inf")
+        return min(self.sources.values())
+
+    def close_periods(self, date):
+        """
+        Function that triggers all the traffic and stats updates that
+        happened before the given date, in chronological order.
+
+        Parameters
+        ----------
+        date : float
+            current date of the analysis in seconds
+        """
+
+        while min(self.next_total_requests_update, self.next_stats_update) <= date:
+
+            # trigger nb request update every 1s
+            if self.next_total_requests_update <= self.next_stats_update:
+                self.traffic_update(self.next_total_requests_update)
+                self.next_total_requests_update += self.request_period
+
+            # trigger stats computation every 10s
+            else:
+                self.stats_update(self.next_stats_update)
+                self.next_stats_update += self.stats_period
+
+            self.report_changed.set()
+
+    def traffic_update(self, date):
+        """
+        Function that counts the logs before the date and updates the average traffic.
+
+        Parameters
+        ----------
+        date : float
+            date of the update
+        """
+
+        nb_logs = 0
+        for entry in self.pending:
+            batch, position = entry
+            end = batch.find_date(date, position)
+            nb_logs += end - position
+            self.window_logs.extend(batch, position, end)
+            self.alert_engine.add_batch(batch, position, end)
+            entry[1] = end
+
+        # forget the batches already counted
+        self.pending = [entry for entry in self.pending if entry[1] < len(entry[0])]
+
+        avg_total_traffic, alert = self.traffic_monitor.update(nb_logs, date)
+        rule_alerts = self.alert_engine.update(date)
+        self.avg_total_traffic_report = total_traffic_report(avg_total_traffic, date)
+        self.last_update = date
+
+        if alert is not None or rule_alerts:
+            self.alert_report = self.alert_history.report()
+
+    def stats_update(self, date):
+        """
+        Function that computes the stats of the logs of the last stats window.
+
+        Parameters
+        ----------
+        date : float
+            date of the update
+        """
+
+        total, stats = compute_batch_stats(self.window_logs)
+        self.window_logs = self.prototype.empty_copy()
+        self.sections_stats_report = sections_stats_report(total, stats, date, verbose=self.verbose)
+        self.last_update = date
+
+    def report(self):
+        """
+        Function that gathers all the reports.
+
+        Returns
+        -------
+        report : string
+            the whole report to show on the console.
+        """
+
+        last_update = format_time(self.last_update) if self.last_update is not None else "-"
+        report = f"HTTP log monitoring console program  (last update: {last_update})\n\n"
+        report += self.sections_stats_report
+        report += "\n"
+        report += self.avg_total_traffic_report
+        report += traffic_history_report(self.traffic_monitor.history_averages())
+        report += "\n"
+        report += self.alert_report
+        return report
+
+    async def render(self, output=None, min_interval=0.5, clear=True):
+        """
+        Coroutine that prints the reports when they change (at most every
+        min_interval seconds) until the end of the analysis.
+
+        Parameters
+        ----------
+        output : file object or None
+            where to print the reports, default to the standard output.
+        min_interval : float
+            minimum time between two refreshes in seconds.
+        clear : bool
+            True to redraw the changed lines of the console at each refresh
+            (see TerminalRenderer), False to print each report after the previous one.
+        """
+
+        if output is None:
+            output = sys.stdout
+        renderer = TerminalRenderer(output) if clear else None
+
+        while True:
+            await self.report_changed.wait()
+            self.report_changed.clear()
+
+            if renderer is not None:
+                renderer.update("report", self.report())
+                renderer.render()
+            else:
+                output.write(self.report() + "\n")
+                output.flush()
+
+            if self.done:
+                break
+
+            await asyncio.sleep(min_interval)
+
+        if renderer is not None:
+            renderer.close()
+
+
+async def analyse_files(src_files, avg_trafic_threshold=10, output=None, clear=True, alert_rules=None,
+                        alert_db=None, start_date=None, end_date=None, log_format=None):
+    """
+    Coroutine that analyses several csv files of logs concurrently
+    and renders the reports.
+
+    Parameters
+    ----------
+    src_files : list of str
+        paths to the csv files containing the logs.
+    avg_trafic_threshold : float
+        Average traffic threshold to trigger alerts (in requests per second).
+    output : file object or None
+        where to print the reports, default to the standard output.
+    clear : bool
+        True to clear the console before each refresh.
+    alert_rules : list of AlertRule or None
+        additional alert rules evaluated every second (see load_rules).
+    alert_db : str or None
+        path to the SQLite database where all the alerts are stored (see AlertHistory).
+    start_date : float or None
+        if given, the logs of each file start from the first log of this date.
+    end_date : float or None
+        if given, the logs of each file stop before the first log of this date.
+    log_format : str or None
+        format of the files (see log_formats), detected from each file if None.
+
+    Returns
+    -------
+    alert_list : list of Alert
+        The recent alerts triggered during the analysis.
+    """
+
+    analyser = AsyncAnalyser(avg_trafic_threshold, alert_rules=alert_rules, alert_db=alert_db)
+    readers = [analyser.read_file(src_file, start_date=start_date, end_date=end_date, log_format=log_format)
+               for src_file in src_files]
+    alert_list, *_ = await asyncio.gather(analyser.run(),
+                                          analyser.render(output, min_interval=0, clear=clear),
+                                          *readers)
+    return alert_list
+
+
+if __name__ == "__main__":
+
+    # Small test
+    asyncio.run(analyse_files(["data/sample_csv.txt"]))
@@ -0,0 +1,334 @@
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+from AlertEngine import AlertEngine
+from AlertHistory import AlertHistory
+from log_analyse_fcts import compute_batch_stats, sections_stats_report
+from log_formats import detect_format, get_parser
+from parallel_stats import compute_parallel_stats
+from StatsPartial import StatsPartial
+from TrafficMonitor import TrafficMonitor
+from utils import get_compression
+
+
+class BatchAnalyser:
+    """
+    Class that describes a headless batch analysis of a log file.
+
+    The whole file is streamed through the same pipeline as the console
+    application (deserialization, stats every 10 seconds, average traffic
+    on a sliding window of 2 minutes and alerts), as fast as the file can
+    be read. The logs are parsed in bulk into columnar batches and only the logs of
+    the current stats window are kept in memory.
+
+    With several workers, the file is split between a pool of processes that
+    compute mergeable partial stats of each stats window (see StatsPartial),
+    then the merged traffic of each second drives the sliding window and the alerts.
+    The workers count each log in the second and the stats window of its date,
+    while a single pass counts it when it is read, like the console: on a file
+    whose dates are only roughly sorted, a log late by a few seconds is counted
+    in the current second. Both give the same report on a sorted file, otherwise
+    the alerts can move by the delay of the late logs.
+    The additional alert rules need the logs of each second, so the analysis
+    is sequential when there are rules. The files of the other formats (see log_formats)
+    and the compressed files are also analysed sequentially.
+    """
+
+    def __init__(self, src_file, avg_trafic_threshold=10, csv_start_date=None, output=None,
+                 csv_end_date=None, nb_workers=1, alert_rules=None,
+                 alert_db=None, log_format=None):
+        """
+        Parameters
+        ----------
+        src_file : string
+            Path to the csv file containing the logs (or to a directory of rotated log files).
+        avg_trafic_threshold : float
+            Average traffic threshold to trigger alerts (in requests per second).
+        csv_start_date : float or None
+            timestamp in seconds from where to start the analysis,
+            default to the date of the first log.
+        output : file object or None
+            Where to write the stats and the alerts, default to the standard output.
+        csv_end_date : float or None
+            timestamp in seconds where to stop the analysis, default to the end of the file.
+        nb_workers : int or None
+            number of processes computing the stats, None for the number of cores.
+        alert_rules : list of AlertRule or None
+            additional alert rules evaluated every second (see load_rules).
+        alert_db : str or None
+            path to the SQLite database where all the alerts are stored (see AlertHistory),
+            None to only keep the recent alerts in memory.
+        log_format : str or None
+            format of the file (see log_formats), detected from the file if None.
+        """
+
+        self.src_file = src_file
+        self.log_format = log_format
+        self.nb_workers = nb_workers
+        self.csv_start_date = csv_start_date
+        self.csv_end_date = csv_end_date
+        self.output = output if output is not None else sys.stdout
+
+        # History of all the alerts, only the recent ones are kept in memory
+        self.alert_history = AlertHistory(alert_db)
+
+        # Average traffic on a sliding window of 2 minutes and alerts
+        self.traffic_monitor = TrafficMonitor(avg_trafic_threshold, window_size=120,
+                                              alert_history=self.alert_history)
+
+        # Additional alert rules (per section, status, host...)
+        self.alert_engine = AlertEngine(alert_rules or (), alert_history=self.alert_history)
+
+        # Periods of the updates in seconds
+        self.stats_period = 10
+        self.request_period = 1
+
+        # Dates of the next updates
+        self.next_total_requests_update = None
+        self.next_stats_update = None
+
+        # number of logs in the current second and logs of the current stats window
+        self.nb_logs = 0
+        self.window_logs = None
+
+        # Variables to measure the throughput, and the decompression of the compressed files
+        self.nb_rows = 0
+        self.duration = 0
+        self.nb_decompressed_bytes = 0
+        self.decompression_throughput = 0.
+
+    def rows_per_second(self):
+        """
+        Function that returns the throughput of the last analysis.
+
+        Returns
+        -------
+        throughput : float
+            Number of logs processed per second.
+        """
+
+        return self.nb_rows/self.duration if self.duration else 0.
+
+    def run(self, verbose=False):
+        """
+        Run the analysis over the whole file.
+
+        Parameters
+        ----------
+        verbose : bool
+            Define the level of detail of the stats, default to False (low level of details)
+
+        Returns
+        -------
+        alert_list : list of Alert
+            The recent alerts triggered during the analysis (see AlertHistory).
+        """
+
+        start_time = time.time()
+
+        # the workers split an uncompressed csv file by ranges of bytes
+        if self.nb_workers != 1 and not self.alert_engine.rules and os.path.isfile(self.src_file) and \
+                get_compression(self.src_file) is None and \
+                (self.log_format or detect_format(self.src_file)) == "csv":
+            self.run_parallel(verbose)
+        else:
+            self.run_sequential(verbose)
+
+        self.duration = time.time() - start_time
+
+        self.output.write(f"Processed {self.nb_rows} logs in {self.duration:.2f}s "
+                          f"({self.rows_per_second():.0f} rows/s)\n")
+        if self.nb_decompressed_bytes:
+            self.output.write(f"Decompressed {self.nb_decompressed_bytes/1e6:.1f} MB "
+                              f"({self.decompression_throughput:.1f} MB/s)\n")
+
+        return list(self.alert_history)
+
+    def run_sequential(self, verbose=False):
+        """
+        Run the analysis in a single pass over the file.
+
+        Parameters
+        ----------
+        verbose : bool
+            Define the level of detail of the stats
+        """
+
+        parser = get_parser(self.src_file, self.log_format, start_date=self.csv_start_date,
+                            end_date=self.csv_end_date)
+
+        for batch in parser:
+
+            if self.window_logs is None:
+                self.window_logs = batch.empty_copy()
+
+            position = 0
+
+            # the parser skips the logs before the start date
+            if self.next_total_requests_update is None and len(batch):
+                self.start(batch.dates[0] if self.csv_start_date is None else self.csv_start_date)
+
+            while position < len(batch):
+
+                # add all the logs before the next update
+                end = batch.find_date(min(self.next_total_requests_update,
+                                          self.next_stats_update), position)
+                self.nb_logs += end - position
+                self.window_logs.extend(batch, position, end)
+                self.alert_engine.add_batch(batch, position, end)
+                self.nb_rows += end - position
+                position = end
+
+                # close all the periods that ended before the next log
+                if position < len(batch):
+                    self.close_periods(batch.dates[position], verbose)
+
+        self.nb_decompressed_bytes = parser.nb_decompressed_bytes
+        self.decompression_throughput = parser.decompression_throughput()
+
+        # flush the last stats and the sliding window to close the alerts
+        if self.next_total_requests_update is not None:
+            self.close_periods(self.next_total_requests_update +
+                               max(self.traffic_monitor.window_size, self.alert_engine.max_window),
+                               verbose)
+
+    def run_parallel(self, verbose=False):
+        """
+        Run the analysis with a pool of processes.
+
+        The updates are the same as in a single pass: the traffic update at the
+        date origin + k counts the logs of the k-th second, and the stats update
+        at the date origin + 10*i reports the logs of the i-th stats window.
+        The logs are counted by date (see the class documentation), the logs
+        dated before the origin are counted in the first second and window.
+
+        Parameters
+        ----------
+        verbose : bool
+            Define the level of detail of the stats
+        """
+
+        # the start of the analysis is the date of the first log
+        batches = iter(get_parser(self.src_file, self.log_format, start_date=self.csv_start_date,
+                                  end_date=self.csv_end_date))
+        first_batch = next(batches, None)
+        batches.close()
+        if first_batch is None or not len(first_batch):
+            return
+        origin = first_batch.dates[0] if self.csv_start_date is None else self.csv_start_date
+
+        partials = compute_parallel_stats(self.src_file, self.nb_workers, origin, self.stats_period,
+                                          self.csv_start_date, self.csv_end_date)
+
+        # number of logs of each second
+        traffic = Counter()
+        for partial in partials.values():
+            self.nb_rows += partial.nb_logs
+            for date, count in partial.traffic.items():
+                traffic[max(math.floor((date - origin)/self.request_period) + 1, 1)] += count
+
+        # replay the updates until the sliding window is empty
+        self.start(origin)
+        end_date = origin + max(traffic)*self.request_period + self.traffic_monitor.window_size
+        nb_traffic_updates = nb_stats_updates = 0
+
+        while min(self.next_total_requests_update, self.next_stats_update) <= end_date:
+
+            if self.next_total_requests_update <= self.next_stats_update:
+                nb_traffic_updates += 1
+                self.update_traffic(traffic[nb_traffic_updates], self.next_total_requests_update)
+                self.next_total_requests_update += self.request_period
+
+            else:
+                total, stats = partials.get(nb_stats_updates, StatsPartial()).to_stats()
+                nb_stats_updates += 1
+                self.output.write(sections_stats_report(total, stats, self.next_stats_update,
+                                                        verbose=verbose))
+                self.next_stats_update += self.stats_period
+
+    def start(self, start_date):
+        """
+        Function that sets the date of the first traffic and stats updates.
+
+        Parameters
+        ----------
+        start_date : float
+            date of the beginning of the analysis in seconds
+        """
+
+        self.next_total_requests_update = start_date + self.request_period
+        self.next_stats_update = start_date + self.stats_period
+
+    def close_periods(self, date, verbose=False):
+        """
+        Function that triggers all the traffic and stats updates that
+        happened before the given date, in chronological order.
+
+        Parameters
+        ----------
+        date : float
+            current date of the analysis in seconds
+        verbose : bool
+            Define the level of detail of the stats
+        """
+
+        while min(self.next_total_requests_update, self.next_stats_update) <= date:
+
+            # trigger nb request update every 1s
+            if self.next_total_requests_update <= self.next_stats_update:
+                self.update_traffic(self.nb_logs, self.next_total_requests_update)
+                self.nb_logs = 0
+                self.next_total_requests_update += self.request_period
+
+            # trigger stats computation every 10s
+            else:
+                self.update_stats(self.window_logs, self.next_stats_update, verbose)
+                self.window_logs = self.window_logs.empty_copy()
+                self.next_stats_update += self.stats_period
+
+    def update_traffic(self, nb_logs, date):
+        """
+        Function that updates the average traffic and reports the alerts if any.
+
+        Parameters
+        ----------
+        nb_logs : int
+            number of logs during the last second
+        date : float
+            date of the update in seconds
+        """
+
+        _, alert = self.traffic_monitor.update(nb_logs, date)
+
+        if alert is not None:
+            self.output.write(alert.report())
+
+        for alert in self.alert_engine.update(date):
+            self.output.write(alert.report())
+
+    def update_stats(self, logs, date, verbose=False):
+        """
+        Function that reports the stats of the logs of the last stats window.
+
+        Parameters
+        ----------
+        logs : LogBatch
+            logs of the last stats window
+        date : float
+            date of the update in seconds
+        verbose : bool
+            Define the level of detail of the stats
+        """
+
+        total, stats = compute_batch_stats(logs)
+        self.output.write(sections_stats_report(total, stats, date, verbose=verbose))
+
+
+if __name__ == "__main__":
+
+    # Small test
+    analyser = BatchAnalyser("data/sample_csv.txt")
+    analyser.run()
@@ -0,0 +1,492 @@
+import csv
+import mmap
+import os
+from array import array
+
+from DecompressionReader import DecompressionReader
+from log_analyse_fcts import get_section_from_route
+from LogBatch import LogBatch
+from LogGenerator import get_log_deserializer
+from LogIndex import LogIndex
+from utils import LOG_HEADER, get_compression
+
+
+def fill_batch(batch, schema, hosts, users, requests, dates, status, nb_bytes):
+    """
+    Function that converts the columns of raw values of a block of logs into a batch.
+
+    The string columns are deserialized once per distinct value, and the
+    numeric columns are converted into typed arrays at once.
+
+    Parameters
+    ----------
+    batch : LogBatch
+        empty batch to fill in.
+    schema : dict
+        function that deserializes a raw value of each label (see Deserializer).
+    hosts, users, requests, dates, status, nb_bytes : sequence
+        raw values of the remotehost, authuser, request, date, status and bytes columns.
+
+    Raises
+    ------
+    ValueError
+        if a value does not follow the schema.
+    """
+
+    host_ids = {host: batch.hosts.intern(schema["remotehost"](host))
+                for host in set(hosts)}
+    user_ids = {user: batch.users.intern(schema["authuser"](user))
+                for user in set(users)}
+    method_ids = {}
+    section_ids = {}
+    for request in set(requests):
+        request_line = schema["request"](request)
+        method_ids[request] = batch.methods.intern(request_line.method)
+        section_ids[request] = batch.sections.intern(get_section_from_route(request_line.route))
+
+    # a value out of the range of its column is not a log
+    try:
+        batch.dates.extend(array("q", map(schema["date"], dates)))
+        batch.status.extend(array("H", map(schema["status"], status)))
+        batch.bytes.extend(array("q", map(schema["bytes"], nb_bytes)))
+    except OverflowError:
+        raise ValueError("Value out of range in the block")
+    batch.method_ids.extend(array("I", map(method_ids.__getitem__, requests)))
+    batch.section_ids.extend(array("I", map(section_ids.__getitem__, requests)))
+    batch.host_ids.extend(array("I", map(host_ids.__getitem__, hosts)))
+    batch.user_ids.extend(array("I", map(user_ids.__getitem__, users)))
+
+
+class BulkParser:
+    """
+    Class that defines a bulk parser of csv files of logs.
+
+    The file is read by large blocks of lines. All the values of a block are split
+    at once, each column is a slice of the split values, and the columns are
+    converted with the schema compiled from the Deserializer of the logs (the
+    string columns are only deserialized once per distinct value).
+    Each block gives a ready-typed LogBatch.
+
+    The blocks that do not follow the schema (separators or escaped quotes inside
+    a value, floats instead of integers...) are parsed line by line with the csv
+    module, the lines that still can not be parsed are skipped.
+
+    The file is memory-mapped, and a time range of logs is read by seeking
+    directly to its first block thanks to the index of the file (see LogIndex).
+    A compressed file (.gz or .zst) is decompressed block by block by a
+    background thread instead (see DecompressionReader).
+
+    The parsers of the other log formats (see log_formats) are subclasses that
+    only change how a block is split into columns and how a line is parsed,
+    the columns are converted into the batch by the same code (see fill_batch).
+    """
+
+    # Name of the format in the registry of the log formats (see log_formats),
+    # and True if the files of the format can be indexed by date (see LogIndex)
+    log_format = "csv"
+    indexed = True
+
+    def __init__(self, src_file=None, block_size=1 << 22, start_date=None, end_date=None):
+        """
+        Parameters
+        ----------
+        src_file : str or None
+            path to the file containing the logs, None to only parse the
+            blocks of lines received from a stream (see parse_block).
+        block_size : int
+            number of bytes to read at once.
+        start_date : float or None
+            if given, the logs start from the first log of this date.
+        end_date : float or None
+            if given, the logs stop before the first log of this date.
+        """
+
+        self.src_file = src_file
+        self.block_size = block_size
+        self.start_date = start_date
+        self.end_date = end_date
+
+        # Deserializer of a single line
+        self.log_deserializer = get_log_deserializer()
+
+        # Variables to measure the parsing
+        self.nb_lines = 0
+        self.nb_slow_blocks = 0
+        self.nb_bad_lines = 0
+
+        # Variables to measure the decompression
+        self.nb_decompressed_bytes = 0
+        self.decompression_time = 0.
+
+    def __iter__(self):
+        return self.read_batches()
+
+    def get_schema(self):
+        """
+        Function that returns the schema of the raw values of the format.
+
+        Returns
+        -------
+        schema : dict
+            compiled schema of the logs (see Deserializer.compile).
+        """
+
+        return self.log_deserializer.compile()
+
+    def read_batches(self, batch=None):
+        """
+        Generator over the batches of logs of the file.
+
+        Parameters
+        ----------
+        batch : LogBatch or None
+            empty batch whose Interner objects are used by all the batches,
+            new Interner objects are created if None.
+
+        Returns
+        -------
+        stream : generator of LogBatch
+            one batch per block of the file.
+        """
+
+        if batch is None:
+            batch = LogBatch()
+
+        schema = self.get_schema()
+        started = self.start_date is None
+
+        for block in self.read_blocks():
+
+            new_batch = self.parse_block(block, schema, batch.empty_copy())
+
+            # skip the logs before the first log of the start date
+            if not started:
+                first = next((i for i, date in enumerate(new_batch.dates)
+                              if date >= self.start_date), len(new_batch))
+                started = first < len(new_batch)
+                new_batch = new_batch.slice(first)
+
+            # stop at the first log of the end date
+            if self.end_date is not None:
+                last = new_batch.find_date(self.end_date)
+                if last < len(new_batch):
+                    if last > 0:
+                        yield new_batch.slice(0, last)
+                    return
+
+            if len(new_batch):
+                yield new_batch
+
+    def read_logs(self):
+        """
+        Generator over the deserialized logs of the file (see Deserializer).
+
+        Returns
+        -------
+        stream : generator of LogRecord
+            the logs of the file, the lines that can not be parsed are skipped.
+        """
+
+        started = self.start_date is None
+
+        for block in self.read_blocks():
+            for line in block.splitlines():
+
+                try:
+                    log = self.parse_line(line)
+                except (ValueError, KeyError):
+                    self.nb_bad_lines += 1
+                    continue
+
+                # skip the logs before the first log of the start date
+                if not started:
+                    if log.date < self.start_date:
+                        continue
+                    started = True
+
+                # stop at the first log of the end date
+                if self.end_date is not None and log.date >= self.end_date:
+                    return
+
+                yield log
+
+    def read_blocks(self):
+        """
+        Generator over the blocks of complete lines of the file.
+
+        Returns
+        -------
+        stream : generator of str
+            the blocks of lines (ending with a new line character) after the header.
+        """
+
+        if get_compression(self.src_file) is not None:
+            with DecompressionReader(self.src_file, chunk_size=self.block_size) as f:
+                try:
+                    self.check_header(f)
+                    yield from self.read_stream_blocks(f)
+                finally:
+                    self.nb_decompressed_bytes += f.nb_bytes
+                    self.decompression_time += f.duration
+            return
+
+        with open(self.src_file, "rb") as f:
+            _, start, end = self.read_header(f)
+            yield from self.read_range_blocks(f, start, end)
+
+    def decompression_throughput(self):
+        """
+        Function that returns the throughput of the decompression of the file.
+
+        Returns
+        -------
+        throughput : float
+            decompressed MB per second of decompression, 0 if the file is not compressed.
+        """
+
+        return self.nb_decompressed_bytes/self.decompression_time/1e6 if self.decompression_time else 0.
+
+    def check_header(self, f):
+        """
+        Function that reads and checks the header of the file.
+
+        Parameters
+        ----------
+        f : file object
+            file opened in binary mode, at its beginning.
+        """
+
+        header = tuple(next(csv.reader([f.readline().decode()], quoting=csv.QUOTE_NONNUMERIC)))
+        assert header == LOG_HEADER
+
+    def read_header(self, f):
+        """
+        Function that checks the header of the file and finds the range of bytes to read.
+
+        Parameters
+        ----------
+        f : file object
+            uncompressed file opened in binary mode, at its beginning.
+
+        Returns
+        -------
+        schema : dict
+            compiled schema of the logs (see Deserializer.compile).
+        start : int
+            offset of the first line to read.
+        end : int
+            offset of the end of the lines to read.
+        """
+
+        # check the header of the file
+        self.check_header(f)
+
+        # find the range of the file to read
+        start, end = f.tell(), os.fstat(f.fileno()).st_size
+        if self.indexed and (self.start_date is not None or self.end_date is not None):
+            index = LogIndex(self.src_file)
+            start = max(start, index.seek(self.start_date))
+            end = index.seek_end(self.end_date)
+
+        return self.get_schema(), start, end
+
+    def read_range(self, f, start, end, schema, batch):
+        """
+        Generator over the batches of logs of a range of bytes of the file.
+
+        Parameters
+        ----------
+        f : file object
+            uncompressed file opened in binary mode.
+        start : int
+            offset of the first line of the range.
+        end : int
+            offset of the end of the range (the end of a line).
+        schema : dict
+            compiled schema of the logs (see Deserializer.compile).
+        batch : LogBatch
+            empty batch whose Interner objects are used by all the batches.
+
+        Returns
+        -------
+        stream : generator of LogBatch
+            one batch per block of the range.
+        """
+
+        for block in self.read_range_blocks(f, start, end):
+            yield self.parse_block(block, schema, batch.empty_copy())
+
+    def read_range_blocks(self, f, start, end):
+        """
+        Generator over the blocks of complete lines of a range of bytes of the file.
+
+        Parameters
+        ----------
+        f : file object
+            uncompressed file opened in binary mode.
+        start : int
+            offset of the first line of the range.
+        end : int
+            offset of the end of the range (the end of a line).
+
+        Returns
+        -------
+        stream : generator of str
+            the blocks of lines (ending with a new line character).
+        """
+
+        if start >= end:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            while start < end:
+
+                # only parse complete lines
+                block_end = min(start + self.block_size, end)
+                if block_end < end:
+                    block_end = data.rfind(b"\n", start, block_end) + 1 or \
+                        data.find(b"\n", block_end) + 1 or end
+                block = data[start:block_end].decode()
+                start = block_end
+
+                if not block.endswith("\n"):
+                    block += "\n"
+
+                yield block
+
+    def read_stream_blocks(self, f):
+        """
+        Generator over the blocks of complete lines of a file object (a decompressed stream).
+
+        Parameters
+        ----------
+        f : file object
+            file opened in binary mode, after the header.
+
+        Returns
+        -------
+        stream : generator of str
+            the blocks of lines (ending with a new line character).
+        """
+
+        remainder = b""
+
+        while True:
+            chunk = f.read(self.block_size)
+            if not chunk:
+                break
+
+            # only parse complete lines
+            chunk = remainder + chunk
+            last_line_end = chunk.rfind(b"\n") + 1
+            chunk, remainder = chunk[:last_line_end], chunk[last_line_end:]
+
+            if chunk:
+                yield chunk.decode()
+
+        if remainder:
+            yield remainder.decode() + "\n"
+
+    def parse_block(self, block, schema, batch):
+        """
+        Function that parses a block of complete lines into a batch.
+
+        Parameters
+        ----------
+        block : str
+            lines of the file (ending with a new line character).
+        schema : dict
+            schema of the raw values of the format (see get_schema).
+        batch : LogBatch
+            empty batch to fill in.
+
+        Returns
+        -------
+        batch : LogBatch
+            the logs of the block.
+        """
+
+        nb_lines = block.count("\n")
+        self.nb_lines += nb_lines
+
+        try:
+            self.parse_columns(block, schema, batch, nb_lines)
+        except (ValueError, KeyError):
+            # some lines do not follow the schema, parse the lines one by one
+            self.nb_slow_blocks += 1
+            batch = batch.empty_copy()
+            for line in block.splitlines():
+                try:
+                    batch.append_log(self.parse_line(line))
+                except (ValueError, KeyError):
+                    self.nb_bad_lines += 1
+
+        return batch
+
+    def parse_line(self, line):
+        """
+        Function that parses a single line with the csv module.
+
+        Parameters
+        ----------
+        line : str
+            line of the file.
+
+        Returns
+        -------
+        log : LogRecord
+            the deserialized log (see Deserializer).
+
+        Raises
+        ------
+        ValueError
+            if the line is not a log.
+        """
+
+        values = next(csv.reader([line], quoting=csv.QUOTE_NONNUMERIC), ())
+        if len(values) != len(LOG_HEADER):
+            raise ValueError("Unexpected number of values in the line")
+
+        return self.log_deserializer(values)
+
+    def parse_columns(self, block, schema, batch, nb_lines):
+        """
+        Function that parses a block of complete lines column by column.
+
+        Parameters
+        ----------
+        block : str
+            lines of the csv file (ending with a new line character).
+        schema : dict
+            compiled schema of the logs (see Deserializer.compile).
+        batch : LogBatch
+            empty batch to fill in.
+        nb_lines : int
+            number of lines of the block.
+
+        Raises
+        ------
+        ValueError
+            if the block does not follow the schema.
+        """
+
+        # split all the values of the block at once
+        nb_columns = len(LOG_HEADER)
+        values = block.replace("\n", ",").split(",")
+        values.pop()
+        if len(values) != nb_lines*nb_columns:
+            raise ValueError("Unexpected number of values in the block")
+
+        def column(label):
+            return values[LOG_HEADER.index(label)::nb_columns]
+
+        fill_batch(batch, schema, column("remotehost"), column("authuser"), column("request"),
+                   column("date"), column("status"), column("bytes"))
+
+
+if __name__ == "__main__":
+
+    # Small test
+    parser = BulkParser("data/sample_csv.txt")
+    print(sum(len(batch) for batch in parser))
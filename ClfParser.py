@@ -0,0 +1,172 @@
+import calendar
+import re
+from functools import lru_cache
+
+from BulkParser import BulkParser, fill_batch
+from Deserializer import Deserializer
+from LogGenerator import get_log_deserializer
+from LogRecord import LogRecord
+from utils import LOG_HEADER
+
+
+# Line of the Common Log Format, with the referer and the user agent of the Combined Log Format:
+# 127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326 "-" "Mozilla/4.08"
+CLF_PATTERN = re.compile(r'^(\S+) (\S+) (\S+) \[([^\]]+)\] "(\S+ \S+ \S+)" (\d{3}) (\d+|-)(?: .*)?$', re.M)
+
+# Number of each month in the dates of the Common Log Format
+CLF_MONTHS = {month: i for i, month in enumerate(("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul",
+                                                  "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_clf_date(value):
+    """
+    Function that converts a date of the Common Log Format into a timestamp.
+    The logs of the same second share their date, so the dates are cached.
+
+    Parameters
+    ----------
+    value : str
+        date like "10/Oct/2000:13:55:36 -0700".
+
+    Returns
+    -------
+    date : int
+        timestamp in seconds.
+    """
+
+    if len(value) != 26 or value[21] not in "+-" or value[3:6] not in CLF_MONTHS:
+        raise ValueError(f"Not a date of the Common Log Format: {value}")
+
+    date = calendar.timegm((int(value[7:11]), CLF_MONTHS[value[3:6]], int(value[0:2]),
+                            int(value[12:14]), int(value[15:17]), int(value[18:20])))
+    offset = int(value[22:24])*3600 + int(value[24:26])*60
+
+    return date - offset if value[21] == "+" else date + offset
+
+
+def parse_clf_bytes(value):
+    """
+    Function that converts the size of a response of the Common Log Format ("-" for no content).
+
+    Parameters
+    ----------
+    value : str
+        size of the response.
+
+    Returns
+    -------
+    nb_bytes : int
+        size of the response in bytes.
+    """
+
+    return 0 if value == "-" else int(value)
+
+
+class ClfParser(BulkParser):
+    """
+    Class that defines a bulk parser of the Common and Combined Log Format
+    of the web servers (Apache, nginx).
+
+    All the lines of a block are matched at once by a regular expression,
+    the groups of the matches give the columns of the block, which are
+    converted into a batch like the csv columns (see fill_batch).
+    """
+
+    log_format = "clf"
+    indexed = False
+
+    def __init__(self, src_file=None, block_size=1 << 22, start_date=None, end_date=None):
+        """
+        Parameters
+        ----------
+        src_file : str or None
+            path to the file containing the logs, None to only parse the
+            blocks of lines received from a stream (see parse_block).
+        block_size : int
+            number of bytes to read at once.
+        start_date : float or None
+            if given, the logs start from the first log of this date.
+        end_date : float or None
+            if given, the logs stop before the first log of this date.
+        """
+
+        BulkParser.__init__(self, src_file, block_size, start_date, end_date)
+
+        # the groups of the lines are in the same order as the csv columns
+        self.log_deserializer = Deserializer(self.get_schema(), LOG_HEADER, record_type=LogRecord)
+
+    def get_schema(self):
+        """
+        Function that returns the schema of the raw values of the format.
+
+        Returns
+        -------
+        schema : dict
+            schema of the Deserializer of the logs, with the dates and sizes of the format.
+        """
+
+        schema = dict(get_log_deserializer().deserialize_dict)
+        schema["date"] = parse_clf_date
+        schema["bytes"] = parse_clf_bytes
+        return schema
+
+    def check_header(self, f):
+        # there is no header in the files of this format
+        pass
+
+    def parse_line(self, line):
+        """
+        Function that parses a single line.
+
+        Parameters
+        ----------
+        line : str
+            line of the file.
+
+        Returns
+        -------
+        log : LogRecord
+            the deserialized log (see Deserializer).
+
+        Raises
+        ------
+        ValueError
+            if the line is not a log.
+        """
+
+        match = CLF_PATTERN.match(line)
+        if match is None:
+            raise ValueError(f"Not a line of the Common Log Format: {line}")
+
+        return self.log_deserializer(match.groups())
+
+    def parse_columns(self, block, schema, batch, nb_lines):
+        """
+        Function that parses a block of complete lines column by column.
+
+        Parameters
+        ----------
+        block : str
+            lines of the file (ending with a new line character).
+        schema : dict
+            schema of the raw values of the format (see get_schema).
+        batch : LogBatch
+            empty batch to fill in.
+        nb_lines : int
+            number of lines of the block.
+
+        Raises
+        ------
+        ValueError
+            if the block does not follow the format.
+        """
+
+        matches = CLF_PATTERN.findall(block)
+        if len(matches) != nb_lines:
+            raise ValueError("Some lines do not follow the Common Log Format")
+        if not matches:
+            return
+
+        hosts, _, users, dates, requests, status, nb_bytes = zip(*matches)
+        fill_batch(batch, schema, hosts, users, requests, dates, status, nb_bytes)
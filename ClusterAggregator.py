@@ -0,0 +1,303 @@
+import asyncio
+import socket
+from collections import Counter
+
+from AsyncAnalyser import AsyncAnalyser
+from log_analyse_fcts import sections_stats_report, total_traffic_report
+from StatsPartial import StatsPartial
+from SummaryExporter import MAX_SUMMARY_SIZE, decode_summary
+
+
+class ClusterAggregator(AsyncAnalyser):
+    """
+    Class that describes the aggregation of the analyses of several nodes
+    (one analyser per web node, see SummaryExporter).
+
+    Each node sends the summary of each of its traffic updates over a TCP
+    connection. The summaries of the same second are merged, and the second
+    is analysed like the logs of a single node (same sliding window, alert
+    rules and stats, see AsyncAnalyser) once all the connected nodes sent
+    it. A node that is late (or stuck) only delays the analysis by max_lag
+    seconds: the seconds more than max_lag seconds before the most recent
+    summary are analysed without waiting, and the summaries that arrive after
+    their second was analysed are counted in the next second.
+    """
+
+    def __init__(self, avg_trafic_threshold=10, host="127.0.0.1", port=7070, max_lag=5, nb_nodes=None,
+                 verbose=False, queue_size=1024, alert_rules=None, alert_db=None):
+        """
+        Parameters
+        ----------
+        avg_trafic_threshold : float
+            Average traffic threshold to trigger alerts (in requests per second).
+        host : str
+            address to listen on.
+        port : int
+            port to listen on, 0 for a free port.
+        max_lag : float
+            maximum delay of the analysis behind the most recent summary in seconds.
+        nb_nodes : int or None
+            if given, the analysis starts once this number of nodes is connected,
+            and stops once they are all disconnected. Otherwise it runs until it is stopped.
+        verbose : bool
+            Define the level of detail of the stats, default to False (low level of details)
+        queue_size : int
+            maximum number of summaries waiting to be merged.
+        alert_rules : list of AlertRule or None
+            additional alert rules evaluated every second (see load_rules).
+        alert_db : str or None
+            path to the SQLite database where all the alerts are stored (see AlertHistory),
+            None to only keep the recent alerts in memory.
+        """
+
+        AsyncAnalyser.__init__(self, avg_trafic_threshold, verbose=verbose, queue_size=queue_size,
+                               alert_rules=alert_rules, alert_db=alert_db)
+
+        self.max_lag = max_lag
+        self.nb_nodes = nb_nodes
+
+        # the socket is bound now, so the port is known (and taken) before the aggregation starts
+        self.socket = socket.create_server((host, port))
+
+        # merged summaries of each second not yet analysed: number of requests
+        # per key of the alert rules and partial stats, and partial stats of the stats window
+        self.ticks = {}
+        self.window = StatsPartial()
+
+        # Name of each connected node, number of requests analysed, counters of the summaries
+        # and number of connections closed on an invalid frame
+        self.nodes = {}
+        self.nb_requests = 0
+        self.nb_summaries = 0
+        self.nb_late_summaries = 0
+        self.nb_invalid_frames = 0
+        self.stop_event = asyncio.Event()
+
+    @property
+    def port(self):
+        return self.socket.getsockname()[1]
+
+    async def serve(self, output=None, clear=True, render=True):
+        """
+        Coroutine that receives the summaries of the nodes and analyses them
+        until the end of the aggregation (see nb_nodes and stop).
+
+        Parameters
+        ----------
+        output : file object or None
+            where to print the reports, default to the standard output.
+        clear : bool
+            True to redraw the changed lines of the console at each refresh.
+        render : bool
+            False to analyse without printing the reports.
+
+        Returns
+        -------
+        alert_list : list of Alert
+            The recent alerts triggered during the aggregation (see AlertHistory).
+        """
+
+        server = await asyncio.start_server(self.read_node, sock=self.socket)
+
+        try:
+            if render:
+                alert_list, _ = await asyncio.gather(self.run(), self.render(output, clear=clear))
+            else:
+                alert_list = await self.run()
+        finally:
+            server.close()
+
+        return alert_list
+
+    def stop(self):
+        """
+        Function that stops the aggregation, from the event loop of the aggregation.
+        """
+
+        self.stop_event.set()
+        self.queue.put_nowait((None, None))
+
+    async def read_node(self, reader, writer):
+        """
+        Coroutine that reads the summaries sent by a node as a source of the analysis.
+
+        Parameters
+        ----------
+        reader : asyncio.StreamReader
+            stream of the summaries (see encode_summary).
+        writer : asyncio.StreamWriter
+            other end of the connection.
+        """
+
+        source_id = self.register_source()
+
+        try:
+            while True:
+                size = int.from_bytes(await reader.readexactly(4), "big")
+                if size > MAX_SUMMARY_SIZE:
+                    raise ValueError("The summary is too large")
+                summary = decode_summary(await reader.readexactly(size))
+                if summary is not None:
+                    await self.queue.put((source_id, summary))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # the node does not send summaries, it is disconnected
+            self.nb_invalid_frames += 1
+        finally:
+            writer.close()
+            await self.close_source(source_id)
+
+    async def run(self):
+        """
+        Coroutine that analyses the summaries until the end of the aggregation.
+
+        Returns
+        -------
+        alert_list : list of Alert
+            The recent alerts triggered during the aggregation (see AlertHistory).
+        """
+
+        while not self.stop_event.is_set():
+
+            source_id, summary = await self.queue.get()
+            if source_id is None:
+                continue
+
+            if summary is None:
+                del self.sources[source_id]
+                self.nodes.pop(source_id, None)
+            else:
+                self.receive(source_id, summary)
+
+            # wait for the first summary, and for all the expected nodes
+            if self.next_total_requests_update is None or \
+                    (self.nb_nodes is not None and self.nb_sources < self.nb_nodes):
+                pass
+
+            # all the nodes are disconnected: the last seconds they sent are complete
+            elif not self.sources and self.queue.empty():
+                last_date = max(self.ticks, default=self.next_total_requests_update - 1)
+
+                # end of the aggregation: flush the sliding window to close the alerts
+                if self.nb_nodes is not None:
+                    self.close_periods(last_date + max(self.traffic_monitor.window_size,
+                                                       self.alert_engine.max_window))
+                    break
+                self.close_periods(last_date)
+            else:
+                self.close_periods(self.now())
+
+            self.report_changed.set()
+
+        self.done = True
+        self.report_changed.set()
+        self.parser_executor.shutdown(wait=False)
+
+        return list(self.alert_history)
+
+    def receive(self, source_id, summary):
+        """
+        Function that merges the summary of a second sent by a node.
+
+        Parameters
+        ----------
+        source_id : int
+            id of the connection of the node.
+        summary : dict
+            summary of a traffic update of the node (see SummaryExporter.summarize).
+        """
+
+        self.nb_summaries += 1
+        self.nodes[source_id] = summary["node"]
+
+        date = summary["date"]
+        if self.sources[source_id] is None or date > self.sources[source_id]:
+            self.sources[source_id] = date
+
+        # the first summary gives the start date of the analysis
+        if self.next_total_requests_update is None:
+            self.next_total_requests_update = date
+            self.next_stats_update = date - self.request_period + self.stats_period
+
+        # the second was already analysed, count the summary in the next one
+        if date < self.next_total_requests_update:
+            self.nb_late_summaries += 1
+            date = self.next_total_requests_update
+
+        tick = self.ticks.get(date)
+        if tick is None:
+            tick = self.ticks[date] = (Counter(), StatsPartial())
+        tick[0].update(summary["requests"])
+        tick[1].merge(summary["partial"])
+
+    def now(self):
+        """
+        Function that returns the date up to which the seconds can be analysed.
+
+        Returns
+        -------
+        date : float
+            the oldest date sent by the connected nodes, at most max_lag seconds
+            before the most recent one.
+        """
+
+        # the nodes connected but without summary yet are waited for too
+        dates = [date for date in self.sources.values() if date is not None]
+        if not dates:
+            return float("-inf")
+        oldest = min(dates) if len(dates) == len(self.sources) else float("-inf")
+        return max(oldest, max(dates) - self.max_lag)
+
+    def traffic_update(self, date):
+        """
+        Function that analyses the merged summaries of a second and updates the average traffic.
+
+        Parameters
+        ----------
+        date : float
+            date of the update
+        """
+
+        requests, partial = self.ticks.pop(date, (Counter(), StatsPartial()))
+        self.window.merge(partial)
+        self.alert_engine.add_requests(requests)
+        self.nb_requests += partial.nb_logs
+
+        avg_total_traffic, alert = self.traffic_monitor.update(partial.nb_logs, date)
+        rule_alerts = self.alert_engine.update(date)
+        self.avg_total_traffic_report = total_traffic_report(avg_total_traffic, date)
+        self.last_update = date
+
+        if alert is not None or rule_alerts:
+            self.alert_report = self.alert_history.report()
+
+    def stats_update(self, date):
+        """
+        Function that computes the stats of the merged summaries of the last stats window.
+
+        Parameters
+        ----------
+        date : float
+            date of the update
+        """
+
+        total, stats = self.window.to_stats()
+        self.window = StatsPartial()
+        self.sections_stats_report = sections_stats_report(total, stats, date, verbose=self.verbose)
+        self.last_update = date
+
+    def report(self):
+        """
+        Function that gathers all the reports, with the state of the nodes.
+
+        Returns
+        -------
+        report : string
+            the whole report to show on the console.
+        """
+
+        nodes = ", ".join(sorted(set(self.nodes.values()))) or "-"
+        return AsyncAnalyser.report(self) + \
+            f"\nNodes: {len(self.sources)} connected ({nodes}), {self.nb_summaries} summaries " \
+            f"({self.nb_late_summaries} late, {self.nb_invalid_frames} invalid)\n"
@@ -2,11 +2,23 @@
 import os
 import time
 from collections import deque
-from threading import Lock, Thread
+from threading import Event, Thread
 
-from Alert import Alert
-from log_analyse_fcts import compute_stats
+from AlertEngine import AlertEngine
+from AlertHistory import AlertHistory
+from checkpoint import load_checkpoint, save_checkpoint
+from log_analyse_fcts import (merge_sketches, sections_stats_report, total_traffic_report, traffic_curve_report,
+                              traffic_history_report)
 from LogGenerator import LogGenerator
+from LogListener import LogListener
+from LogTailer import LogTailer
+from MetricsServer import MetricsServer
+from Scheduler import Scheduler
+from SimulationClock import SimulationClock
+from SummaryExporter import SummaryExporter
+from TerminalRenderer import TerminalRenderer
+from TopSections import TopSections
+from TrafficMonitor import TrafficMonitor
 from utils import format_time
 
 
@@ -15,32 +27,140 @@ class ConsoleApp:
     Class that describes a console application for our project.
     """
 
-    def __init__(self, src_file, avg_trafic_threshold=10, csv_start_date=1549573860):
+    def __init__(self, src_file, avg_trafic_threshold=10, csv_start_date=1549573860, speed=1.,
+                 follow=False, top_k_mode="exact", sketch_capacity=1000, sketch_epsilon=0.001, sketch_delta=0.01,
+                 alert_rules=None, alert_db=None, checkpoint=None, checkpoint_interval=10, metrics_port=None,
+                 console=True, log_format=None, listen_port=None, listen_host="127.0.0.1", export_address=None,
+                 node_name=None):
         """
         Parameters
         ----------
-        src_file : string
-            Path to the csv file containing the logs.
+        src_file : string or None
+            Path to the csv file containing the logs (not used when listening to the network).
         avg_trafic_threshold : int 
             Average traffic threshold to trigger alerts (in requests per second).
             If the average traffic on a slidding window of 2 minutes is above this
             threshold, an alert is triggered.
+        csv_start_date : float
+            timestamp in seconds from where to start the log replay.
+        speed : float or None
+            Speed factor of the replay compared to the real time.
+            If None, the logs are replayed as fast as possible.
+        follow : bool
+            True to follow a log file that the web server is appending to
+            (see LogTailer), the new logs are analysed in real time.
+        top_k_mode : str
+            "exact" to count all the sections, "sketch" to count the top sections
+            with a bounded memory (see TopSections).
+        sketch_capacity : int
+            maximum number of sections counted in the sketch mode.
+        sketch_epsilon : float
+            relative error of the Count-Min sketch in the sketch mode.
+        sketch_delta : float
+            probability that the Count-Min sketch is above its error bound.
+        alert_rules : list of AlertRule or None
+            additional alert rules evaluated every second (see load_rules).
+        alert_db : str or None
+            path to the SQLite database where all the alerts are stored (see AlertHistory),
+            None to only keep the recent alerts in memory.
+        checkpoint : str or None
+            path to the checkpoint file of the analysis. If it exists, the analysis resumes
+            from it, then the state of the analysis is saved in it periodically and at the end.
+        checkpoint_interval : float
+            real time between two checkpoints in seconds.
+        metrics_port : int or None
+            port of the local HTTP endpoint serving the metrics of the analysis
+            (see MetricsServer), None for no endpoint.
+        console : bool
+            False to run without printing the reports (headless, with the metrics endpoint).
+        log_format : str or None
+            format of the replayed file (see log_formats), detected from the file if None.
+            When listening, format of the lines of the syslog messages (default to "clf").
+        listen_port : int or None
+            if given, the logs are not read from a file but received in syslog messages on
+            this UDP and TCP port (see LogListener), and analysed in real time.
+        listen_host : str
+            address to listen on.
+        export_address : str or None
+            "host:port" of an aggregator of several nodes (see ClusterAggregator), the summary
+            of each traffic update is sent to it (see SummaryExporter). None to not export.
+        node_name : str or None
+            name of this node for the aggregator, default to the host name.
         """
 
         # Threshold on the average traffic
         self.avg_trafic_threshold = avg_trafic_threshold
 
-        # Log generator object
-        self.stream = LogGenerator(src_file, csv_start_date=csv_start_date)
+        # Clock shared by all the components of the simulation
+        self.listen = listen_port is not None
+        self.clock = SimulationClock(1. if follow or self.listen else speed)
+
+        # State of a previous analysis of the same file (or address) to resume from, if any
+        self.src_file = f"syslog://{listen_host}:{listen_port}" if self.listen else os.path.abspath(src_file)
+        self.follow = follow
+        self.checkpoint_path = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.next_checkpoint_time = time.time() + checkpoint_interval
+        state = load_checkpoint(checkpoint) if checkpoint is not None else None
+        if state is not None and (state["src_file"], state["follow"]) != (self.src_file, follow):
+            state = None
+
+        # Log generator object, log tailer for a live log file, or log listener for the logs
+        # shipped over the network. When resuming, the generator starts at the date of the
+        # last traffic update and the tailer at the first line that was not received.
+        if self.listen:
+            self.stream = LogListener(listen_host, listen_port, listen_port, log_format or "clf",
+                                      clock=self.clock)
+        elif follow:
+            self.stream = LogTailer(src_file, clock=self.clock,
+                                    start_position=state["line_position"] if state else None)
+        else:
+            self.stream = LogGenerator(src_file, csv_start_date=state["date"] if state else csv_start_date,
+                                       clock=self.clock, log_format=log_format)
+
+        # position of the tailer after the logs received, to resume from a checkpoint
+        self.stream_position = None
+
+        # counts of the requests of each section during the current stats window
+        self.top_sections = TopSections(top_k_mode, nb_sections=3, capacity=sketch_capacity,
+                                        epsilon=sketch_epsilon, delta=sketch_delta)
+
+        # logs received but not yet counted in the traffic (from the position),
+        # the listener publishes typed batches instead of dictionaries
+        self.pending_logs = self.stream.prototype.empty_copy() if self.listen else []
+        self.pending_position = 0
+
+        # Periods of the updates in seconds
+        self.stats_period = 10
+        self.request_period = 1
+
+        # stats of the sections of the stats windows of the last 2 minutes,
+        # their sketches are merged to get the stats over 2 minutes
+        self.last_windows_stats = deque(maxlen=120//self.stats_period)
+
+        # Scheduler of the updates, driven by the simulation clock,
+        # and date of the next stats update
+        self.scheduler = Scheduler(self.clock)
+        self.next_stats_date = None
+
+        # History of all the alerts, only the recent ones are kept in memory
+        self.alert_history = AlertHistory(alert_db)
 
-        # buffer that contains the logs not already processed
-        self.buffer = []
+        # Average traffic on a sliding window of 2 minutes and alerts
+        self.traffic_monitor = TrafficMonitor(avg_trafic_threshold, window_size=120,
+                                              alert_history=self.alert_history)
 
-        # variable that stores the total number of requests
-        # on a sliding window of 2 minutes.
-        self.total_traffic_120 = 0
-        # we store the number of requests of each second in a fixed sized queue.
-        self.sliding_requests_number = deque([], 120)
+        # Additional alert rules (per section, status, host...)
+        self.alert_engine = AlertEngine(alert_rules or (), alert_history=self.alert_history)
+
+        # Number of requests counted since the start of the analysis
+        self.nb_requests = 0
+
+        # Exporter of the summaries of the traffic updates to the aggregator of the nodes
+        self.exporter = SummaryExporter(export_address, node_name) if export_address is not None else None
+
+        # Endpoint serving the metrics published at each update
+        self.metrics = MetricsServer(port=metrics_port) if metrics_port is not None else None
 
         # Variable that contains the reports to show on the console
         self.sections_stats_report = ""
@@ -48,24 +168,31 @@ class ConsoleApp:
         self.alert_report = ""
 
         # We define a thread to update the screen of the console app
+        # when the reports change, at most every refresh_interval seconds,
+        # on the output (default to the standard output)
+        self.output = None
+        self.refresh_interval = 0.1
+        self.console = console
         self.print_thread = Thread(target=self.print_reports)
         self.run_printing = True
+        self.report_changed = Event()
+        self.stop_printing = Event()
 
         # We define a thread to retrive the new logs and process them
         self.updater_thread = Thread(target=self.updater)
-        self.run_updater = True
 
-        # Variables for alerts
-        self.alert = False
-        self.alert_start_time = 0
-        self.alert_list = []
+        if state is not None:
+            self.set_state(state)
 
     def start(self):
         """
         Function to start all the threads
         """
 
-        self.print_thread.start()
+        if self.metrics is not None:
+            self.metrics.start()
+        if self.console:
+            self.print_thread.start()
         self.updater_thread.start()
         self.stream.start()
 
@@ -76,83 +203,191 @@ class ConsoleApp:
 
         self.stream.stop()
         self.run_printing = False
-        self.run_updater = False
-        self.print_thread.join()
+        self.stop_printing.set()
+        self.report_changed.set()
+        if self.console:
+            self.print_thread.join()
         self.updater_thread.join()
         self.stream.join()
+        if self.exporter is not None:
+            self.exporter.close()
+        if self.metrics is not None:
+            self.metrics.stop()
+
+        # save the state at the last update to resume from it
+        if self.checkpoint_path is not None and self.traffic_monitor.last_date is not None:
+            self.save_checkpoint(self.traffic_monitor.last_date)
 
     def updater(self):
         """
         Function that triggers update events in the right time
-        and retrieves logs from buffer.
-        """
-
-        stats_period = 10  # seconds
-        request_period = 1  # second
+        and retrieves logs from the channel.
 
-        next_total_requests_update = time.time()-request_period
-        next_stats_update = time.time()-stats_period
+        The updates are scheduled in simulated time, the thread sleeps
+        until the next update is due.
+        """
 
-        nb_logs = 0
+        # wait for the simulation to start
+        if not self.clock.wait_until(float("-inf")):
+            return
 
-        while self.run_updater:
+        # the stats windows of a resumed replay keep their dates
+        start_date = self.clock.start_date
+        if self.next_stats_date is None:
+            self.next_stats_date = start_date + self.stats_period
+        self.scheduler.schedule(start_date + self.request_period, self.traffic_update)
+        self.scheduler.schedule(self.next_stats_date, self.stats_update)
 
-            # get new logs
-            new_logs = self.stream.empty_buffer()
-            nb_logs += len(new_logs)
+        self.scheduler.run()
 
-            # store logs in buffer
-            self.buffer.extend(new_logs)
+    def replay_over(self):
+        """
+        Function that tells if a virtual replay is over: there are no more logs
+        and the sliding window is empty, so the updates can stop.
 
-            # trigger nb request update every 1s
-            if time.time() - next_total_requests_update >= request_period:
+        Returns
+        -------
+        over : bool
+            True if there is nothing left to update.
+        """
 
-                # update avg traffic value
-                self.update_total_request_report(nb_logs)
+        # the logs still in the channel were not even received by the updates
+        return self.clock.is_virtual() and self.clock.is_finished() and not len(self.stream.channel) and \
+            self.pending_position == len(self.pending_logs) and not self.top_sections.total and \
+            self.traffic_monitor.total_traffic == 0 and self.alert_engine.is_idle()
 
-                # reset nb_logs
-                nb_logs = 0
+    def traffic_update(self, date):
+        """
+        Function called every second to count the new logs and update the average traffic.
 
-                # mark the update date
-                next_total_requests_update += request_period
+        Parameters
+        ----------
+        date : float
+            simulated date of the update
+        """
 
-            # trigger stats computation every 10s
-            if time.time() - next_stats_update >= stats_period:
+        # get new logs, all the logs older than the date were already published
+        if self.follow:
+            batches, self.stream_position = self.stream.drain()
+        else:
+            batches = self.stream.channel.drain()
+        for batch in batches:
+            self.pending_logs.extend(batch)
+
+        # take the logs older than the update date
+        start = end = self.pending_position
+        if self.listen:
+            dates = self.pending_logs.dates
+            while end < len(dates) and dates[end] < date:
+                end += 1
+        else:
+            while end < len(self.pending_logs) and \
+                    self.pending_logs[end].date < date:
+                end += 1
+        nb_logs = end - start
+
+        # count the logs in the stats of the sections and in the alert rules
+        if self.listen:
+            self.top_sections.add_batch(self.pending_logs, start, end)
+            self.alert_engine.add_batch(self.pending_logs, start, end)
+            logs = self.pending_logs.slice(start, end) if self.exporter is not None else None
+        else:
+            logs = self.pending_logs[start:end]
+            self.top_sections.add_logs(logs)
+            self.alert_engine.add_logs(logs)
+        self.pending_position = end
+
+        # send the summary of the update to the aggregator, a replay waits for it
+        if self.exporter is not None:
+            self.exporter.export(date, logs, block=self.clock.is_virtual())
+
+        # forget the logs already counted once they are the majority of the list
+        if 2*end > len(self.pending_logs):
+            if self.listen:
+                self.pending_logs = self.pending_logs.slice(end)
+            else:
+                del self.pending_logs[:end]
+            self.pending_position = 0
+
+        # update avg traffic value
+        self.update_total_request_report(nb_logs, date)
+        self.report_changed.set()
+
+        # save the state periodically
+        if self.checkpoint_path is not None and time.time() >= self.next_checkpoint_time:
+            self.save_checkpoint(date)
+
+        # schedule the next update
+        if not self.replay_over():
+            self.scheduler.schedule(date + self.request_period, self.traffic_update)
+
+    def stats_update(self, date):
+        """
+        Function called every 10 seconds to update the stats of the sections.
 
-                # update the sections' report
-                self.update_sections_stats_report()
+        Parameters
+        ----------
+        date : float
+            simulated date of the update
+        """
 
-                # mark the update date
-                next_stats_update += stats_period
+        # update the sections' report
+        self.update_sections_stats_report(date=date)
+        self.report_changed.set()
 
-            time.sleep(0.1)
+        # schedule the next update
+        self.next_stats_date = date + self.stats_period
+        if not self.replay_over():
+            self.scheduler.schedule(self.next_stats_date, self.stats_update)
 
     def print_reports(self):
         """
-        Function that updates the console with the reports every 0.5 seconds
+        Function that updates the console with the reports when they change
+        (at most every refresh_interval seconds). Only the lines of the screen
+        that changed are redrawn (see TerminalRenderer).
         """
 
         self.update_alert_report()
 
+        renderer = TerminalRenderer(self.output)
+        curve_date = None
+
         while self.run_printing:
 
-            # prepare report
-            total_update = f" (last update: {format_time(time.time()+self.stream.get_offset_ms())})"
-            report = f"HTTP log monitoring console program {total_update}\n\n"
-            report += self.sections_stats_report
-            report += "\n"
-            report += self.avg_total_traffic_report
-            report += "\n"
-            report += self.alert_report
+            # wait for new reports
+            self.report_changed.wait()
+            self.report_changed.clear()
+            if not self.run_printing:
+                break
+
+            # prepare report, the sections that did not change are not split again
+            total_update = f" (last update: {format_time(self.clock.now())})"
+            if self.listen:
+                total_update += f" (received lines: {self.stream.nb_received}, " \
+                                f"invalid: {self.stream.nb_invalid_lines})"
+            if self.stream.channel.nb_dropped:
+                total_update += f" (dropped logs: {self.stream.channel.nb_dropped})"
+            renderer.update("header", f"HTTP log monitoring console program {total_update}\n\n")
+            renderer.update("stats", self.sections_stats_report + "\n")
+
+            # the averages and the curve of the history only change with the traffic
+            if self.traffic_monitor.last_date != curve_date:
+                curve_date = self.traffic_monitor.last_date
+                renderer.update("traffic", self.avg_total_traffic_report +
+                                traffic_history_report(self.traffic_monitor.history_averages()) + "\n")
+                renderer.update("curve", traffic_curve_report(self.traffic_monitor.history_curve(),
+                                                              self.avg_trafic_threshold) + "\n")
+            renderer.update("alerts", self.alert_report)
 
             # print report
-            os.system('clear')
-            print(report)
+            renderer.render()
+
+            # wait some time before the next refresh (or the stop)
+            self.stop_printing.wait(self.refresh_interval)
 
-            # wait some time
-            time.sleep(0.5)
+        renderer.close()
 
-    def update_total_request_report(self, nb_logs):
+    def update_total_request_report(self, nb_logs, date=None):
         """
         Function that computes the report for the average total traffic.
         The function manage also alerts if any.
@@ -161,41 +396,41 @@ class ConsoleApp:
         ----------
         nb_logs : int
             number of new logs that appeared since last update
+        date : float or None
+            simulated date of the update, default to the current date of the clock
         """
 
-        # update the total traffic using a fixed size queue
-        if len(self.sliding_requests_number) == 120:
-            self.total_traffic_120 -= self.sliding_requests_number.popleft()
-        self.sliding_requests_number.append(nb_logs)
-        self.total_traffic_120 += nb_logs
+        if date is None:
+            date = self.clock.now()
 
-        # compute the average traffic
-        avg_total_traffic = self.total_traffic_120/120
+        # update the sliding window and the alerts
+        avg_total_traffic, alert = self.traffic_monitor.update(nb_logs, date)
+        rule_alerts = self.alert_engine.update(date)
+
+        self.nb_requests += nb_logs
 
         # create report and update traffic report
-        report = f"Average total taffic: {avg_total_traffic:.2f} req/s over 2min-sliding window"
-        if True:
-            report += f" (last update: {format_time(time.time()+self.stream.get_offset_ms())})"
-        report += "\n"
-        self.avg_total_traffic_report = report
-
-        # Handle alerts
-        if self.alert:
-            # resolve alert if the condition is satisfied
-            if avg_total_traffic < self.avg_trafic_threshold:
-                self.alert = False
-                alert_time = time.time() + self.stream.get_offset_ms()
-                self.alert_list[-1].resolve(alert_time)
-                self.update_alert_report()
-        else:
-            # trigger and alert if the threshold was exceeded
-            if avg_total_traffic >= self.avg_trafic_threshold:
-                self.alert = True
-                alert_time = time.time() + self.stream.get_offset_ms()
-                self.alert_list.append(Alert(alert_time, avg_total_traffic))
-                self.update_alert_report()
-
-    def update_sections_stats_report(self, verbose=False):
+        self.avg_total_traffic_report = total_traffic_report(avg_total_traffic, date)
+
+        # update the alert report if an alert was triggered or resolved
+        if alert is not None or rule_alerts:
+            self.update_alert_report()
+
+        # publish the counters of the update
+        if self.metrics is not None:
+            self.metrics.publish(
+                traffic={"date": date, "requests_total": self.nb_requests, "average": avg_total_traffic,
+                         "threshold": self.avg_trafic_threshold, "dropped_logs": self.stream.channel.nb_dropped},
+                rules={rule.name: {"value": rule.value(), "threshold": rule.threshold,
+                                   "alert": rule.alert is not None} for rule in self.alert_engine.rules},
+                alerts={"traffic_alert": self.traffic_monitor.alert is not None,
+                        "total": self.alert_history.nb_alerts})
+            if self.listen:
+                self.metrics.publish(ingestion={"received": self.stream.nb_received,
+                                                "parsed": self.stream.nb_parsed,
+                                                "invalid": self.stream.nb_invalid_lines})
+
+    def update_sections_stats_report(self, verbose=False, date=None):
         """
         Function that updates the report that deals with statistics
         every 10 seconds and about each sections.
@@ -204,64 +439,119 @@ class ConsoleApp:
         ----------
         verbose : bool
             Define the level of detail of the stats, default to False (low level of details)
+        date : float or None
+            simulated date of the update, default to the current date of the clock
         """
 
-        # compute stats
-        total, stats = compute_stats(self.buffer)
+        if date is None:
+            date = self.clock.now()
 
-        self.buffer = []
+        # get the stats of the top sections
+        total, stats = self.top_sections.result()
 
-        # sort sections by number of requests
-        infos = sorted(((stats[st]["nb_requests"], st, stats[st])
-                        for st in stats), reverse=True)
+        # distinct hosts and users and response sizes of the top sections over 2 minutes
+        self.last_windows_stats.append(self.top_sections.stats)
+        window_stats = merge_sketches(self.last_windows_stats, stats)
 
-        # create a report
-        report = f"Top {3} websites:"
-        if True:
-            report += f" (last update: {format_time(time.time()+self.stream.get_offset_ms())})"
-        report += "\n"
+        self.top_sections.reset()
 
-        nb_requests = 0
+        # finally update the section report
+        self.sections_stats_report = sections_stats_report(
+            total, stats, date, verbose=verbose, window_stats=window_stats,
+            period=self.stats_period, window_period=self.stats_period*len(self.last_windows_stats))
+
+        # publish the stats of the top sections, and the averages of the history
+        # (they change slowly, so they are only computed every stats window)
+        if self.metrics is not None:
+            self.metrics.publish(
+                sections={section: {"requests": section_stats["nb_requests"],
+                                    "distinct_hosts": section_stats["distinct_hosts"].count(),
+                                    "status": dict(section_stats["count_status"]),
+                                    "response_bytes": {str(q): section_stats["response_bytes"].quantile(q)
+                                                       for q in (0.5, 0.95, 0.99)}
+                                    if section_stats["response_bytes"].count else {}}
+                          for section, section_stats in stats.items()},
+                history=self.traffic_monitor.history_averages())
+
+    def get_state(self, date):
+        """
+        Function that returns the state of the analysis after a traffic update.
 
-        # for each section, format stats and append it to the report
-        for i, (count_req, section, section_stats) in enumerate(infos):
+        Parameters
+        ----------
+        date : float
+            date of the last traffic update, all the logs before it were counted.
+
+        Returns
+        -------
+        state : dict
+            position in the logs, stats of the current and of the last stats windows,
+            sliding window, alert rules, recent alerts and reports.
+        """
 
-            nb_requests = section_stats["nb_requests"]
-            ratio_requests = nb_requests/total if total else 0
-            nb_post = section_stats["count_methods"]["POST"]
-            nb_get = section_stats["count_methods"]["GET"]
-            nb_404 = section_stats["count_status"]["404"]
-            nb_500 = section_stats["count_status"]["500"]
+        return {"src_file": self.src_file, "follow": self.follow, "date": date,
+                "next_stats_date": self.next_stats_date,
+                # a replay resumes at the date, a followed file at the first line not received
+                "line_position": self.stream_position,
+                "pending_logs": self.pending_logs[self.pending_position:] if self.follow else [],
+                "top_sections": self.top_sections,
+                "last_windows_stats": list(self.last_windows_stats),
+                "traffic_monitor": self.traffic_monitor.get_state(),
+                "alert_engine": self.alert_engine.get_state(),
+                "alert_history": self.alert_history.get_state(),
+                "nb_requests": self.nb_requests,
+                "reports": (self.sections_stats_report, self.avg_total_traffic_report)}
+
+    def set_state(self, state):
+        """
+        Function that restores the state of the analysis from a checkpoint.
 
-            report += f"{i+1}: Section {section}: \t traffic: {100*ratio_requests:.1f}%"
-            report += f", requests: {nb_requests}"
-            if verbose:
-                report += f" (GET:{nb_get}, POST:{nb_post})"
-                report += f", errors: {nb_404+nb_500} (404: {nb_404}, 500: {nb_500})"
-            report += "\n"
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state.
+        """
 
-        # finally update the section report
-        self.sections_stats_report = report
+        # the stats of another top-k mode are not used
+        if (state["top_sections"].mode, state["top_sections"].nb_sections) == \
+                (self.top_sections.mode, self.top_sections.nb_sections):
+            self.top_sections = state["top_sections"]
+            self.last_windows_stats.extend(state["last_windows_stats"])
 
-    def update_alert_report(self):
-        """
-        Function that update the alert report
+        # the alerts in progress are shared by the monitors and the history
+        self.alert_history.set_state(state["alert_history"])
+        self.traffic_monitor.set_state(state["traffic_monitor"])
+        self.alert_engine.set_state(state["alert_engine"])
+        self.update_alert_report()
+
+        if not self.listen:
+            self.pending_logs = list(state["pending_logs"])
+        self.nb_requests = state.get("nb_requests", 0)
+        self.sections_stats_report, self.avg_total_traffic_report = state["reports"]
+
+        # the updates of a followed file (or of the network) restart with the real time
+        if not (self.follow or self.listen):
+            self.next_stats_date = state["next_stats_date"]
+
+    def save_checkpoint(self, date):
         """
+        Function that saves the state of the analysis in the checkpoint file.
 
-        # custom report if no alert ever triggered
-        if not self.alert_list:
-            self.alert_report = "No alert triggered"
-            return
+        Parameters
+        ----------
+        date : float
+            date of the last traffic update.
+        """
 
-        # create the report
-        report = "List of alerts:\n"
+        save_checkpoint(self.checkpoint_path, self.get_state(date))
+        self.next_checkpoint_time = time.time() + self.checkpoint_interval
 
-        # add a description line for each alert
-        for alert in self.alert_list:
-            report += alert.report()
+    def update_alert_report(self):
+        """
+        Function that update the alert report
+        """
 
-        # finally update the alert report
-        self.alert_report = report
+        self.alert_report = self.alert_history.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,113 @@
+import math
+from array import array
+
+from HyperLogLog import hash_value
+
+
+class CountMinSketch:
+    """
+    Class that defines a Count-Min sketch of the counts of the keys of a stream.
+
+    The counts are stored in depth rows of width counters, each row uses its
+    own hash function. The estimated count of a key is the minimum of its
+    counters: it is never below the true count, and with a probability of
+    1 - delta it overestimates it by at most epsilon*total.
+    The memory does not depend on the number of distinct keys.
+    The hash functions do not depend on the process, so a sketch can be
+    saved in a checkpoint and used again after a restart.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        """
+        Parameters
+        ----------
+        epsilon : float
+            relative error of the estimates (compared to the total count).
+        delta : float
+            probability that an estimate is above the error bound.
+        """
+
+        if not (0 < epsilon < 1 and 0 < delta < 1):
+            raise ValueError("epsilon and delta should be between 0 and 1")
+
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e/epsilon)
+        self.depth = math.ceil(math.log(1/delta))
+
+        # one row of counters per hash function
+        self.rows = [array("q", bytes(8*self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def indexes(self, key):
+        """
+        Function that returns the counter of a key in each row.
+
+        Parameters
+        ----------
+        key : str
+            key to hash.
+
+        Returns
+        -------
+        indexes : list of int
+            index of the counter of the key in each row.
+        """
+
+        # the hash functions of the rows are combinations of two 32 bits hashes
+        key_hash = hash_value(str(key))
+        first, second = key_hash & 0xFFFFFFFF, key_hash >> 32
+        return [(first + i*second) % self.width for i in range(self.depth)]
+
+    def add(self, key, count=1):
+        """
+        Function that counts a key.
+
+        Parameters
+        ----------
+        key : str
+            key to count.
+        count : int
+            number of occurrences of the key.
+
+        Returns
+        -------
+        estimate : int
+            the new estimated count of the key.
+        """
+
+        self.total += count
+        estimate = None
+
+        for row, index in zip(self.rows, self.indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+
+        return estimate
+
+    def estimate(self, key):
+        """
+        Function that returns the estimated count of a key.
+
+        Parameters
+        ----------
+        key : str
+            key to look up.
+
+        Returns
+        -------
+        estimate : int
+            estimated count, never below the true count.
+        """
+
+        return min(row[index] for row, index in zip(self.rows, self.indexes(key)))
+
+    def reset(self):
+        """
+        Function that sets all the counts to 0.
+        """
+
+        for row in self.rows:
+            row[:] = array("q", bytes(8*self.width))
+        self.total = 0
@@ -0,0 +1,204 @@
+import math
+
+
+class DDSketch:
+    """
+    Class that defines a DDSketch of the distribution of positive values.
+
+    The values are counted in buckets whose bounds grow geometrically, so
+    any quantile is estimated with a relative error of at most relative_accuracy.
+    The number of buckets is bounded: when there are too many buckets, the
+    lowest buckets are collapsed (only the lowest quantiles lose accuracy).
+    Two sketches are merged by adding the counts of their buckets.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=512):
+        """
+        Parameters
+        ----------
+        relative_accuracy : float
+            maximum relative error of the quantiles (between 0 and 1).
+        max_buckets : int
+            maximum number of buckets (memory budget).
+        """
+
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy should be between 0 and 1")
+
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self.inv_log_gamma = 1/math.log(self.gamma)
+
+        # count of the values of each bucket, and of the values <= 0
+        self.buckets = {}
+        self.zero_count = 0
+
+        # number and sum of the values
+        self.count = 0
+        self.sum = 0
+
+    def __eq__(self, other):
+        return isinstance(other, DDSketch) and self.buckets == other.buckets and \
+            self.zero_count == other.zero_count and self.sum == other.sum
+
+    def __repr__(self):
+        return f"DDSketch(count={self.count}, sum={self.sum})"
+
+    def add(self, value, count=1):
+        """
+        Function that adds a value to the sketch.
+
+        Parameters
+        ----------
+        value : float
+            value to add.
+        count : int
+            number of occurrences of the value.
+        """
+
+        self.count += count
+        self.sum += value*count
+
+        if value <= 0:
+            self.zero_count += count
+            return
+
+        index = math.ceil(math.log(value)*self.inv_log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+
+    def collapse(self):
+        """
+        Function that merges the lowest buckets to respect the memory budget.
+        """
+
+        indexes = sorted(self.buckets)
+        nb_extra = len(indexes) - self.max_buckets + 1
+        lowest = indexes[nb_extra]
+        for index in indexes[:nb_extra]:
+            self.buckets[lowest] += self.buckets.pop(index)
+
+    def merge(self, other):
+        """
+        Function that adds the values of another sketch.
+
+        Parameters
+        ----------
+        other : DDSketch
+            sketch with the same relative accuracy.
+
+        Returns
+        -------
+        sketch : DDSketch
+            the sketch itself.
+        """
+
+        if other.gamma != self.gamma:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
+
+        return self
+
+    def copy(self):
+        """
+        Function that returns a copy of the sketch.
+
+        Returns
+        -------
+        sketch : DDSketch
+            the copy.
+        """
+
+        sketch = DDSketch(self.relative_accuracy, self.max_buckets)
+        sketch.merge(self)
+        return sketch
+
+    def quantile(self, q):
+        """
+        Function that estimates a quantile of the values.
+
+        Parameters
+        ----------
+        q : float
+            quantile between 0 and 1 (0.5 for the median).
+
+        Returns
+        -------
+        value : float
+            estimated quantile, None if the sketch is empty.
+        """
+
+        if not self.count:
+            return None
+
+        rank = q*(self.count - 1)
+
+        if rank < self.zero_count:
+            return 0.
+
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                break
+
+        # middle of the bucket, in relative terms
+        return 2*self.gamma**index/(self.gamma + 1)
+
+    def get_state(self):
+        """
+        Function that returns the buckets of the sketch as plain data
+        (to send the sketch to another process, see encode_summary).
+
+        Returns
+        -------
+        state : dict
+            relative accuracy, buckets (as [index, count] pairs), count of the
+            values <= 0, number and sum of the values.
+        """
+
+        return {"relative_accuracy": self.relative_accuracy, "buckets": list(self.buckets.items()),
+                "zero_count": self.zero_count, "count": self.count, "sum": self.sum}
+
+    def set_state(self, state):
+        """
+        Function that restores the buckets of the sketch.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state, for a sketch of the same accuracy.
+
+        Raises
+        ------
+        ValueError
+            if the state is not the state of a sketch of this accuracy.
+        """
+
+        if state["relative_accuracy"] != self.relative_accuracy:
+            raise ValueError("Only the buckets of a sketch with the same accuracy can be restored")
+
+        buckets = {int(index): int(count) for index, count in state["buckets"]}
+        counts = (int(state["zero_count"]), int(state["count"]))
+        if min(buckets.values(), default=0) < 0 or min(counts) < 0:
+            raise ValueError("The counts of a sketch can not be negative")
+        if not isinstance(state["sum"], (int, float)):
+            raise ValueError("The sum of a sketch should be a number")
+
+        self.buckets = buckets
+        self.zero_count, self.count = counts
+        self.sum = state["sum"]
+
+        if len(self.buckets) > self.max_buckets:
+            self.collapse()
@@ -0,0 +1,211 @@
+import gzip
+import time
+from queue import Empty, Full, Queue
+from threading import Thread
+
+from utils import get_compression, zstandard
+
+
+class DecompressionReader:
+    """
+    Class that defines a file object reading a compressed log file,
+    decompressed by a background thread.
+
+    The thread decompresses large chunks of the file ahead of the reader and
+    queues them (at most nb_chunks chunks), so the parsing of a chunk overlaps
+    the decompression of the next ones: zlib and zstd release the GIL while
+    they decompress. The decompressed bytes and the time spent decompressing
+    them give the throughput of the decompression.
+    """
+
+    def __init__(self, path, chunk_size=1 << 22, nb_chunks=4):
+        """
+        Parameters
+        ----------
+        path : str
+            path to the compressed file (.gz or .zst).
+        chunk_size : int
+            number of decompressed bytes read at once (and size of the read buffer of the file).
+        nb_chunks : int
+            maximum number of chunks decompressed ahead of the reader.
+        """
+
+        compression = get_compression(path)
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("The zstandard package is needed to read the .zst files")
+        if compression is None:
+            raise ValueError(f"Not a compressed file: {path}")
+
+        self.path = path
+        self.chunk_size = chunk_size
+
+        # compressed file, read with a large buffer, and its decompressed stream
+        self.raw = open(path, "rb", buffering=chunk_size)
+        if compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=self.raw)
+        else:
+            self.stream = zstandard.ZstdDecompressor().stream_reader(
+                self.raw, read_size=chunk_size, read_across_frames=True, closefd=False)
+
+        # chunks decompressed ahead, an empty chunk marks the end of the file
+        self.chunks = Queue(maxsize=nb_chunks)
+        self.buffer = b""
+        self.eof = False
+        self.closed = False
+        self.error = None
+
+        # Variables to measure the decompression
+        self.nb_bytes = 0
+        self.nb_compressed_bytes = 0
+        self.duration = 0.
+
+        self.thread = Thread(target=self.decompress, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def decompress(self):
+        """
+        Function run by the background thread, that decompresses the file chunk by chunk.
+        """
+
+        try:
+            while not self.closed:
+                start = time.perf_counter()
+                chunk = self.stream.read(self.chunk_size)
+                self.duration += time.perf_counter() - start
+                self.nb_bytes += len(chunk)
+                self.nb_compressed_bytes = self.raw.tell()
+
+                self.put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:
+            # the error (corrupted or truncated file) is raised by the reader
+            # after the chunks already decompressed
+            self.error = error
+            self.put(b"")
+
+    def put(self, chunk):
+        """
+        Function that queues a decompressed chunk, unless the reader is closed.
+
+        Parameters
+        ----------
+        chunk : bytes
+            decompressed chunk.
+        """
+
+        while not self.closed:
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def next_chunk(self):
+        """
+        Function that returns the next decompressed chunk.
+
+        Returns
+        -------
+        chunk : bytes
+            the chunk, empty at the end of the file.
+        """
+
+        if self.eof:
+            return b""
+
+        chunk = self.chunks.get()
+        if not chunk:
+            self.eof = True
+            if self.error is not None:
+                raise self.error
+
+        return chunk
+
+    def read(self, size=-1):
+        """
+        Function that reads decompressed bytes.
+
+        Parameters
+        ----------
+        size : int
+            maximum number of bytes to read, -1 to read until the end of the file.
+
+        Returns
+        -------
+        data : bytes
+            at most size bytes (at most one chunk), empty at the end of the file.
+        """
+
+        if size < 0:
+            data = [self.buffer]
+            self.buffer = b""
+            for chunk in iter(self.next_chunk, b""):
+                data.append(chunk)
+            return b"".join(data)
+
+        if not self.buffer:
+            self.buffer = self.next_chunk()
+
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self):
+        """
+        Function that reads a decompressed line.
+
+        Returns
+        -------
+        line : bytes
+            the next line with its new line character, empty at the end of the file.
+        """
+
+        while b"\n" not in self.buffer:
+            chunk = self.next_chunk()
+            if not chunk:
+                line, self.buffer = self.buffer, b""
+                return line
+            self.buffer += chunk
+
+        line_end = self.buffer.index(b"\n") + 1
+        line, self.buffer = self.buffer[:line_end], self.buffer[line_end:]
+        return line
+
+    def throughput(self):
+        """
+        Function that returns the throughput of the decompression.
+
+        Returns
+        -------
+        throughput : float
+            decompressed MB per second of decompression.
+        """
+
+        return self.nb_bytes/self.duration/1e6 if self.duration else 0.
+
+    def close(self):
+        """
+        Function that stops the decompression and closes the file.
+        """
+
+        if self.closed:
+            return
+
+        self.closed = True
+
+        # unblock the thread if it waits for space in the queue
+        try:
+            while True:
+                self.chunks.get_nowait()
+        except Empty:
+            pass
+        self.thread.join()
+
+        self.stream.close()
+        self.raw.close()
@@ -1,3 +1,24 @@
+from functools import lru_cache
+
+
+def unquote(value):
+    """
+    Function that removes the quotes of a raw csv string value.
+
+    Parameters
+    ----------
+    value : str
+        quoted string, as written in the csv file.
+
+    Returns
+    -------
+    value : str
+        the string without its quotes.
+    """
+
+    if len(value) < 2 or value[0] != '"' or value[-1] != '"' or '"' in value[1:-1]:
+        raise ValueError(f"Not a quoted csv value: {value}")
+    return value[1:-1]
 
 
 class Deserializer:
@@ -6,10 +27,12 @@ class Deserializer:
     Defines a process to transform a string (or a list of stings) into a dictionary.
 
     The string contains elements separated by a separator character, each of these elements
-    are casted to the right type and stored in a dictionary.
+    are casted to the right type and stored in a dictionary (or passed by label to the
+    constructor of a record type, see LogRecord).
     """
 
-    def __init__(self, deserialize_dict, default_header, split=False, default_sep=","):
+    def __init__(self, deserialize_dict, default_header, split=False, default_sep=",",
+                 record_type=None, cache_size=0):
         """
         Parameters
         ----------
@@ -21,12 +44,23 @@ class Deserializer:
                 True if the input is a list of string (the input string is already splitted).
             default_sep : str
                 If split is False, default_sep is the default separator to use to split the input string.
+            record_type : type or None
+                class of the deserialized objects, created with the labels as keyword arguments,
+                None for dictionaries.
+            cache_size : int
+                if not 0, the deserialized objects of the last cache_size input strings are
+                cached and shared (the record type should be immutable).
         """
 
         self.default_header = tuple(default_header)
         self.deserialize_dict = deserialize_dict
         self.default_sep = default_sep
         self.split = split
+        self.record_type = record_type
+
+        # the same values are repeated in the logs (like the request lines), they are only deserialized once
+        if cache_size:
+            self.deserialize = lru_cache(maxsize=cache_size)(self.deserialize)
 
     def __call__(self, line):
         """
@@ -51,9 +85,14 @@ class Deserializer:
 
         Returns
         -------
-        output : dict
+        output : dict or record_type
             dictionary object that has for keys the elements of the header and
             for value the deserialized value of the input string.
+
+        Raises
+        ------
+        ValueError
+            if the line misses values of the record type.
         """
 
         if sep is None:
@@ -68,4 +107,40 @@ class Deserializer:
             else:
                 line = line.split(self.default_sep)
 
-        return {key: self.deserialize_dict[key](val) for key, val in zip(header, line)}
+        output = {key: self.deserialize_dict[key](val) for key, val in zip(header, line)}
+        if self.record_type is None:
+            return output
+
+        # a line with missing values is not a record
+        try:
+            return self.record_type(**output)
+        except TypeError:
+            raise ValueError(f"Missing values in the line: {line}")
+
+    def compile(self):
+        """
+        Function that compiles the deserializer into a schema that deserializes
+        raw csv values (quoted strings and unquoted numbers) without going
+        through the csv module.
+
+        Returns
+        -------
+        schema : dict
+            dictionary object that maps each label of the header to a function
+            that deserializes a raw csv value of this label.
+        """
+
+        schema = {}
+
+        for key in self.default_header:
+            deserializer = self.deserialize_dict[key]
+
+            if deserializer is str:
+                schema[key] = unquote
+            elif isinstance(deserializer, Deserializer):
+                # nested deserializers parse the content of a quoted string
+                schema[key] = lambda value, deserializer=deserializer: deserializer(unquote(value))
+            else:
+                schema[key] = deserializer
+
+        return schema
@@ -0,0 +1,175 @@
+import math
+from hashlib import blake2b
+
+
+def hash_value(value):
+    """
+    Function that hashes a string into a 64 bits integer.
+
+    The hash does not depend on the process (unlike the hash function
+    of python), so the counters of different processes can be merged.
+
+    Parameters
+    ----------
+    value : str
+        value to hash.
+
+    Returns
+    -------
+    hash : int
+        64 bits hash of the value.
+    """
+
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+class HyperLogLog:
+    """
+    Class that defines a HyperLogLog counter of the number of distinct values.
+
+    The counter uses 2^precision registers of one byte, whatever the number
+    of values, and its relative error is about 1.04/sqrt(2^precision).
+    Two counters are merged by taking the maximum of each register: the
+    result counts the distinct values of both counters.
+    """
+
+    def __init__(self, precision=8):
+        """
+        Parameters
+        ----------
+        precision : int
+            number of bits of the hash used to choose the register (between 4 and 16).
+        """
+
+        if not 4 <= precision <= 16:
+            raise ValueError("precision should be between 4 and 16")
+
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def __eq__(self, other):
+        return isinstance(other, HyperLogLog) and self.registers == other.registers
+
+    def __repr__(self):
+        return f"HyperLogLog(~{self.count()})"
+
+    def add(self, value):
+        """
+        Function that adds a value to the counter.
+
+        Parameters
+        ----------
+        value : str
+            value to count.
+        """
+
+        self.add_hash(hash_value(value))
+
+    def add_hash(self, value_hash):
+        """
+        Function that adds the hash of a value to the counter (see hash_value).
+
+        Parameters
+        ----------
+        value_hash : int
+            64 bits hash of the value.
+        """
+
+        nb_bits = 64 - self.precision
+        index = value_hash >> nb_bits
+
+        # position of the first 1 bit in the rest of the hash
+        rank = nb_bits - (value_hash & ((1 << nb_bits) - 1)).bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """
+        Function that estimates the number of distinct values.
+
+        Returns
+        -------
+        count : int
+            estimated number of distinct values.
+        """
+
+        nb_registers = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(nb_registers, 0.7213/(1 + 1.079/nb_registers))
+        estimate = alpha*nb_registers**2/sum(2.**-register for register in self.registers)
+
+        # use a linear counting for the small cardinalities
+        nb_zeros = self.registers.count(0)
+        if estimate <= 2.5*nb_registers and nb_zeros:
+            estimate = nb_registers*math.log(nb_registers/nb_zeros)
+
+        return round(estimate)
+
+    def merge(self, other):
+        """
+        Function that adds the values of another counter.
+
+        Parameters
+        ----------
+        other : HyperLogLog
+            counter with the same precision.
+
+        Returns
+        -------
+        counter : HyperLogLog
+            the counter itself.
+        """
+
+        if other.precision != self.precision:
+            raise ValueError("Only counters with the same precision can be merged")
+
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+        return self
+
+    def copy(self):
+        """
+        Function that returns a copy of the counter.
+
+        Returns
+        -------
+        counter : HyperLogLog
+            the copy.
+        """
+
+        counter = HyperLogLog(self.precision)
+        counter.registers[:] = self.registers
+        return counter
+
+    def get_state(self):
+        """
+        Function that returns the registers of the counter as plain data
+        (to send the counter to another process, see encode_summary).
+
+        Returns
+        -------
+        state : dict
+            precision and registers (in hexadecimal) of the counter.
+        """
+
+        return {"precision": self.precision, "registers": self.registers.hex()}
+
+    def set_state(self, state):
+        """
+        Function that restores the registers of the counter.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state, for a counter of the same precision.
+
+        Raises
+        ------
+        ValueError
+            if the state is not the state of a counter of this precision.
+        """
+
+        registers = bytearray.fromhex(state["registers"])
+        if state["precision"] != self.precision or len(registers) != 1 << self.precision:
+            raise ValueError("Only the registers of a counter with the same precision can be restored")
+        self.registers = registers
@@ -0,0 +1,67 @@
+
+
+class Interner:
+    """
+    Interner class
+    Maps each distinct string to a small integer id, the ids are given
+    on the fly in the order of appearance of the strings.
+    """
+
+    def __init__(self, values=()):
+        """
+        Parameters
+        ----------
+            values : iterable of str
+                values to intern first, they get the ids 0, 1, 2...
+        """
+
+        self.ids = {}
+        self.values = []
+
+        for value in values:
+            self.intern(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, value):
+        return value in self.ids
+
+    def intern(self, value):
+        """
+        Function that returns the id of a value, a new id is given
+        to the values that were never seen.
+
+        Parameters
+        ----------
+        value : str
+            value to intern
+
+        Returns
+        -------
+        id : int
+            id of the value
+        """
+
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def value(self, value_id):
+        """
+        Function that returns the value of an id.
+
+        Parameters
+        ----------
+        value_id : int
+            id of a value already interned
+
+        Returns
+        -------
+        value : str
+            the interned value
+        """
+
+        return self.values[value_id]
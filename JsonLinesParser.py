@@ -0,0 +1,107 @@
+import json
+
+from BulkParser import BulkParser, fill_batch
+from LogGenerator import get_log_deserializer
+from utils import LOG_HEADER
+
+
+# Fields that can be missing from a json log, with their default value
+JSON_DEFAULTS = {"rfc931": "-", "authuser": "-"}
+
+
+class JsonLinesParser(BulkParser):
+    """
+    Class that defines a bulk parser of json lines logs, one json object per line
+    with the fields of the csv header, for example:
+    {"remotehost": "10.0.0.2", "date": 1549573860, "request": "GET /api/user HTTP/1.0", "status": 200, "bytes": 1234}
+
+    All the lines of a block are decoded at once as a single json array, then
+    the columns are converted into a batch like the csv columns (see fill_batch).
+    """
+
+    log_format = "jsonl"
+    indexed = False
+
+    def get_schema(self):
+        """
+        Function that returns the schema of the raw values of the format.
+
+        Returns
+        -------
+        schema : dict
+            schema of the Deserializer of the logs (the json values are not quoted).
+        """
+
+        return dict(get_log_deserializer().deserialize_dict)
+
+    def check_header(self, f):
+        # there is no header in the files of this format
+        pass
+
+    def parse_line(self, line):
+        """
+        Function that parses a single line.
+
+        Parameters
+        ----------
+        line : str
+            line of the file.
+
+        Returns
+        -------
+        log : LogRecord
+            the deserialized log (see Deserializer).
+
+        Raises
+        ------
+        ValueError
+            if the line is not a log.
+        """
+
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"Not a json log: {line}")
+
+        # the values of another type (like null) can not be deserialized
+        try:
+            return self.log_deserializer([record[label] if label not in JSON_DEFAULTS else
+                                          record.get(label, JSON_DEFAULTS[label]) for label in LOG_HEADER])
+        except (TypeError, AttributeError):
+            raise ValueError(f"Not a json log: {line}")
+
+    def parse_columns(self, block, schema, batch, nb_lines):
+        """
+        Function that parses a block of complete lines column by column.
+
+        Parameters
+        ----------
+        block : str
+            lines of the file (ending with a new line character).
+        schema : dict
+            schema of the raw values of the format (see get_schema).
+        batch : LogBatch
+            empty batch to fill in.
+        nb_lines : int
+            number of lines of the block.
+
+        Raises
+        ------
+        ValueError
+            if the block does not follow the format.
+        """
+
+        # decode all the lines at once
+        records = json.loads("[" + block.rstrip("\n").replace("\n", ",") + "]")
+        if len(records) != nb_lines:
+            raise ValueError("Unexpected number of logs in the block")
+
+        try:
+            fill_batch(batch, schema,
+                       [record["remotehost"] for record in records],
+                       [record.get("authuser", "-") for record in records],
+                       [record["request"] for record in records],
+                       [record["date"] for record in records],
+                       [record["status"] for record in records],
+                       [record["bytes"] for record in records])
+        except (TypeError, AttributeError):
+            raise ValueError("Some lines are not json logs")
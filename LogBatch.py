@@ -0,0 +1,237 @@
+import csv
+from array import array
+from bisect import bisect_left
+
+from Interner import Interner
+from LogGenerator import get_log_deserializer
+from log_analyse_fcts import get_section_from_route
+from utils import LOG_HEADER
+
+
+class LogBatch:
+    """
+    Class that defines a columnar batch of logs.
+
+    Instead of one object per log (see LogRecord), a batch stores each field of the logs
+    in its own typed array. The strings (methods, sections, hosts and users) are
+    replaced by small integer ids given by Interner objects, that are shared
+    by all the batches of the same log stream.
+    """
+
+    def __init__(self, methods=None, sections=None, hosts=None, users=None):
+        """
+        Parameters
+        ----------
+        methods : Interner or None
+            ids of the http methods, a new Interner is created if None.
+        sections : Interner or None
+            ids of the sections, a new Interner is created if None.
+        hosts : Interner or None
+            ids of the remote hosts, a new Interner is created if None.
+        users : Interner or None
+            ids of the authenticated users, a new Interner is created if None.
+        """
+
+        self.methods = methods if methods is not None else Interner()
+        self.sections = sections if sections is not None else Interner()
+        self.hosts = hosts if hosts is not None else Interner()
+        self.users = users if users is not None else Interner()
+
+        # One array per column
+        self.dates = array("q")
+        self.status = array("H")
+        self.bytes = array("q")
+        self.method_ids = array("I")
+        self.section_ids = array("I")
+        self.host_ids = array("I")
+        self.user_ids = array("I")
+
+    def __len__(self):
+        return len(self.dates)
+
+    def empty_copy(self):
+        """
+        Function that returns an empty batch sharing the same Interner objects.
+
+        Returns
+        -------
+        batch : LogBatch
+            empty batch
+        """
+
+        return LogBatch(self.methods, self.sections, self.hosts, self.users)
+
+    def append(self, remotehost, date, method, route, status, nb_bytes, authuser="-"):
+        """
+        Function that adds a log at the end of the batch.
+
+        Parameters
+        ----------
+        remotehost : str
+            remote host of the request
+        date : int
+            date of the request in seconds
+        method : str
+            http method of the request
+        route : str
+            route of the request
+        status : int
+            status code of the response
+        nb_bytes : int
+            size of the response in bytes
+        authuser : str
+            authenticated user of the request
+
+        Raises
+        ------
+        ValueError
+            if the date, the status (2 bytes) or the size does not fit in its column.
+        """
+
+        nb_logs = len(self.dates)
+
+        try:
+            self.dates.append(date)
+            self.status.append(status)
+            self.bytes.append(nb_bytes)
+        except OverflowError:
+            # a value out of the range of its column is not a log, the batch is left unchanged
+            del self.dates[nb_logs:], self.status[nb_logs:], self.bytes[nb_logs:]
+            raise ValueError(f"Value out of range in the log: {date}, {status}, {nb_bytes}")
+
+        self.method_ids.append(self.methods.intern(method))
+        self.section_ids.append(self.sections.intern(get_section_from_route(route)))
+        self.host_ids.append(self.hosts.intern(remotehost))
+        self.user_ids.append(self.users.intern(authuser))
+
+    def append_log(self, log):
+        """
+        Function that adds a log (see LogRecord) at the end of the batch.
+
+        Parameters
+        ----------
+        log : LogRecord
+            deserialized log
+        """
+
+        self.append(log.remotehost, log.date, log.request.method,
+                    log.request.route, log.status, log.bytes, log.authuser)
+
+    def extend(self, batch, start=0, end=None):
+        """
+        Function that adds the logs of another batch at the end of this batch.
+        Both batches should share the same Interner objects.
+
+        Parameters
+        ----------
+        batch : LogBatch
+            batch to copy the logs from
+        start : int
+            index of the first log to copy
+        end : int or None
+            index after the last log to copy, default to the end of the batch
+        """
+
+        if end is None:
+            end = len(batch)
+
+        self.dates.extend(batch.dates[start:end])
+        self.status.extend(batch.status[start:end])
+        self.bytes.extend(batch.bytes[start:end])
+        self.method_ids.extend(batch.method_ids[start:end])
+        self.section_ids.extend(batch.section_ids[start:end])
+        self.host_ids.extend(batch.host_ids[start:end])
+        self.user_ids.extend(batch.user_ids[start:end])
+
+    def slice(self, start=0, end=None):
+        """
+        Function that returns a copy of a part of the batch.
+
+        Parameters
+        ----------
+        start : int
+            index of the first log to copy
+        end : int or None
+            index after the last log to copy, default to the end of the batch
+
+        Returns
+        -------
+        batch : LogBatch
+            batch sharing the same Interner objects
+        """
+
+        batch = self.empty_copy()
+        batch.extend(self, start, end)
+        return batch
+
+    def find_date(self, date, start=0):
+        """
+        Function that returns the index of the first log whose date is after the given date.
+        The logs are expected to be sorted by date.
+
+        Parameters
+        ----------
+        date : float
+            date in seconds
+        start : int
+            index from where to search
+
+        Returns
+        -------
+        index : int
+            index of the first log with a date greater or equal to the given date
+            (the size of the batch if there is none)
+        """
+
+        return bisect_left(self.dates, date, start)
+
+
+def read_log_batches(src_file, batch_size=10000):
+    """
+    Generator that reads a csv file of logs and converts on the fly
+    the csv lines into columnar batches.
+
+    The lines are deserialized like in the parsers (see get_log_deserializer),
+    the lines that can not be parsed are skipped.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the csv file containing the logs.
+    batch_size : int
+        maximum number of logs per batch.
+
+    Returns
+    -------
+    stream : generator of LogBatch
+        generator over the batches of logs of the file.
+    """
+
+    with open(src_file) as f:
+
+        # create a reader object on the input file.
+        data = csv.reader(f, delimiter=',',
+                          quoting=csv.QUOTE_NONNUMERIC)
+
+        # store the header of the csv file.
+        header = next(data)
+        assert tuple(header) == LOG_HEADER
+
+        log_deserializer = get_log_deserializer(header)
+        batch = LogBatch()
+
+        for values in data:
+
+            if len(values) != len(LOG_HEADER):
+                continue
+            try:
+                batch.append_log(log_deserializer(values))
+            except (ValueError, KeyError):
+                continue
+
+            if len(batch) == batch_size:
+                yield batch
+                batch = batch.empty_copy()
+
+        if len(batch):
+            yield batch
@@ -0,0 +1,120 @@
+from threading import Condition
+
+
+class LogChannel:
+    """
+    Class that defines a bounded channel of logs between a producer thread
+    and a consumer thread.
+
+    The producer publishes whole batches of logs (one lock per batch and not
+    per log) and the consumer takes all the pending batches at once: the list
+    of batches is swapped with an empty one, so the logs are never copied
+    under the lock.
+
+    When the channel is full, the producer waits for the consumer (back-pressure),
+    or the batch is dropped if the producer can't wait. The dropped logs are counted.
+    """
+
+    def __init__(self, capacity=1000000):
+        """
+        Parameters
+        ----------
+        capacity : int
+            maximum number of logs waiting in the channel.
+        """
+
+        self.capacity = capacity
+
+        # Condition object to concurently access to variables and wait for space.
+        self.condition = Condition()
+
+        # Batches not yet consumed and their total number of logs
+        self.batches = []
+        self.size = 0
+        self.closed = False
+
+        # Counters of the logs that went through the channel
+        self.nb_published = 0
+        self.nb_dropped = 0
+
+    def publish(self, logs, block=True, timeout=None):
+        """
+        Function that appends a batch of logs to the channel.
+
+        Parameters
+        ----------
+        logs : list
+            batch of logs, the list should not be modified after being published.
+        block : bool
+            True to wait for space in the channel if it is full.
+        timeout : float or None
+            maximum time to wait in seconds, None to wait until there is space.
+
+        Returns
+        -------
+        published : bool
+            False if the batch was dropped.
+        """
+
+        if not logs:
+            return True
+
+        with self.condition:
+
+            if block:
+                self.condition.wait_for(lambda: self.closed or self.size == 0 or
+                                        self.size + len(logs) <= self.capacity, timeout)
+
+            if self.closed or (self.size and self.size + len(logs) > self.capacity):
+                self.nb_dropped += len(logs)
+                return False
+
+            self.batches.append(logs)
+            self.size += len(logs)
+            self.nb_published += len(logs)
+
+        return True
+
+    def drain(self):
+        """
+        Function that takes all the batches of the channel.
+
+        Returns
+        -------
+        batches : list of list
+            All the batches published since the last drain, in order.
+        """
+
+        with self.condition:
+            batches, self.batches = self.batches, []
+            self.size = 0
+            self.condition.notify_all()
+
+        return batches
+
+    def get_batches(self):
+        """
+        Function that returns the batches of the channel without taking them.
+
+        Returns
+        -------
+        batches : list of list
+            All the batches published since the last drain, in order.
+        """
+
+        with self.condition:
+            return list(self.batches)
+
+    def close(self):
+        """
+        Function that closes the channel, the producer stops waiting
+        and the next batches are dropped.
+        """
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        with self.condition:
+            return self.size
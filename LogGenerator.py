@@ -1,8 +1,109 @@
 import csv
+import os
 import time
 from threading import Lock, Thread
 
 from Deserializer import Deserializer
+from LogChannel import LogChannel
+from LogIndex import LogIndex
+from LogRecord import LogRecord, Request
+from SimulationClock import SimulationClock
+from utils import LOG_HEADER, get_compression
+
+
+def get_log_deserializer(header=LOG_HEADER, compact=True):
+    """
+    Function that defines the Deserializer object that transforms
+    any line of the csv into the right object.
+
+    Parameters
+    ----------
+    header : tuple
+        labels of the columns of the csv file.
+    compact : bool
+        True to deserialize the lines into LogRecord objects (the request
+        lines are parsed once and shared), False into nested dictionaries.
+
+    Returns
+    -------
+    log_deserializer : Deserializer
+        deserializer of the csv lines.
+    """
+
+    # Define Deserializers objects that transform any line of the csv into the right object.
+    request_deserializer = Deserializer(deserialize_dict={"method": str,
+                                                          "route": str,
+                                                          "protocol": str},
+                                        default_header=[
+                                            "method", "route", "protocol"],
+                                        split=True,
+                                        default_sep=" ",
+                                        record_type=Request if compact else None,
+                                        cache_size=1 << 16 if compact else 0)
+    transform_dict_log_line = {"authuser": str,
+                               "rfc931": str,
+                               "status": int,
+                               "remotehost": str,
+                               "request": request_deserializer,
+                               "bytes": int,
+                               "date": int
+                               }
+    log_deserializer = Deserializer(deserialize_dict=transform_dict_log_line,
+                                    default_header=header,
+                                    split=False,
+                                    record_type=LogRecord if compact else None)
+
+    return log_deserializer
+
+
+def read_logs(src_file, start_date=None, log_format=None):
+    """
+    Function that reads a csv file of logs and converts on the fly
+    the csv lines into LogRecord objects.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the csv file containing the logs (or to a directory of rotated log files).
+    start_date : float or None
+        if given, the reading starts close to the first log of this date
+        thanks to the index of the file (see LogIndex), the logs before
+        this position are skipped without being read.
+    log_format : str or None
+        format of the file (see log_formats), detected from the file if None.
+        The other formats, the compressed files and the directories of rotated
+        files are read by their parser.
+
+    Returns
+    -------
+    stream : generator of LogRecord
+        generator over the deserialized logs of the file.
+    """
+
+    # the parsers of the formats use the deserializer of this module
+    from log_formats import detect_format, get_parser
+
+    if os.path.isdir(src_file) or get_compression(src_file) is not None or \
+            (log_format or detect_format(src_file)) != "csv":
+        return get_parser(src_file, log_format, start_date=start_date).read_logs()
+
+    # create a reader object on the input file.
+    f = open(src_file)
+    data = csv.reader(f, delimiter=',',
+                      quoting=csv.QUOTE_NONNUMERIC)
+
+    # store the header of the csv file.
+    header = next(data)
+    assert tuple(header) == LOG_HEADER
+
+    # jump close to the start date
+    if start_date is not None:
+        f.seek(LogIndex(src_file).seek(start_date))
+
+    log_deserializer = get_log_deserializer(header)
+
+    # the blank lines are skipped
+    return (log_deserializer(log_line) for log_line in data if log_line)
 
 
 class LogGenerator(Thread):
@@ -13,63 +114,47 @@ class LogGenerator(Thread):
     is going to fill in real time a buffer of logs following
     the log history file given in input.
 
+    The logs are published by batches in a LogChannel: all the logs
+    that are due at the same time are published at once.
+
     """
 
-    def __init__(self, src_file, csv_start_date=None):
+    def __init__(self, src_file, csv_start_date=None, clock=None, channel=None, batch_size=1000,
+                 log_format=None):
         """
         Parameters
         ----------
         src_file : str
-            path to the csv file containing the logs.
+            path to the csv file containing the logs (or to a directory of rotated log files).
         csv_start_date : float 
             timestamp in seconds from where to start the log generation.
+        clock : SimulationClock or None
+            clock that drives the simulation, default to a real time clock.
+        channel : LogChannel or None
+            channel where to publish the logs, default to a new channel.
+        batch_size : int
+            maximum number of logs published at once.
+        log_format : str or None
+            format of the file (see log_formats), detected from the file if None.
         """
 
         Thread.__init__(self)
 
-        # create a reader object on the input file.
-        data = csv.reader(open(src_file), delimiter=',',
-                          quoting=csv.QUOTE_NONNUMERIC)
-
-        # store the header of the csv file.
-        header = next(data)
-        assert tuple(header) == ('remotehost', 'rfc931',
-                                 'authuser', 'date', 'request', 'status', 'bytes')
-
-        # Define Deserializers objects that transform any line of the csv into the right object.
-        request_deserializer = Deserializer(deserialize_dict={"method": str,
-                                                              "route": str,
-                                                              "protocol": str},
-                                            default_header=[
-                                                "method", "route", "protocol"],
-                                            split=True,
-                                            default_sep=" ")
-        transform_dict_log_line = {"authuser": str,
-                                   "rfc931": str,
-                                   "status": int,
-                                   "remotehost": str,
-                                   "request": request_deserializer,
-                                   "bytes": int,
-                                   "date": int
-                                   }
-        log_deserializer = Deserializer(deserialize_dict=transform_dict_log_line,
-                                        default_header=header,
-                                        split=False)
-
-        # Instanciate a generator that converts on the fly the csv lines into dictionary objects.
-        self.stream = (log_deserializer(log_line) for log_line in data)
+        # Instanciate a generator that converts on the fly the csv lines into LogRecord objects.
+        self.stream = read_logs(src_file, start_date=csv_start_date, log_format=log_format)
 
         # Instanciate Lock object to concurently access to variables.
-        self.buffer_lock = Lock()
         self.run_lock = Lock()
 
         # Variable to handle the simulation.
         self.is_running = False
+        self.is_finished = False
         self.csv_start_date = csv_start_date
-        self.simul_start_time = time.time()
+        self.clock = clock if clock is not None else SimulationClock()
 
-        # List that stores the lines already read.
-        self.buffer = []
+        # Channel that stores the lines already read.
+        self.channel = channel if channel is not None else LogChannel()
+        self.batch_size = batch_size
 
     def empty_buffer(self):
         """
@@ -77,16 +162,12 @@ class LogGenerator(Thread):
 
         Returns
         -------
-        buffer : list of dict
+        buffer : list of LogRecord
             All the elements of the buffer (the requests that
             the machine received since the last flush of the buffer)
         """
 
-        self.buffer_lock.acquire()
-        buff = self.buffer.copy()
-        self.buffer = []
-        self.buffer_lock.release()
-        return buff
+        return [log for batch in self.channel.drain() for log in batch]
 
     def get_buffer(self):
         """
@@ -94,15 +175,12 @@ class LogGenerator(Thread):
 
         Returns
         -------
-        buffer : list of dict
+        buffer : list of LogRecord
             All the elements of the buffer (the requests that
             the machine received since the last flush of the buffer)
         """
 
-        self.buffer_lock.acquire()
-        buff = self.buffer.copy()
-        self.buffer_lock.release()
-        return buff
+        return [log for batch in self.channel.get_batches() for log in batch]
 
     def stop(self):
         """
@@ -113,6 +191,25 @@ class LogGenerator(Thread):
         self.is_running = False
         self.run_lock.release()
 
+        # stop waiting for space in the channel or for the next log
+        self.channel.close()
+        self.clock.stop()
+
+    def finished(self):
+        """
+        Function that tells if all the logs of the csv file were added to the buffer.
+
+        Returns
+        -------
+        finished : bool
+            True if the end of the csv file was reached.
+        """
+
+        self.run_lock.acquire()
+        finished = self.is_finished
+        self.run_lock.release()
+        return finished
+
     def get_offset_ms(self):
         """
         Function that returns the offset between the simulation start time and the csv-based time.
@@ -123,7 +220,7 @@ class LogGenerator(Thread):
             Number of seconds between the simulation start time and the csv-based time
         """
 
-        return self.csv_start_date - self.simul_start_time
+        return self.clock.now() - time.time()
 
     def run(self):
         """
@@ -135,24 +232,23 @@ class LogGenerator(Thread):
         self.is_running = True
         self.run_lock.release()
 
+        # logs that are due but not yet published
+        batch = []
+
         # Find the right index in the csv to start the simulation from the given start date.
         if self.csv_start_date is not None:
             for log in self.stream:
-                if log["date"] >= self.csv_start_date:
-                    self.buffer_lock.acquire()
-                    self.buffer.append(log)
-                    self.buffer_lock.release()
+                if log.date >= self.csv_start_date:
+                    batch.append(log)
                     break
         else:
             for log in self.stream:
-                self.csv_start_date = log["date"]
-                self.buffer_lock.acquire()
-                self.buffer.append(log)
-                self.buffer_lock.release()
+                self.csv_start_date = log.date
+                batch.append(log)
                 break
 
-        # save simulation start date
-        self.simul_start_time = time.time()
+        # start the simulation clock at the csv start date
+        self.clock.start(self.csv_start_date)
 
         stop = False
 
@@ -160,40 +256,68 @@ class LogGenerator(Thread):
         for log in self.stream:
 
             # compute the time to wait before adding the log to the buffer
-            ellapsed_time = time.time() - self.simul_start_time
-            next_event = log["date"] - self.csv_start_date
+            next_event = log.date
 
             # If the waiting time is too long, stop the program
-            if next_event-ellapsed_time > 10000:
+            if not self.clock.is_virtual() and next_event - self.clock.now() > 10000:
                 stop = True
                 break
 
-            # Wait the right amount of time
-            while ellapsed_time < next_event:
+            if self.clock.time_until(next_event) > 0:
 
-                # Check that the process shouldn't stop
-                self.run_lock.acquire()
-                if not self.is_running:
+                # publish the logs that are due before waiting
+                self.publish(batch)
+                batch = []
+
+                # Wait the right amount of time (or until the generator stops)
+                if not self.clock.wait_until(next_event):
                     stop = True
                     break
-                self.run_lock.release()
 
-                # wait a little time
-                time.sleep(.01)
+            # Add the log in the batch
+            batch.append(log)
 
-                # update ellapsed time
-                ellapsed_time = time.time() - self.simul_start_time
-            
-            # If the program should stop
-            if stop:
-                break
+            if len(batch) >= self.batch_size:
+                self.publish(batch)
+                batch = []
 
-            # Add the log in the buffer
-            self.buffer_lock.acquire()
-            self.buffer.append(log)
-            self.buffer_lock.release()
+                # Check that the process shouldn't stop
+                self.run_lock.acquire()
+                stop = not self.is_running
+                self.run_lock.release()
+                if stop:
+                    break
 
         # No more requests, end of the simulation
+        if not stop:
+            self.publish(batch)
+            self.run_lock.acquire()
+            self.is_finished = True
+            self.run_lock.release()
+            self.clock.finish()
+
+    def publish(self, batch):
+        """
+        Function that publishes a batch of logs in the channel.
+
+        In a virtual simulation, the generator waits for space in the channel
+        and the logs make the time move forward. Otherwise, the logs come in
+        real time and are dropped if the channel is full.
+
+        Parameters
+        ----------
+        batch : list of LogRecord
+            logs to publish.
+        """
+
+        if not batch:
+            return
+
+        if self.clock.is_virtual():
+            self.channel.publish(batch, block=True)
+            self.clock.advance(batch[-1].date)
+        else:
+            self.channel.publish(batch, block=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+import csv
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from utils import LOG_HEADER
+
+
+# Header of the index files: magic number, version, size and modification
+# time of the indexed csv file, indexing step and number of entries.
+INDEX_HEADER = struct.Struct("<4sIqqII")
+INDEX_MAGIC = b"LIDX"
+INDEX_VERSION = 1
+
+
+def read_line_date(line, date_column):
+    """
+    Function that reads the date of a csv line of log.
+
+    Parameters
+    ----------
+    line : bytes
+        csv line, without its new line character.
+    date_column : int
+        index of the date in the values of the line.
+
+    Returns
+    -------
+    date : int or None
+        date of the log rounded up to the second, None if the line is not a log.
+    """
+
+    values = line.split(b",")
+
+    # quoted values with commas are split by the csv module
+    if len(values) != len(LOG_HEADER):
+        try:
+            values = next(csv.reader([line.decode()], quoting=csv.QUOTE_NONNUMERIC), ())
+        except (csv.Error, UnicodeDecodeError, ValueError):
+            return None
+
+    try:
+        return math.ceil(float(values[date_column]))
+    except (ValueError, TypeError, IndexError, OverflowError):
+        return None
+
+
+class LogIndex:
+    """
+    Class that defines a sparse index of a csv file of logs.
+
+    The index stores, every `step` lines, the byte offset of the line and the
+    greatest date of all the lines before it. As the dates of the logs are only
+    roughly sorted, the greatest date is used so that all the lines before an
+    indexed offset are known to be older than its date. The lines that are not
+    logs (like blank lines) are skipped.
+
+    The index is built once and cached in a sidecar file next to the csv file
+    (`<src_file>.idx`), it is rebuilt when the csv file changes.
+    """
+
+    def __init__(self, src_file, step=1024):
+        """
+        Parameters
+        ----------
+        src_file : str
+            path to the csv file containing the logs.
+        step : int
+            number of lines between two entries of the index.
+        """
+
+        self.src_file = src_file
+        self.index_file = src_file + ".idx"
+        self.step = step
+
+        # Entries of the index
+        self.dates = array("q")
+        self.offsets = array("q")
+
+        # offset of the first log (after the header) and size of the file
+        self.data_offset = 0
+        self.size = 0
+
+        if not self.load():
+            self.build()
+            self.save()
+
+    def file_signature(self):
+        """
+        Function that returns the size and modification time of the csv file.
+
+        Returns
+        -------
+        signature : tuple of int
+            size in bytes and modification time in nanoseconds.
+        """
+
+        stat = os.stat(self.src_file)
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self):
+        """
+        Function that loads the index from the sidecar file if it is up to date.
+
+        Returns
+        -------
+        loaded : bool
+            True if the index was loaded.
+        """
+
+        try:
+            with open(self.index_file, "rb") as f:
+                magic, version, size, mtime, step, count = INDEX_HEADER.unpack(
+                    f.read(INDEX_HEADER.size))
+                if (magic, version, step) != (INDEX_MAGIC, INDEX_VERSION, self.step) or \
+                        (size, mtime) != self.file_signature():
+                    return False
+                self.size = size
+                self.data_offset = struct.unpack("<q", f.read(8))[0]
+                self.dates.fromfile(f, count)
+                self.offsets.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            self.dates = array("q")
+            self.offsets = array("q")
+            return False
+
+        return True
+
+    def save(self):
+        """
+        Function that caches the index in the sidecar file
+        (the index is only kept in memory if the file can't be written).
+        """
+
+        size, mtime = self.file_signature()
+
+        try:
+            with open(self.index_file, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, size, mtime,
+                                          self.step, len(self.dates)))
+                f.write(struct.pack("<q", self.data_offset))
+                self.dates.tofile(f)
+                self.offsets.tofile(f)
+        except OSError:
+            pass
+
+    def build(self):
+        """
+        Function that builds the index by scanning the whole csv file.
+        """
+
+        self.dates = array("q")
+        self.offsets = array("q")
+
+        date_column = LOG_HEADER.index("date")
+
+        with open(self.src_file, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if self.size == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+                # skip the header
+                self.data_offset = position = data.find(b"\n") + 1
+
+                max_date = None
+                nb_lines = 0
+
+                while position < self.size:
+
+                    if nb_lines % self.step == 0 and max_date is not None:
+                        self.dates.append(max_date)
+                        self.offsets.append(position)
+
+                    line_end = data.find(b"\n", position)
+                    if line_end == -1:
+                        line_end = self.size
+
+                    date = read_line_date(data[position:line_end], date_column)
+                    if date is not None and (max_date is None or date > max_date):
+                        max_date = date
+
+                    position = line_end + 1
+                    nb_lines += 1
+
+    def seek(self, date):
+        """
+        Function that returns an offset from where to read the logs from a given date.
+        All the logs before this offset are older than the date, and the first log
+        from this date is at most `step` lines after it.
+
+        Parameters
+        ----------
+        date : float or None
+            date in seconds, None for the beginning of the file.
+
+        Returns
+        -------
+        offset : int
+            byte offset of a line of the csv file.
+        """
+
+        if date is None:
+            return self.data_offset
+
+        # last entry whose previous lines are all older than the date
+        i = bisect_left(self.dates, date)
+        return self.offsets[i-1] if i else self.data_offset
+
+    def seek_end(self, date):
+        """
+        Function that returns an offset until where to read the logs before a given date.
+        The first log after the date is before this offset.
+
+        Parameters
+        ----------
+        date : float or None
+            date in seconds, None for the end of the file.
+
+        Returns
+        -------
+        offset : int
+            byte offset of a line of the csv file (or size of the file).
+        """
+
+        if date is None:
+            return self.size
+
+        # first entry whose previous lines contain a log after the date
+        i = bisect_left(self.dates, date)
+        return self.offsets[i] if i < len(self.offsets) else self.size
@@ -0,0 +1,337 @@
+import asyncio
+import re
+import socket
+import time
+from threading import Event, Lock, Thread
+
+from LogBatch import LogBatch
+from LogChannel import LogChannel
+from log_formats import LOG_FORMATS
+from SimulationClock import SimulationClock
+
+
+# Header of a syslog message, removed before parsing the log line: the priority,
+# then the header of RFC 5424 (version, date, host, application, process, message
+# id and structured data) or of RFC 3164 (date, host and tag), if any:
+# <190>Oct 10 13:55:36 web-1 nginx: 127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET / HTTP/1.0" 200 2326
+SYSLOG_HEADER = re.compile(rb"^<\d{1,3}>(?:1 \S+ \S+ \S+ \S+ \S+ (?:-|(?:\[.*?\])+) ?(?:\xef\xbb\xbf)?|"
+                           rb"[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d \S+ [^:\s]+: ?)?", re.M)
+
+
+def split_octet_counted_frames(data):
+    """
+    Function that splits the frames of a syslog stream framed by octet counting
+    (RFC 6587): each message is preceded by its length and a space.
+
+    Parameters
+    ----------
+    data : bytes
+        received bytes.
+
+    Returns
+    -------
+    messages : list of bytes
+        the complete messages.
+    remainder : bytes
+        the beginning of the next frame.
+
+    Raises
+    ------
+    ValueError
+        if a frame does not start with its length.
+    """
+
+    messages = []
+    position = 0
+
+    while True:
+        space = data.find(b" ", position, position + 11)
+        if space < 0:
+            if len(data) - position > 10:
+                raise ValueError("Syslog frame without length")
+            break
+        end = space + 1 + int(data[position:space])
+        if end > len(data):
+            break
+        messages.append(data[space + 1:end].rstrip(b"\r\n"))
+        position = end
+
+    return messages, data[position:]
+
+
+class SyslogStreamProtocol(asyncio.Protocol):
+    """
+    Class that receives the syslog messages of a TCP connection.
+
+    The framing of the connection is found from its first bytes: the messages
+    are preceded by their length (octet counting) if the connection starts with
+    a number followed by a space, otherwise they end with a new line character.
+    """
+
+    def __init__(self, listener):
+        """
+        Parameters
+        ----------
+        listener : LogListener
+            listener receiving the messages.
+        """
+
+        self.listener = listener
+        self.remainder = b""
+        self.octet_counting = None
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        data = self.remainder + data
+
+        if self.octet_counting is None:
+            self.octet_counting = re.match(rb"\d{1,10} ", data) is not None
+
+        if self.octet_counting:
+            try:
+                messages, self.remainder = split_octet_counted_frames(data)
+            except ValueError:
+                self.listener.nb_invalid_lines += 1
+                self.transport.close()
+                return
+            if messages:
+                self.listener.receive(b"\n".join(messages) + b"\n", len(messages))
+            return
+
+        # only the complete lines are parsed, all at once
+        last_line_end = data.rfind(b"\n") + 1
+        block, self.remainder = data[:last_line_end], data[last_line_end:]
+        if block:
+            self.listener.receive(block, block.count(b"\n"))
+
+    def eof_received(self):
+        if self.remainder and not self.octet_counting:
+            self.listener.receive(self.remainder + b"\n", 1)
+        self.remainder = b""
+
+
+class LogListener(Thread):
+    """
+    Class that defines a log listener.
+
+    When the thread starts, the instanciated LogListener object receives the
+    access log lines shipped over the network in syslog messages, on a UDP
+    port (one message per datagram) and a TCP port (messages framed by new
+    lines or by octet counting), and publishes them in a LogChannel.
+
+    The messages are handled in bulk: all the datagrams waiting in the socket
+    are read at once (up to batch_size), and all the complete lines received on
+    a connection are parsed at once, so each wake up of the event loop gives a
+    single typed LogBatch (see BulkParser.parse_block). The batches are dropped
+    (and counted) when the channel is full, the senders never wait.
+    """
+
+    def __init__(self, host="127.0.0.1", udp_port=5140, tcp_port=5140, log_format="clf", clock=None,
+                 channel=None, batch_size=4096, receive_buffer_size=1 << 23):
+        """
+        Parameters
+        ----------
+        host : str
+            address to listen on.
+        udp_port : int or None
+            UDP port to listen on, 0 for a free port, None for no UDP.
+        tcp_port : int or None
+            TCP port to listen on, 0 for a free port, None for no TCP.
+        log_format : str
+            format of the log lines in the messages (see log_formats).
+        clock : SimulationClock or None
+            real time clock of the analysis, default to a new real time clock.
+        channel : LogChannel or None
+            channel where to publish the batches of logs, default to a new channel.
+        batch_size : int
+            maximum number of datagrams read at once.
+        receive_buffer_size : int
+            size of the buffer of the UDP socket in bytes (limited by the system),
+            the datagrams are lost when it is full.
+        """
+
+        Thread.__init__(self)
+
+        if log_format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {log_format} (known formats: {', '.join(LOG_FORMATS)})")
+
+        self.host = host
+        self.batch_size = batch_size
+
+        # the sockets are bound now, so the ports are known (and taken) before the thread starts
+        self.udp_socket = None
+        if udp_port is not None:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_size)
+            self.udp_socket.bind((host, udp_port))
+            self.udp_socket.setblocking(False)
+        self.tcp_socket = socket.create_server((host, tcp_port)) if tcp_port is not None else None
+
+        # Instanciate Lock object to concurently access to variables.
+        self.run_lock = Lock()
+
+        # Variable to handle the listening.
+        self.is_running = False
+        self.stop_event = Event()
+        self.clock = clock if clock is not None else SimulationClock()
+
+        # Channel that stores the logs received.
+        self.channel = channel if channel is not None else LogChannel()
+
+        # Bulk parser of the lines of the format, and batch whose Interner objects are shared by all the batches
+        self.parser = LOG_FORMATS[log_format]()
+        self.schema = self.parser.get_schema()
+        self.prototype = LogBatch()
+
+        # Counters of the lines received, parsed into logs and invalid
+        self.nb_received = 0
+        self.nb_parsed = 0
+        self.nb_invalid_lines = 0
+
+    @property
+    def udp_port(self):
+        return self.udp_socket.getsockname()[1] if self.udp_socket is not None else None
+
+    @property
+    def tcp_port(self):
+        return self.tcp_socket.getsockname()[1] if self.tcp_socket is not None else None
+
+    @property
+    def nb_dropped(self):
+        """
+        Number of logs dropped because the channel was full.
+        """
+
+        return self.channel.nb_dropped
+
+    def empty_buffer(self):
+        """
+        Function that empty the buffer and returns its content.
+
+        Returns
+        -------
+        batches : list of LogBatch
+            All the batches of logs received since the last flush of the buffer.
+        """
+
+        return self.channel.drain()
+
+    def stop(self):
+        """
+        Function to stop the Log listener.
+        """
+
+        self.run_lock.acquire()
+        self.is_running = False
+        self.run_lock.release()
+
+        self.stop_event.set()
+        self.channel.close()
+        self.clock.stop()
+
+    def finished(self):
+        """
+        Function that tells if all the logs were published, the network never ends.
+
+        Returns
+        -------
+        finished : bool
+            Always False.
+        """
+
+        return False
+
+    def run(self):
+        """
+        Receive the logs until the listener stops.
+        """
+
+        self.run_lock.acquire()
+        self.is_running = True
+        self.run_lock.release()
+
+        # the logs received come in real time
+        self.clock.start(time.time())
+
+        try:
+            asyncio.run(self.serve())
+        finally:
+            for sock in (self.udp_socket, self.tcp_socket):
+                if sock is not None:
+                    sock.close()
+
+    async def serve(self):
+        """
+        Coroutine that receives the messages until the listener stops.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        server = None
+        if self.tcp_socket is not None:
+            server = await loop.create_server(lambda: SyslogStreamProtocol(self), sock=self.tcp_socket)
+        if self.udp_socket is not None:
+            loop.add_reader(self.udp_socket.fileno(), self.read_datagrams)
+
+        try:
+            while not self.stop_event.is_set():
+                await asyncio.sleep(0.1)
+        finally:
+            if self.udp_socket is not None:
+                loop.remove_reader(self.udp_socket.fileno())
+            if server is not None:
+                server.close()
+
+    def read_datagrams(self):
+        """
+        Function that reads all the datagrams waiting in the UDP socket (up to batch_size)
+        and parses their messages at once.
+        """
+
+        datagrams = []
+        try:
+            for _ in range(self.batch_size):
+                datagrams.append(self.udp_socket.recv(65535).rstrip(b"\r\n\0"))
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        if datagrams:
+            self.receive(b"\n".join(datagrams) + b"\n", len(datagrams))
+
+    def receive(self, block, nb_lines):
+        """
+        Function that parses the log lines of a block of syslog messages and publishes them.
+
+        Parameters
+        ----------
+        block : bytes
+            messages, each one ending with a new line character.
+        nb_lines : int
+            number of messages of the block.
+        """
+
+        self.nb_received += nb_lines
+
+        nb_bad_lines = self.parser.nb_bad_lines
+        batch = self.parser.parse_block(SYSLOG_HEADER.sub(b"", block).decode(errors="replace"),
+                                        self.schema, self.prototype.empty_copy())
+        self.nb_invalid_lines += self.parser.nb_bad_lines - nb_bad_lines
+        self.nb_parsed += len(batch)
+
+        self.channel.publish(batch, block=False)
+
+
+if __name__ == "__main__":
+
+    # Small test
+    listener = LogListener(udp_port=0, tcp_port=0)
+    listener.start()
+    with socket.create_connection(("127.0.0.1", listener.tcp_port)) as connection:
+        connection.sendall(b'<190>Oct 10 13:55:36 web-1 nginx: 10.0.0.1 - - [10/Oct/2000:13:55:36 -0700] '
+                           b'"GET /api/user HTTP/1.0" 200 2326\n')
+    time.sleep(0.5)
+    print(sum(len(batch) for batch in listener.empty_buffer()))
+    listener.stop()
@@ -0,0 +1,91 @@
+import sys
+
+
+class Request:
+    """
+    Class that defines the request line of a log, like "GET /api/user HTTP/1.0".
+
+    The logs of the same request share the same Request object (see
+    get_log_deserializer), so a request should never be modified.
+    """
+
+    __slots__ = ("method", "route", "protocol")
+
+    def __init__(self, method, route, protocol="-"):
+        """
+        Parameters
+        ----------
+        method : str
+            HTTP method of the request.
+        route : str
+            route of the request.
+        protocol : str
+            protocol of the request, "-" if the request line has none (HTTP/0.9).
+        """
+
+        self.method = sys.intern(method)
+        self.route = sys.intern(route)
+        self.protocol = sys.intern(protocol)
+
+    def __eq__(self, other):
+        return isinstance(other, Request) and \
+            (self.method, self.route, self.protocol) == (other.method, other.route, other.protocol)
+
+    def __hash__(self):
+        return hash((self.method, self.route, self.protocol))
+
+    def __repr__(self):
+        return f"Request({self.method!r}, {self.route!r}, {self.protocol!r})"
+
+
+class LogRecord:
+    """
+    Class that defines a log, with the fields of the csv header.
+
+    The logs are compact records: many logs are kept in memory between two
+    updates of the analysis (up to 10 s of traffic), so their fields are stored
+    in slots instead of a dictionary, the strings are interned (the logs of the
+    same host or user share their strings) and the logs of the same request
+    share their Request object.
+    """
+
+    __slots__ = ("remotehost", "rfc931", "authuser", "date", "request", "status", "bytes")
+
+    def __init__(self, remotehost, rfc931, authuser, date, request, status, bytes):
+        """
+        Parameters
+        ----------
+        remotehost : str
+            address of the client.
+        rfc931 : str
+            remote log name of the user.
+        authuser : str
+            name of the authenticated user.
+        date : int
+            date of the request in seconds.
+        request : Request
+            request line of the log.
+        status : int
+            HTTP status of the response.
+        bytes : int
+            size of the response in bytes.
+        """
+
+        self.remotehost = sys.intern(remotehost)
+        self.rfc931 = sys.intern(rfc931)
+        self.authuser = sys.intern(authuser)
+        self.date = date
+        self.request = request
+        self.status = status
+        self.bytes = bytes
+
+    def __eq__(self, other):
+        return isinstance(other, LogRecord) and \
+            all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"LogRecord({', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)})"
+
+    def __reduce__(self):
+        # the strings of the unpickled logs are interned again
+        return LogRecord, tuple(getattr(self, field) for field in self.__slots__)
@@ -0,0 +1,331 @@
+import csv
+import os
+import time
+from threading import Event, Lock, Thread
+
+from LogChannel import LogChannel
+from LogGenerator import get_log_deserializer
+from SimulationClock import SimulationClock
+from utils import LOG_HEADER
+
+
+class LogTailer(Thread):
+    """
+    Class that defines a log tailer.
+
+    When the thread starts, the instanciated LogTailer object follows a csv
+    file of logs that the web server is appending to (like tail -F) and
+    publishes the new lines in a LogChannel as soon as they are written.
+
+    The tailer keeps the offset of the next line to read, so the file is
+    never read twice. The file is polled with os.stat: the polling is fast
+    while new lines arrive and slows down when the file is idle. When the
+    file is rotated (a new file is created at the same path), the end of the
+    old file is read before following the new one. When the file is truncated,
+    the reading starts again from the beginning of the file.
+    """
+
+    def __init__(self, src_file, clock=None, channel=None, from_start=False,
+                 min_poll_interval=0.01, max_poll_interval=0.5, block_size=1 << 22, start_position=None):
+        """
+        Parameters
+        ----------
+        src_file : str
+            path to the csv file containing the logs.
+        clock : SimulationClock or None
+            real time clock of the analysis, default to a new real time clock.
+        channel : LogChannel or None
+            channel where to publish the logs, default to a new channel.
+        from_start : bool
+            True to publish the lines already in the file, otherwise only
+            the new lines are published.
+        min_poll_interval : float
+            time between two checks of the file in seconds while new lines arrive.
+        max_poll_interval : float
+            maximum time between two checks of the file in seconds when it is idle.
+        block_size : int
+            maximum number of bytes read at once.
+        start_position : tuple or None
+            (inode, offset) of the next line to read, from a checkpoint (see line_position).
+            If the file was rotated or truncated since, it is read from its beginning.
+        """
+
+        Thread.__init__(self)
+
+        self.src_file = src_file
+        self.from_start = from_start
+        self.start_position = start_position
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.block_size = block_size
+
+        # Instanciate Lock object to concurently access to variables.
+        self.run_lock = Lock()
+
+        # Variable to handle the tailing.
+        self.is_running = False
+        self.stop_event = Event()
+        self.clock = clock if clock is not None else SimulationClock()
+
+        # Channel that stores the lines already read.
+        self.channel = channel if channel is not None else LogChannel()
+
+        # Opened file, offset of the next bytes to read and end of an incomplete line
+        self.file = None
+        self.inode = None
+        self.offset = 0
+        self.remainder = b""
+
+        # (inode, offset) of the first line that was not published yet
+        self.line_position = None
+
+        # Counters of the rotations and truncations of the file and of the invalid lines
+        self.nb_rotations = 0
+        self.nb_truncations = 0
+        self.nb_invalid_lines = 0
+
+        self.log_deserializer = get_log_deserializer()
+
+    def empty_buffer(self):
+        """
+        Function that empty the buffer and returns its content.
+
+        Returns
+        -------
+        buffer : list of LogRecord
+            All the logs written since the last flush of the buffer.
+        """
+
+        return [log for batch in self.channel.drain() for log in batch]
+
+    def get_buffer(self):
+        """
+        Function that returns the content of the buffer without flushing it.
+
+        Returns
+        -------
+        buffer : list of LogRecord
+            All the logs written since the last flush of the buffer.
+        """
+
+        return [log for batch in self.channel.get_batches() for log in batch]
+
+    def drain(self):
+        """
+        Function that takes the published batches with the position of the
+        first line that is not in these batches.
+
+        Returns
+        -------
+        batches : list of list of LogRecord
+            the batches of logs published since the last drain.
+        line_position : tuple or None
+            (inode, offset) of the next line to publish, to resume after these logs.
+        """
+
+        self.run_lock.acquire()
+        batches = self.channel.drain()
+        line_position = self.line_position
+        self.run_lock.release()
+
+        return batches, line_position
+
+    def stop(self):
+        """
+        Function to stop the Log tailer.
+        """
+
+        self.run_lock.acquire()
+        self.is_running = False
+        self.run_lock.release()
+
+        self.stop_event.set()
+        self.channel.close()
+        self.clock.stop()
+
+    def finished(self):
+        """
+        Function that tells if all the logs were published, a followed file never ends.
+
+        Returns
+        -------
+        finished : bool
+            Always False.
+        """
+
+        return False
+
+    def run(self):
+        """
+        Follow the file and publish the new logs until the tailer stops.
+        """
+
+        self.run_lock.acquire()
+        self.is_running = True
+        self.run_lock.release()
+
+        # the logs of a followed file come in real time
+        self.clock.start(time.time())
+
+        self.open(at_end=not self.from_start)
+
+        # resume from a checkpoint if the file is the same and long enough
+        if self.start_position is not None and self.file is not None:
+            inode, offset = self.start_position
+            same_file = inode == self.inode and offset <= os.fstat(self.file.fileno()).st_size
+            self.offset = offset if same_file else 0
+            self.line_position = (self.inode, self.offset)
+
+        poll_interval = self.min_poll_interval
+
+        while not self.stop_event.is_set():
+
+            if self.poll():
+                poll_interval = self.min_poll_interval
+            else:
+                poll_interval = min(2*poll_interval, self.max_poll_interval)
+                self.stop_event.wait(poll_interval)
+
+        if self.file is not None:
+            self.file.close()
+
+    def open(self, at_end=False):
+        """
+        Function that opens the file to follow, if it exists.
+
+        Parameters
+        ----------
+        at_end : bool
+            True to start reading at the end of the file.
+        """
+
+        try:
+            self.file = open(self.src_file, "rb")
+        except FileNotFoundError:
+            self.file = None
+            return
+
+        stat = os.fstat(self.file.fileno())
+        self.inode = stat.st_ino
+        self.offset = stat.st_size if at_end else 0
+        self.remainder = b""
+        self.line_position = (self.inode, self.offset)
+
+    def poll(self):
+        """
+        Function that publishes the lines written since the last poll.
+
+        Returns
+        -------
+        new_data : bool
+            True if new bytes were read.
+        """
+
+        if self.file is None:
+            self.open()
+            if self.file is None:
+                return False
+
+        nb_bytes = self.read_new_lines()
+
+        # the end of the file is not reached yet
+        if nb_bytes == self.block_size:
+            return True
+        new_data = nb_bytes > 0
+
+        try:
+            stat = os.stat(self.src_file)
+        except FileNotFoundError:
+            # the file was moved and not yet replaced, keep the old one
+            return new_data
+
+        # rotation: the path points to a new file, the old one was read until its end
+        if stat.st_ino != os.fstat(self.file.fileno()).st_ino:
+            self.file.close()
+            self.nb_rotations += 1
+            self.open()
+            return True
+
+        # truncation: the file is shorter than the offset, restart from its beginning
+        if stat.st_size < self.offset:
+            self.nb_truncations += 1
+            self.offset = 0
+            self.remainder = b""
+            self.line_position = (self.inode, 0)
+            return True
+
+        return new_data
+
+    def read_new_lines(self):
+        """
+        Function that reads the bytes written after the offset and publishes the complete lines.
+
+        Returns
+        -------
+        nb_bytes : int
+            number of bytes read.
+        """
+
+        self.file.seek(self.offset)
+        data = self.file.read(self.block_size)
+        if not data:
+            return 0
+        nb_bytes = len(data)
+        self.offset += nb_bytes
+
+        # keep the incomplete last line for the next poll
+        data = self.remainder + data
+        last_line_end = data.rfind(b"\n") + 1
+        data, self.remainder = data[:last_line_end], data[last_line_end:]
+
+        lines = data.decode(errors="replace").splitlines()
+        try:
+            batch = self.parse_lines(lines)
+        except (ValueError, TypeError, KeyError, csv.Error):
+            # a line being written by several processes can be corrupted,
+            # parse the lines one by one to only skip the invalid ones
+            batch = []
+            for line in lines:
+                try:
+                    batch.extend(self.parse_lines([line]))
+                except (ValueError, TypeError, KeyError, csv.Error):
+                    self.nb_invalid_lines += 1
+
+        # the position moves with the publication (see drain)
+        self.run_lock.acquire()
+        self.channel.publish(batch, block=False)
+        self.line_position = (self.inode, self.offset - len(self.remainder))
+        self.run_lock.release()
+
+        return nb_bytes
+
+    def parse_lines(self, lines):
+        """
+        Function that deserializes csv lines of logs.
+
+        Parameters
+        ----------
+        lines : list of str
+            csv lines, the header and the empty lines are skipped.
+
+        Returns
+        -------
+        logs : list of LogRecord
+            the deserialized logs.
+        """
+
+        return [self.log_deserializer(values)
+                for values in csv.reader(lines, quoting=csv.QUOTE_NONNUMERIC)
+                if values and tuple(values) != LOG_HEADER]
+
+
+if __name__ == "__main__":
+
+    # Small test
+    filename = "data/sample_csv.txt"
+    lt = LogTailer(filename, from_start=True)
+
+    lt.start()
+    time.sleep(1)
+    print(len(lt.empty_buffer()))
+    lt.stop()
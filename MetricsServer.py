@@ -0,0 +1,258 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+
+# Content types of the formats of the metrics
+CONTENT_TYPES = {"prometheus": "text/plain; version=0.0.4; charset=utf-8",
+                 "json": "application/json"}
+
+# Format served at each path of the endpoint
+METRICS_PATHS = {"/metrics": "prometheus", "/metrics.json": "json"}
+
+
+def escape_label(value):
+    """
+    Function that escapes the value of a Prometheus label.
+
+    Parameters
+    ----------
+    value : object
+        value of the label.
+
+    Returns
+    -------
+    escaped : str
+        the value with the backslashes, quotes and new lines escaped.
+    """
+
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_report(snapshot):
+    """
+    Function that formats a snapshot of the metrics in the Prometheus text format.
+
+    Parameters
+    ----------
+    snapshot : dict
+        metrics published by the analysis (see MetricsServer.publish), with
+        the "traffic", "history", "sections", "rules" and "alerts" parts
+        (and "ingestion" for the logs received from the network).
+
+    Returns
+    -------
+    report : str
+        the metrics, one family after the other.
+    """
+
+    families = []
+
+    def family(name, kind, description, samples):
+        if samples:
+            lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                labels = ",".join(f'{label}="{escape_label(label_value)}"' for label, label_value in labels)
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+            families.append("\n".join(lines))
+
+    traffic = snapshot.get("traffic", {})
+    if traffic:
+        family("logmon_requests_total", "counter", "Number of requests counted.",
+               [((), traffic["requests_total"])])
+        family("logmon_dropped_logs_total", "counter", "Number of logs dropped by the channel.",
+               [((), traffic["dropped_logs"])])
+        family("logmon_last_update_timestamp_seconds", "gauge", "Date of the last traffic update.",
+               [((), traffic["date"])])
+        family("logmon_traffic_threshold", "gauge", "Average traffic threshold of the alerts in requests per second.",
+               [((), traffic["threshold"])])
+
+    ingestion = snapshot.get("ingestion", {})
+    family("logmon_ingested_lines_total", "counter",
+           "Number of log lines received from the network, parsed into logs and invalid.",
+           [((("state", state),), count) for state, count in ingestion.items()])
+
+    averages = [((("window", "2min"),), traffic["average"])] if traffic else []
+    averages += [((("window", label),), average) for label, average in snapshot.get("history", {}).items()]
+    family("logmon_traffic_average", "gauge", "Average traffic over a window in requests per second.", averages)
+
+    sections = snapshot.get("sections", {})
+    family("logmon_section_requests", "gauge", "Number of requests of the top sections during the last stats window.",
+           [((("section", section),), stats["requests"]) for section, stats in sections.items()])
+    family("logmon_section_distinct_hosts", "gauge",
+           "Approximate number of distinct hosts of the top sections during the last stats window.",
+           [((("section", section),), stats["distinct_hosts"]) for section, stats in sections.items()])
+    family("logmon_section_status_requests", "gauge",
+           "Number of requests of the top sections per status during the last stats window.",
+           [((("section", section), ("status", status)), count)
+            for section, stats in sections.items() for status, count in stats["status"].items()])
+    family("logmon_section_response_bytes", "gauge",
+           "Quantiles of the response sizes of the top sections during the last stats window.",
+           [((("section", section), ("quantile", quantile)), size)
+            for section, stats in sections.items() for quantile, size in stats["response_bytes"].items()])
+
+    alerts = snapshot.get("alerts", {})
+    rules = snapshot.get("rules", {})
+    active = [((("rule", "traffic"),), int(alerts["traffic_alert"]))] if alerts else []
+    active += [((("rule", name),), int(rule["alert"])) for name, rule in rules.items()]
+    family("logmon_alert_active", "gauge", "1 if the alert of the rule is in progress.", active)
+    if alerts:
+        family("logmon_alerts_total", "counter", "Number of alerts triggered.", [((), alerts["total"])])
+    family("logmon_rule_value", "gauge", "Value of the alert rule on its window.",
+           [((("rule", name),), rule["value"]) for name, rule in rules.items()])
+    family("logmon_rule_threshold", "gauge", "Threshold of the alert rule.",
+           [((("rule", name),), rule["threshold"]) for name, rule in rules.items()])
+
+    return "\n".join(families) + "\n"
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """
+    Class that answers the requests of the metrics endpoint.
+    """
+
+    def do_GET(self):
+        metrics_format = METRICS_PATHS.get(self.path.split("?")[0])
+        if metrics_format is None:
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.serialize(metrics_format)
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[metrics_format])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # the requests are not printed on the console
+        pass
+
+
+class MetricsServer:
+    """
+    Class that serves the metrics of the analysis on a local HTTP endpoint.
+
+    The analysis publishes the counters it already computed at each update
+    (a few small dictionaries), which only costs a lock and a dict update
+    on the ingest path. The metrics are serialized by the thread of the first
+    scrape after an update, then the serialized output is cached until the next
+    update, so frequent scrapes cost nothing to the analysis.
+
+    "/metrics" serves the Prometheus text format and "/metrics.json" a json snapshot.
+    """
+
+    def __init__(self, host="127.0.0.1", port=9100):
+        """
+        Parameters
+        ----------
+        host : str
+            address where to listen, default to the local machine only.
+        port : int
+            port where to listen, 0 to let the system choose a free port.
+        """
+
+        self.host = host
+
+        # last published parts of the metrics and number of publications
+        self.parts = {}
+        self.version = 0
+
+        # serialized metrics of each format, with the version they were built from
+        self.cache = {}
+
+        # Instanciate Lock object to concurently access to the metrics.
+        self.lock = Lock()
+
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server.metrics = self
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def port(self):
+        """
+        Port where the server listens.
+        """
+
+        return self.server.server_address[1]
+
+    def start(self):
+        """
+        Function that starts serving the metrics.
+        """
+
+        self.thread.start()
+
+    def stop(self):
+        """
+        Function that stops the server.
+        """
+
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.thread.join()
+        self.server.server_close()
+
+    def publish(self, **parts):
+        """
+        Function that replaces some parts of the metrics.
+
+        Parameters
+        ----------
+        **parts : dict
+            new value of each part, only built-in types (the parts are not copied,
+            so they should not be modified after their publication).
+        """
+
+        with self.lock:
+            self.parts.update(parts)
+            self.version += 1
+
+    def snapshot(self):
+        """
+        Function that returns the last published metrics.
+
+        Returns
+        -------
+        snapshot : dict
+            the last value of each part.
+        """
+
+        with self.lock:
+            return dict(self.parts)
+
+    def serialize(self, metrics_format):
+        """
+        Function that returns the serialized metrics, built again only after a publication.
+
+        Parameters
+        ----------
+        metrics_format : str
+            "prometheus" or "json".
+
+        Returns
+        -------
+        body : bytes
+            the metrics in the format.
+        """
+
+        with self.lock:
+            version = self.version
+            cached = self.cache.get(metrics_format)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            snapshot = dict(self.parts)
+
+        # the serialization does not hold the lock of the publications
+        if metrics_format == "prometheus":
+            body = prometheus_report(snapshot).encode()
+        else:
+            body = json.dumps(snapshot).encode()
+
+        with self.lock:
+            cached = self.cache.get(metrics_format)
+            if cached is None or cached[0] < version:
+                self.cache[metrics_format] = (version, body)
+
+        return body
@@ -0,0 +1,183 @@
+import math
+from array import array
+
+
+class RingSeries:
+    """
+    Class that defines a time series of counts with a fixed resolution
+    stored in a preallocated ring buffer.
+
+    The series keeps the counts of the last length slots of step seconds,
+    the memory is fixed (8 bytes per slot). When the series moves to a new
+    slot, the slots that are overwritten are set to 0, so an update costs
+    O(1) when the series is fed regularly.
+    """
+
+    def __init__(self, step, length):
+        """
+        Parameters
+        ----------
+        step : float
+            duration of a slot in seconds.
+        length : int
+            number of slots kept in the series.
+        """
+
+        if step <= 0 or length < 1:
+            raise ValueError("step and length should be positive numbers")
+
+        self.step = step
+        self.length = length
+
+        # counts of the slots, the slot number n is stored at n % length
+        self.values = array("q", bytes(8*length))
+
+        # number of the most recent slot, None while the series is empty
+        self.last_slot = None
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def span(self):
+        """
+        Duration covered by the series in seconds.
+        """
+
+        return self.step*self.length
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the counts in bytes.
+        """
+
+        return self.values.itemsize*self.length
+
+    def slot_of(self, date):
+        """
+        Function that returns the number of the slot of a date.
+
+        Parameters
+        ----------
+        date : float
+            date in seconds.
+
+        Returns
+        -------
+        slot : int
+            number of the slot containing the date.
+        """
+
+        return math.floor(date/self.step)
+
+    def is_kept(self, slot):
+        """
+        Function that checks if a slot is still stored in the series.
+
+        Parameters
+        ----------
+        slot : int
+            number of the slot.
+
+        Returns
+        -------
+        kept : bool
+            True if the slot is stored in the ring buffer.
+        """
+
+        return self.last_slot is not None and self.last_slot - self.length < slot <= self.last_slot
+
+    def add(self, date, count=1):
+        """
+        Function that adds a count to the slot of a date.
+
+        Parameters
+        ----------
+        date : float
+            date of the count in seconds.
+        count : int
+            count to add.
+
+        Returns
+        -------
+        added : bool
+            False if the date is too old to be stored in the series.
+        """
+
+        slot = self.slot_of(date)
+
+        if self.last_slot is None:
+            self.last_slot = slot
+        elif slot > self.last_slot:
+            # clear the slots that are reused for the new dates
+            for cleared in range(max(self.last_slot + 1, slot - self.length + 1), slot + 1):
+                self.values[cleared % self.length] = 0
+            self.last_slot = slot
+        elif slot <= self.last_slot - self.length:
+            return False
+
+        self.values[slot % self.length] += count
+        return True
+
+    def get(self, date):
+        """
+        Function that returns the count of the slot of a date.
+
+        Parameters
+        ----------
+        date : float
+            date in seconds.
+
+        Returns
+        -------
+        count : int
+            count of the slot, 0 if the slot is not stored.
+        """
+
+        slot = self.slot_of(date)
+        return self.values[slot % self.length] if self.is_kept(slot) else 0
+
+    def sum(self, start, end):
+        """
+        Function that returns the total count of the slots between two dates.
+
+        Parameters
+        ----------
+        start : float
+            first date in seconds (its slot is included).
+        end : float
+            last date in seconds (its slot is excluded).
+
+        Returns
+        -------
+        total : int
+            total count of the stored slots of the range.
+        """
+
+        return sum(count for _, count in self.range(start, end))
+
+    def range(self, start, end):
+        """
+        Function that returns the counts of the slots between two dates.
+
+        Parameters
+        ----------
+        start : float
+            first date in seconds (its slot is included).
+        end : float
+            last date in seconds (its slot is excluded).
+
+        Returns
+        -------
+        counts : list of (float, int)
+            start date and count of each stored slot of the range.
+        """
+
+        if self.last_slot is None:
+            return []
+
+        first = max(self.slot_of(start), self.last_slot - self.length + 1)
+        last = min(self.slot_of(end), self.last_slot + 1)
+
+        return [(slot*self.step, self.values[slot % self.length]) for slot in range(first, last)]
@@ -0,0 +1,137 @@
+from LogBatch import LogBatch
+
+
+class RotatedLogParser:
+    """
+    Class that defines a parser of a directory of rotated log files
+    (access.log, access.log.1, access.log.2.gz...), read as one continuous stream.
+
+    The files are read one after the other in the order of the date of
+    their first log, each one with the parser of its format (see log_formats),
+    and the batches of all the files share the same Interner objects. The
+    files that end before the start date or start after the end date are not read.
+    """
+
+    def __init__(self, parsers, first_dates, start_date=None, end_date=None):
+        """
+        Parameters
+        ----------
+        parsers : list of BulkParser
+            parsers of the files, sorted by the date of their first log.
+        first_dates : list of float
+            date of the first log of each file.
+        start_date : float or None
+            if given, the logs start from the first log of this date.
+        end_date : float or None
+            if given, the logs stop before the first log of this date.
+        """
+
+        self.parsers = parsers
+        self.first_dates = first_dates
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __iter__(self):
+        return self.read_batches()
+
+    @property
+    def nb_lines(self):
+        """
+        Number of lines parsed in all the files.
+        """
+
+        return sum(parser.nb_lines for parser in self.parsers)
+
+    @property
+    def nb_bad_lines(self):
+        """
+        Number of lines of all the files that could not be parsed.
+        """
+
+        return sum(parser.nb_bad_lines for parser in self.parsers)
+
+    @property
+    def nb_decompressed_bytes(self):
+        """
+        Number of bytes decompressed from all the compressed files.
+        """
+
+        return sum(parser.nb_decompressed_bytes for parser in self.parsers)
+
+    @property
+    def decompression_time(self):
+        """
+        Time spent decompressing the compressed files, in seconds.
+        """
+
+        return sum(parser.decompression_time for parser in self.parsers)
+
+    def selected_parsers(self):
+        """
+        Generator over the parsers of the files that contain logs of the date range.
+
+        Returns
+        -------
+        parsers : generator of BulkParser
+            the parsers of the files to read, in the order of the files.
+        """
+
+        for i, parser in enumerate(self.parsers):
+
+            # the next files start after the end date
+            if self.end_date is not None and self.first_dates[i] >= self.end_date:
+                return
+
+            # the file ends before the start date if the next one starts before it
+            if self.start_date is not None and i + 1 < len(self.parsers) and \
+                    self.first_dates[i + 1] < self.start_date:
+                continue
+
+            yield parser
+
+    def read_batches(self, batch=None):
+        """
+        Generator over the batches of logs of all the files.
+
+        Parameters
+        ----------
+        batch : LogBatch or None
+            empty batch whose Interner objects are used by all the batches,
+            new Interner objects are created if None.
+
+        Returns
+        -------
+        stream : generator of LogBatch
+            the batches of the files, one file after the other.
+        """
+
+        if batch is None:
+            batch = LogBatch()
+
+        for parser in self.selected_parsers():
+            yield from parser.read_batches(batch)
+
+    def read_logs(self):
+        """
+        Generator over the deserialized logs of all the files (see Deserializer).
+
+        Returns
+        -------
+        stream : generator of LogRecord
+            the logs of the files, one file after the other.
+        """
+
+        for parser in self.selected_parsers():
+            yield from parser.read_logs()
+
+    def decompression_throughput(self):
+        """
+        Function that returns the throughput of the decompression of the files.
+
+        Returns
+        -------
+        throughput : float
+            decompressed MB per second of decompression, 0 if no file is compressed.
+        """
+
+        return self.nb_decompressed_bytes/self.decompression_time/1e6 if self.decompression_time else 0.
@@ -0,0 +1,82 @@
+import heapq
+from itertools import count
+from threading import Lock
+
+
+class Scheduler:
+    """
+    Class that defines a scheduler of events in simulated time.
+
+    The events are stored in a heap sorted by date. The thread that runs
+    the scheduler sleeps on the SimulationClock until the date of the next
+    event, so it only wakes up when an event is due, when an earlier event
+    is scheduled, or when the clock is stopped.
+    """
+
+    def __init__(self, clock):
+        """
+        Parameters
+        ----------
+        clock : SimulationClock
+            clock that gives the simulated time.
+        """
+
+        self.clock = clock
+
+        # Instanciate Lock object to concurently access to the heap.
+        self.lock = Lock()
+
+        # Heap of (date, order, callback), the order keeps the events
+        # scheduled at the same date in the order of their scheduling.
+        self.events = []
+        self.order = count()
+
+        # True when an event was scheduled while the scheduler was waiting
+        self.modified = False
+
+    def schedule(self, date, callback):
+        """
+        Function that schedules a function call at a simulated date.
+
+        Parameters
+        ----------
+        date : float
+            simulated date of the call in seconds.
+        callback : function
+            function to call, it receives the date of the event.
+        """
+
+        with self.lock:
+            heapq.heappush(self.events, (date, next(self.order), callback))
+            self.modified = True
+
+        # wake up the scheduler to wait for the new event if it is earlier
+        self.clock.notify()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.events)
+
+    def run(self):
+        """
+        Run the events in chronological order until the clock is stopped.
+        """
+
+        while True:
+
+            with self.lock:
+                self.modified = False
+                date = self.events[0][0] if self.events else float("inf")
+
+            if not self.clock.wait_until(date, interrupt=lambda: self.modified):
+                if self.clock.stopped:
+                    return
+                continue
+
+            # run all the events that are due
+            while True:
+                with self.lock:
+                    if not self.events or self.events[0][0] > date:
+                        break
+                    event_date, _, callback = heapq.heappop(self.events)
+                callback(event_date)
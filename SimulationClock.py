@@ -0,0 +1,228 @@
+import time
+from threading import Condition
+
+
+class SimulationClock:
+    """
+    Class that defines the clock of a log replay simulation.
+
+    The clock maps the real time onto the csv-based time. It can run in
+    real time (speed=1), N times faster than real time (speed=N) or
+    as fast as possible (speed=None). In the latter case, the simulated
+    time is a virtual time that only moves forward with the dates of
+    the replayed logs.
+
+    The same clock object is shared by the LogGenerator and the ConsoleApp
+    so that all the time windows are driven by the log timestamps.
+
+    The threads wait for a simulated date with wait_until, they are woken up
+    exactly when the date is reached (or when the virtual time moves forward),
+    and when the clock is stopped.
+    """
+
+    def __init__(self, speed=1.):
+        """
+        Parameters
+        ----------
+        speed : float or None
+            Speed factor of the simulation compared to the real time.
+            If None, the simulation runs as fast as possible.
+        """
+
+        if speed is not None and speed <= 0:
+            raise ValueError("speed should be a positive number or None")
+
+        self.speed = speed
+
+        # Condition object to concurently access to variables and wait for dates.
+        self.condition = Condition()
+
+        # Variables to map the real time onto the simulated time.
+        self.start_date = None
+        self.real_start_time = time.time()
+        self.virtual_time = None
+
+        # Variables to handle the end of the simulation
+        self.stopped = False
+        self.finished = False
+
+    def is_virtual(self):
+        """
+        Function that tells if the clock runs as fast as possible.
+
+        Returns
+        -------
+        virtual : bool
+            True if the simulated time is only driven by the logs.
+        """
+
+        return self.speed is None
+
+    def is_started(self):
+        """
+        Function that tells if the simulation started.
+
+        Returns
+        -------
+        started : bool
+            True if the start date of the simulation is known.
+        """
+
+        with self.condition:
+            return self.start_date is not None
+
+    def start(self, start_date):
+        """
+        Start the clock at the given csv-based date.
+
+        Parameters
+        ----------
+        start_date : float
+            Simulated date in seconds corresponding to the current real time.
+        """
+
+        with self.condition:
+            self.start_date = start_date
+            self.real_start_time = time.time()
+            self.virtual_time = start_date
+            self.condition.notify_all()
+
+    def now(self):
+        """
+        Function that returns the current simulated date.
+
+        Returns
+        -------
+        date : float
+            Current csv-based date in seconds (real date if the simulation
+            did not start yet).
+        """
+
+        with self.condition:
+            if self.start_date is None:
+                return time.time()
+            if self.speed is None:
+                return self.virtual_time
+            return self.start_date + (time.time() - self.real_start_time)*self.speed
+
+    def advance(self, date):
+        """
+        Move the virtual time forward to the given date.
+        This function has no effect if the clock is not virtual.
+
+        Parameters
+        ----------
+        date : float
+            New simulated date in seconds, ignored if it is in the past.
+        """
+
+        with self.condition:
+            if self.speed is None and date > self.virtual_time:
+                self.virtual_time = date
+                self.condition.notify_all()
+
+    def time_until(self, date):
+        """
+        Function that returns the real time to wait before reaching a simulated date.
+
+        Parameters
+        ----------
+        date : float
+            Simulated date in seconds.
+
+        Returns
+        -------
+        delay : float
+            Number of real seconds to wait (0 if the date is already reached
+            or if the clock is virtual).
+        """
+
+        if self.speed is None:
+            return 0.
+        return max(0., (date - self.now())/self.speed)
+
+    def wait_until(self, date, interrupt=None):
+        """
+        Function that waits until the simulated time reaches a date.
+
+        When the clock is finished, the virtual time is no longer driven by
+        the logs and directly jumps to the awaited dates.
+
+        Parameters
+        ----------
+        date : float
+            Simulated date in seconds (the function also waits for
+            the start of the simulation).
+        interrupt : function or None
+            Function called each time the waiting thread is woken up
+            (see notify), the waiting stops if it returns True.
+
+        Returns
+        -------
+        reached : bool
+            True if the date is reached, False if the clock was stopped
+            or the waiting was interrupted.
+        """
+
+        with self.condition:
+            while not self.stopped:
+
+                if interrupt is not None and interrupt():
+                    return False
+
+                if self.start_date is None:
+                    self.condition.wait()
+                elif self.speed is None:
+                    if self.virtual_time >= date:
+                        return True
+                    if self.finished and date != float("inf"):
+                        self.virtual_time = date
+                        return True
+                    self.condition.wait()
+                else:
+                    delay = (date - self.now())/self.speed
+                    if delay <= 0:
+                        return True
+                    self.condition.wait(delay if delay != float("inf") else None)
+
+        return False
+
+    def notify(self):
+        """
+        Wake up all the threads waiting for a date.
+        """
+
+        with self.condition:
+            self.condition.notify_all()
+
+    def finish(self):
+        """
+        Mark the end of the logs. In a virtual simulation, the time then
+        moves forward freely with the awaited dates.
+        """
+
+        with self.condition:
+            self.finished = True
+            self.condition.notify_all()
+
+    def is_finished(self):
+        """
+        Function that tells if the end of the logs was reached.
+
+        Returns
+        -------
+        finished : bool
+            True if there are no more logs.
+        """
+
+        with self.condition:
+            return self.finished
+
+    def stop(self):
+        """
+        Stop the clock, all the waiting threads are woken up.
+        """
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
@@ -0,0 +1,147 @@
+import heapq
+import itertools
+from operator import itemgetter
+
+
+class SpaceSaving:
+    """
+    Class that defines a Space-Saving sketch of the most frequent keys of a stream.
+
+    At most capacity keys are monitored. When a new key comes and the sketch
+    is full, the key with the smallest count is replaced by the new key, which
+    inherits its count. The count of a monitored key is never below its true
+    count, and overestimates it by at most total/capacity (stored in errors).
+    Any key whose true count is above total/capacity is monitored.
+
+    The smallest count is found with a min-heap whose outdated entries are
+    skipped, so an update costs O(log(capacity)) whatever the number of keys.
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Parameters
+        ----------
+        capacity : int
+            maximum number of monitored keys (memory budget).
+        """
+
+        if capacity < 1:
+            raise ValueError("capacity should be a positive number")
+
+        self.capacity = capacity
+
+        # count and overestimation of each monitored key
+        self.counts = {}
+        self.errors = {}
+
+        # heap of (count, order, key), the entries whose count changed are outdated,
+        # the order avoids comparing the keys
+        self.heap = []
+        self.order = itertools.count()
+
+        # total count of the stream
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def add(self, key, count=1):
+        """
+        Function that counts a key.
+
+        Parameters
+        ----------
+        key : hashable
+            key to count.
+        count : int
+            number of occurrences of the key.
+
+        Returns
+        -------
+        evicted : hashable or None
+            the key that is no longer monitored, if any.
+        """
+
+        self.total += count
+        evicted = None
+
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+        else:
+            # replace the key with the smallest count
+            evicted, min_count = self.pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[key] = min_count + count
+            self.errors[key] = min_count
+
+        heapq.heappush(self.heap, (self.counts[key], next(self.order), key))
+
+        # forget the outdated entries of the heap
+        if len(self.heap) > 4*self.capacity:
+            self.heap = [(key_count, next(self.order), key) for key, key_count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+        return evicted
+
+    def pop_min(self):
+        """
+        Function that removes the key with the smallest count from the heap.
+
+        Returns
+        -------
+        key : hashable
+            the key with the smallest count.
+        count : int
+            its count.
+        """
+
+        while True:
+            key_count, _, key = heapq.heappop(self.heap)
+            if self.counts.get(key) == key_count:
+                return key, key_count
+
+    def top(self, k):
+        """
+        Function that returns the keys with the highest counts.
+
+        Parameters
+        ----------
+        k : int
+            number of keys.
+
+        Returns
+        -------
+        top : list of (hashable, int)
+            the k keys with the highest counts and their counts, sorted by count.
+        """
+
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+    def max_error(self):
+        """
+        Function that returns the maximum overestimation of the counts.
+
+        Returns
+        -------
+        error : float
+            bound on the overestimation of the count of any key.
+        """
+
+        return self.total/self.capacity
+
+    def reset(self):
+        """
+        Function that forgets all the keys.
+        """
+
+        self.counts.clear()
+        self.errors.clear()
+        self.heap = []
+        self.total = 0
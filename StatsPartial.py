@@ -0,0 +1,261 @@
+from collections import Counter
+
+from log_analyse_fcts import (add_distinct, add_response_bytes, get_section_from_route,
+                              new_section_sketches, new_section_stats)
+
+
+class StatsPartial:
+    """
+    Class that defines mergeable partial stats over a part of the logs.
+
+    The counters are keyed by strings and not by the ids of an Interner, so the
+    partials computed on different parts of the logs (for example by different
+    processes) can be merged. Merging the partials of all the parts gives exactly
+    the stats of a single pass over all the logs (see compute_stats).
+    """
+
+    def __init__(self):
+
+        self.nb_logs = 0
+
+        # number of requests per (section, status) and per (section, method)
+        self.count_status = Counter()
+        self.count_methods = Counter()
+
+        # sum of the bytes sent per section
+        self.bytes = Counter()
+
+        # number of requests per second
+        self.traffic = Counter()
+
+        # sketches of the distinct hosts and users and of the response sizes of each section
+        self.sketches = {}
+
+    def get_sketches(self, sections):
+        """
+        Function that returns the sketches of the sections, they are created if needed.
+
+        Parameters
+        ----------
+        sections : iterable of str
+            sections seen in the logs.
+
+        Returns
+        -------
+        sketches : dict
+            sketches of each section (see new_section_sketches).
+        """
+
+        for section in sections:
+            if section not in self.sketches:
+                self.sketches[section] = new_section_sketches()
+        return self.sketches
+
+    def add_logs(self, logs):
+        """
+        Function that adds a list of logs to the partial stats.
+
+        Parameters
+        ----------
+        logs : list of LogRecord
+            list of log objects
+
+        Returns
+        -------
+        partial : StatsPartial
+            the partial stats itself.
+        """
+
+        sections = [get_section_from_route(log.request.route) for log in logs]
+
+        for section, log in zip(sections, logs):
+            self.count_status[(section, log.status)] += 1
+            self.count_methods[(section, log.request.method)] += 1
+            self.bytes[section] += log.bytes
+            self.traffic[log.date] += 1
+
+        sketches = self.get_sketches(set(sections))
+        add_distinct(sketches, "distinct_hosts",
+                     set(zip(sections, (log.remotehost for log in logs))))
+        add_distinct(sketches, "distinct_users",
+                     set(zip(sections, (log.authuser for log in logs))))
+        add_response_bytes(sketches, Counter(zip(sections, (log.bytes for log in logs))))
+
+        self.nb_logs += len(logs)
+
+        return self
+
+    def add_batch(self, batch, start=0, end=None):
+        """
+        Function that adds the logs of a columnar batch to the partial stats.
+
+        The logs are counted on integer keys as in compute_batch_stats,
+        the strings are only looked up once per distinct key.
+
+        Parameters
+        ----------
+        batch : LogBatch
+            batch of logs
+        start : int
+            index of the first log to add.
+        end : int or None
+            index after the last log to add, default to the end of the batch.
+
+        Returns
+        -------
+        partial : StatsPartial
+            the partial stats itself.
+        """
+
+        section_ids = batch.section_ids[start:end]
+
+        count_status = Counter(map(lambda section, status: section << 16 | status,
+                                   section_ids, batch.status[start:end]))
+        count_methods = Counter(map(lambda section, method: section << 32 | method,
+                                    section_ids, batch.method_ids[start:end]))
+
+        for key, count in count_status.items():
+            self.count_status[(batch.sections.value(key >> 16), key & 0xFFFF)] += count
+
+        for key, count in count_methods.items():
+            self.count_methods[(batch.sections.value(key >> 32),
+                                batch.methods.value(key & 0xFFFFFFFF))] += count
+
+        # sum the bytes in a list indexed by the section ids
+        bytes_sums = [0]*len(batch.sections)
+        for section, nb_bytes in zip(section_ids, batch.bytes[start:end]):
+            bytes_sums[section] += nb_bytes
+        for section, nb_bytes in enumerate(bytes_sums):
+            if nb_bytes:
+                self.bytes[batch.sections.value(section)] += nb_bytes
+
+        self.traffic.update(batch.dates[start:end])
+        self.nb_logs += len(section_ids)
+
+        # the sketches are keyed by the section strings
+        section_of = batch.sections.value
+        sketches = self.get_sketches(map(section_of, set(section_ids)))
+        add_distinct(sketches, "distinct_hosts",
+                     {(section_of(section), host)
+                      for section, host in set(zip(section_ids, batch.host_ids[start:end]))},
+                     batch.hosts.value)
+        add_distinct(sketches, "distinct_users",
+                     {(section_of(section), user)
+                      for section, user in set(zip(section_ids, batch.user_ids[start:end]))},
+                     batch.users.value)
+        add_response_bytes(sketches, Counter(zip(map(section_of, section_ids), batch.bytes[start:end])))
+
+        return self
+
+    def merge(self, other):
+        """
+        Function that adds the partial stats of other logs.
+
+        Parameters
+        ----------
+        other : StatsPartial
+            partial stats to add.
+
+        Returns
+        -------
+        partial : StatsPartial
+            the partial stats itself.
+        """
+
+        self.nb_logs += other.nb_logs
+        self.count_status.update(other.count_status)
+        self.count_methods.update(other.count_methods)
+        self.bytes.update(other.bytes)
+        self.traffic.update(other.traffic)
+
+        for section, sketches in other.sketches.items():
+            if section in self.sketches:
+                for label, sketch in sketches.items():
+                    self.sketches[section][label].merge(sketch)
+            else:
+                self.sketches[section] = {label: sketch.copy() for label, sketch in sketches.items()}
+
+        return self
+
+    def get_state(self):
+        """
+        Function that returns the partial stats as plain data (lists, strings and numbers),
+        that can be sent to another process without pickle (see encode_summary).
+
+        Returns
+        -------
+        state : dict
+            counters as lists of [key..., count] and sketches of each section (see get_state of the sketches).
+        """
+
+        return {"nb_logs": self.nb_logs,
+                "count_status": [[section, status, count]
+                                 for (section, status), count in self.count_status.items()],
+                "count_methods": [[section, method, count]
+                                  for (section, method), count in self.count_methods.items()],
+                "bytes": list(self.bytes.items()),
+                "traffic": list(self.traffic.items()),
+                "sketches": {section: {label: sketch.get_state() for label, sketch in sketches.items()}
+                             for section, sketches in self.sketches.items()}}
+
+    def set_state(self, state):
+        """
+        Function that restores the partial stats from plain data.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state.
+
+        Raises
+        ------
+        ValueError
+            if a value of the state is not of the expected type.
+        """
+
+        try:
+            self.nb_logs = int(state["nb_logs"])
+            self.count_status = Counter({(str(section), int(status)): int(count)
+                                         for section, status, count in state["count_status"]})
+            self.count_methods = Counter({(str(section), str(method)): int(count)
+                                          for section, method, count in state["count_methods"]})
+            self.bytes = Counter({str(section): int(nb_bytes) for section, nb_bytes in state["bytes"]})
+            self.traffic = Counter({int(date): int(count) for date, count in state["traffic"]})
+
+            # only the sketches of new_section_sketches are restored
+            self.sketches = {}
+            for section, sketches in self.get_sketches(map(str, state["sketches"])).items():
+                for label, sketch in sketches.items():
+                    sketch.set_state(state["sketches"][section][label])
+        except (TypeError, KeyError, AttributeError, OverflowError):
+            raise ValueError("Not the state of partial stats")
+
+    def to_stats(self):
+        """
+        Function that converts the partial stats to the stats of compute_stats.
+
+        Returns
+        -------
+        total : int
+            The total number of requests
+        stats: dict
+            A dictionary gathering some statistics about the logs.
+        """
+
+        stats = {}
+
+        for (section, status), count in self.count_status.items():
+            section_stats = stats.get(section)
+            if section_stats is None:
+                section_stats = stats[section] = new_section_stats()
+            section_stats["count_status"][str(status)] = count
+            section_stats["nb_requests"] += count
+
+        for (section, method), count in self.count_methods.items():
+            stats[section]["count_methods"][method] = count
+
+        for section, sketches in self.sketches.items():
+            for label, sketch in sketches.items():
+                stats[section][label] = sketch.copy()
+
+        return self.nb_logs, stats
@@ -0,0 +1,215 @@
+import json
+import math
+import socket
+import zlib
+from collections import Counter
+from queue import Full, Queue
+from threading import Thread
+
+from AlertEngine import count_batch_requests, count_requests
+from StatsPartial import StatsPartial
+
+
+# Version of the format of the summaries
+SUMMARY_VERSION = 2
+
+# Maximum size of a frame and of a decompressed summary in bytes
+MAX_SUMMARY_SIZE = 1 << 24
+
+
+def encode_summary(summary):
+    """
+    Function that serializes a summary into a frame: its size on 4 bytes,
+    then the summary in json (only counters and sketch registers), compressed.
+
+    Parameters
+    ----------
+    summary : dict
+        summary of a tick (see SummaryExporter.summarize).
+
+    Returns
+    -------
+    frame : bytes
+        the frame to send.
+    """
+
+    state = dict(summary, partial=summary["partial"].get_state(),
+                 requests=[[*key, count] for key, count in summary["requests"].items()])
+    data = zlib.compress(json.dumps(state, separators=(",", ":")).encode(), 1)
+    return len(data).to_bytes(4, "big") + data
+
+
+def decode_summary(data):
+    """
+    Function that deserializes the content of a frame (without its size).
+
+    The summaries are plain data, so a frame can not run code when it is
+    decoded, and its decompressed size is bounded by MAX_SUMMARY_SIZE.
+
+    Parameters
+    ----------
+    data : bytes
+        content of a frame written by encode_summary.
+
+    Returns
+    -------
+    summary : dict or None
+        the summary, None if it is of another version.
+
+    Raises
+    ------
+    ValueError
+        if the frame is not a valid summary.
+    """
+
+    try:
+        decompressor = zlib.decompressobj()
+        text = decompressor.decompress(data, MAX_SUMMARY_SIZE)
+        if decompressor.unconsumed_tail:
+            raise ValueError("The summary is too large")
+
+        state = json.loads(text)
+        if state.get("version") != SUMMARY_VERSION:
+            return None
+
+        partial = StatsPartial()
+        partial.set_state(state["partial"])
+        requests = Counter({(str(section), int(status), str(host), str(method)): int(count)
+                            for section, status, host, method, count in state["requests"]})
+
+        return {"version": SUMMARY_VERSION, "node": str(state["node"]), "date": int(state["date"]),
+                "partial": partial, "requests": requests}
+    except (zlib.error, TypeError, KeyError, AttributeError, OverflowError):
+        raise ValueError("Not a summary")
+
+
+class SummaryExporter:
+    """
+    Class that sends the summaries of the traffic updates of an analysis
+    to an aggregator (see ClusterAggregator).
+
+    At each traffic update, the logs of the last second are summarized into
+    mergeable counters: their partial stats (requests per second, per section
+    and status or method, sketches of the distinct hosts and users and of the
+    response sizes, see StatsPartial) and their number per key of the alert
+    rules (see count_requests).
+    The summaries are sent by a background thread over a TCP connection, so
+    the analysis never waits for the network. If the aggregator is not
+    reachable, the connection is retried at the next summary and the
+    summaries that could not be sent are dropped (and counted).
+    """
+
+    def __init__(self, address, node=None, queue_size=1000):
+        """
+        Parameters
+        ----------
+        address : str
+            "host:port" of the aggregator.
+        node : str or None
+            name of the node in the summaries, default to the host name.
+        queue_size : int
+            maximum number of summaries waiting to be sent.
+        """
+
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.node = node if node is not None else socket.gethostname()
+
+        # summaries waiting to be sent, None stops the thread
+        self.summaries = Queue(maxsize=queue_size)
+        self.connection = None
+
+        # Counters of the summaries sent and dropped
+        self.nb_sent = 0
+        self.nb_dropped = 0
+
+        self.thread = Thread(target=self.send_summaries, daemon=True)
+        self.thread.start()
+
+    def summarize(self, date, logs):
+        """
+        Function that summarizes the logs of a traffic update.
+
+        Parameters
+        ----------
+        date : float
+            date of the update, all the logs before it were counted.
+        logs : list of LogRecord or LogBatch
+            logs counted by the update.
+
+        Returns
+        -------
+        summary : dict
+            node, date of the update (rounded up to the second), partial stats
+            and number of requests per key of the alert rules.
+        """
+
+        if isinstance(logs, list):
+            partial, requests = StatsPartial().add_logs(logs), count_requests(logs)
+        else:
+            partial, requests = StatsPartial().add_batch(logs), count_batch_requests(logs)
+
+        return {"version": SUMMARY_VERSION, "node": self.node, "date": math.ceil(date),
+                "partial": partial, "requests": requests}
+
+    def export(self, date, logs, block=False):
+        """
+        Function that summarizes the logs of a traffic update and queues the summary.
+
+        Parameters
+        ----------
+        date : float
+            date of the update, all the logs before it were counted.
+        logs : list of LogRecord or LogBatch
+            logs counted by the update.
+        block : bool
+            True to wait for space in the queue (replay as fast as possible),
+            otherwise the summary is dropped if the queue is full.
+        """
+
+        try:
+            self.summaries.put(self.summarize(date, logs), block=block)
+        except Full:
+            self.nb_dropped += 1
+
+    def send_summaries(self):
+        """
+        Function run by the background thread, that sends the queued summaries.
+        """
+
+        for summary in iter(self.summaries.get, None):
+            frame = encode_summary(summary)
+            try:
+                if self.connection is None:
+                    self.connection = socket.create_connection(self.address, timeout=5)
+                self.connection.sendall(frame)
+                self.nb_sent += 1
+            except OSError:
+                self.nb_dropped += 1
+                if self.connection is not None:
+                    self.connection.close()
+                    self.connection = None
+
+    def close(self):
+        """
+        Function that sends the queued summaries, then closes the connection.
+        """
+
+        self.summaries.put(None)
+        self.thread.join()
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+if __name__ == "__main__":
+
+    # Small test
+    from LogRecord import LogRecord, Request
+
+    exporter = SummaryExporter("127.0.0.1:7070")
+    summary = exporter.summarize(100.5, [LogRecord("10.0.0.1", "-", "-", 100, Request("GET", "/api/user", "HTTP/1.0"),
+                                                   200, 1234)])
+    print(len(encode_summary(summary)), "bytes")
+    exporter.close()
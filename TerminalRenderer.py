@@ -0,0 +1,109 @@
+import shutil
+import sys
+
+
+class TerminalRenderer:
+    """
+    Class that draws the reports on a terminal with ANSI escape codes.
+
+    The screen is made of named sections (drawn in the order of their first
+    update). The lines of a section are only split again when its text changes,
+    and a render only redraws the lines of the screen that changed since the
+    last render: the cursor is moved to the line and the line is rewritten,
+    so the terminal is never cleared (no flicker, no shell forked).
+    """
+
+    def __init__(self, output=None, width=None):
+        """
+        Parameters
+        ----------
+        output : file object or None
+            terminal where to draw, default to the standard output.
+        width : int or None
+            number of columns of the terminal, default to the size of the terminal.
+        """
+
+        self.output = output if output is not None else sys.stdout
+        self.width = width
+
+        # text and lines of each section
+        self.texts = {}
+        self.sections = {}
+
+        # lines on the screen and size of the terminal at the last render
+        self.screen = None
+        self.size = None
+
+    def update(self, name, text):
+        """
+        Function that changes the text of a section.
+
+        Parameters
+        ----------
+        name : str
+            name of the section.
+        text : str
+            new text of the section.
+
+        Returns
+        -------
+        changed : bool
+            True if the text of the section changed.
+        """
+
+        if self.texts.get(name) == text:
+            return False
+
+        self.texts[name] = text
+        self.sections[name] = text[:-1].split("\n") if text.endswith("\n") else text.split("\n")
+        return True
+
+    def render(self):
+        """
+        Function that draws the lines of the sections that changed since the last render.
+
+        Returns
+        -------
+        nb_lines : int
+            number of lines drawn.
+        """
+
+        size = shutil.get_terminal_size() if self.width is None else (self.width, None)
+        width = size[0]
+
+        frame = [line[:width] for lines in self.sections.values() for line in lines]
+
+        # the whole screen is drawn the first time and when the terminal is resized
+        if self.screen is None or size != self.size:
+            self.screen = []
+            commands = ["\033[?25l\033[H\033[2J"]
+        else:
+            commands = []
+
+        nb_lines = 0
+        for row, line in enumerate(frame):
+            if row >= len(self.screen) or self.screen[row] != line:
+                commands.append(f"\033[{row + 1};1H{line}\033[K")
+                nb_lines += 1
+
+        # erase the end of the previous screen
+        if len(frame) < len(self.screen):
+            commands.append(f"\033[{len(frame) + 1};1H\033[J")
+
+        if commands:
+            self.output.write("".join(commands))
+            self.output.flush()
+
+        self.screen = frame
+        self.size = size
+
+        return nb_lines
+
+    def close(self):
+        """
+        Function that moves the cursor below the screen and shows it again.
+        """
+
+        if self.screen is not None:
+            self.output.write(f"\033[{len(self.screen) + 1};1H\033[?25h\n")
+            self.output.flush()
@@ -0,0 +1,192 @@
+import heapq
+from collections import Counter
+
+from CountMinSketch import CountMinSketch
+from log_analyse_fcts import add_distinct, add_response_bytes, get_section_from_route, new_section_stats
+from SpaceSaving import SpaceSaving
+
+
+class TopSections:
+    """
+    Class that counts the requests of each section during a stats window
+    and gives the stats of the sections with the most requests.
+
+    In the exact mode, all the sections are counted. In the sketch mode, the
+    memory is bounded whatever the number of sections: a Space-Saving sketch
+    monitors the sections with the most requests, and a Count-Min sketch
+    tightens their estimated number of requests. The status, methods, distinct
+    hosts and users and response sizes are only counted for the monitored
+    sections, from the moment they are monitored.
+    In both modes, the report only costs O(number of counted sections).
+    """
+
+    def __init__(self, mode="exact", nb_sections=3, capacity=1000, epsilon=0.001, delta=0.01):
+        """
+        Parameters
+        ----------
+        mode : str
+            "exact" to count all the sections, "sketch" to bound the memory.
+        nb_sections : int
+            number of sections in the results.
+        capacity : int
+            maximum number of sections counted in the sketch mode,
+            the counts are overestimated by at most 1/capacity of the requests.
+        epsilon : float
+            relative error of the Count-Min sketch in the sketch mode.
+        delta : float
+            probability that the Count-Min sketch is above its error bound.
+        """
+
+        if mode not in ("exact", "sketch"):
+            raise ValueError(f"Unknown mode: {mode}")
+
+        self.mode = mode
+        self.nb_sections = nb_sections
+
+        # stats of the counted sections and total number of requests
+        self.stats = {}
+        self.total = 0
+
+        if mode == "sketch":
+            self.space_saving = SpaceSaving(capacity)
+            self.count_min = CountMinSketch(epsilon, delta)
+
+    def add(self, section, status, method, count=1):
+        """
+        Function that counts requests of a section.
+
+        Parameters
+        ----------
+        section : str
+            section of the requests.
+        status : int
+            status of the requests.
+        method : str
+            method of the requests.
+        count : int
+            number of requests.
+        """
+
+        self.total += count
+
+        if self.mode == "sketch":
+            self.count_min.add(section, count)
+            evicted = self.space_saving.add(section, count)
+            if evicted is not None:
+                del self.stats[evicted]
+
+        section_stats = self.stats.get(section)
+        if section_stats is None:
+            section_stats = self.stats[section] = new_section_stats()
+
+        count_status = section_stats["count_status"]
+        count_methods = section_stats["count_methods"]
+        count_status[str(status)] = count_status.get(str(status), 0) + count
+        count_methods[method] = count_methods.get(method, 0) + count
+        section_stats["nb_requests"] += count
+
+    def add_logs(self, logs):
+        """
+        Function that counts a list of logs, the logs are first
+        counted per distinct (route, method, status).
+
+        Parameters
+        ----------
+        logs : list of LogRecord
+            list of log objects
+        """
+
+        requests = Counter((log.request.route, log.request.method, log.status)
+                           for log in logs)
+
+        sections = {}
+        for (route, method, status), count in requests.items():
+            section = sections.get(route)
+            if section is None:
+                section = sections[route] = get_section_from_route(route)
+            self.add(section, status, method, count)
+
+        # count the distinct hosts and users of the counted sections
+        for label, field in (("distinct_hosts", "remotehost"), ("distinct_users", "authuser")):
+            pairs = {(sections[log.request.route], getattr(log, field)) for log in logs}
+            add_distinct(self.stats, label, {pair for pair in pairs if pair[0] in self.stats})
+
+        # distribution of the response sizes of the counted sections
+        response_bytes = Counter((sections[log.request.route], log.bytes) for log in logs)
+        add_response_bytes(self.stats, {pair: count for pair, count in response_bytes.items()
+                                         if pair[0] in self.stats})
+
+    def add_batch(self, batch, start=0, end=None):
+        """
+        Function that counts the logs of a columnar batch, the logs are
+        first counted per distinct (section id, method id, status).
+
+        Parameters
+        ----------
+        batch : LogBatch
+            batch of logs
+        start : int
+            index of the first log to count.
+        end : int or None
+            index after the last log to count, default to the end of the batch.
+        """
+
+        requests = Counter(map(lambda section, method, status: section << 48 | method << 16 | status,
+                               batch.section_ids[start:end], batch.method_ids[start:end],
+                               batch.status[start:end]))
+
+        for key, count in requests.items():
+            self.add(batch.sections.value(key >> 48), key & 0xFFFF,
+                     batch.methods.value(key >> 16 & 0xFFFFFFFF), count)
+
+        # count the distinct hosts and users of the counted sections
+        section_ids = batch.section_ids[start:end]
+        for label, ids, interner in (("distinct_hosts", batch.host_ids, batch.hosts),
+                                     ("distinct_users", batch.user_ids, batch.users)):
+            pairs = {(batch.sections.value(section), value)
+                     for section, value in set(zip(section_ids, ids[start:end]))}
+            add_distinct(self.stats, label, {pair for pair in pairs if pair[0] in self.stats},
+                         interner.value)
+
+        # distribution of the response sizes of the counted sections
+        response_bytes = Counter(zip(map(batch.sections.value, section_ids), batch.bytes[start:end]))
+        add_response_bytes(self.stats, {pair: count for pair, count in response_bytes.items()
+                                         if pair[0] in self.stats})
+
+    def result(self):
+        """
+        Function that returns the stats of the sections with the most requests.
+
+        Returns
+        -------
+        total : int
+            The total number of requests
+        stats: dict
+            the stats of the top sections (see compute_stats). In the sketch mode,
+            the number of requests is an upper bound of the true number.
+        """
+
+        if self.mode == "exact":
+            top = heapq.nlargest(self.nb_sections, self.stats.items(),
+                                 key=lambda item: item[1]["nb_requests"])
+            return self.total, dict(top)
+
+        stats = {}
+        for section, count in self.space_saving.top(self.nb_sections):
+            section_stats = dict(self.stats[section])
+            section_stats["nb_requests"] = min(count, self.count_min.estimate(section))
+            stats[section] = section_stats
+
+        return self.total, stats
+
+    def reset(self):
+        """
+        Function that forgets the requests of the last stats window.
+        """
+
+        self.stats = {}
+        self.total = 0
+
+        if self.mode == "sketch":
+            self.space_saving.reset()
+            self.count_min.reset()
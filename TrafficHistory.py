@@ -0,0 +1,152 @@
+from RingSeries import RingSeries
+
+
+# Resolutions of the traffic history: (duration of a slot, number of slots),
+# 1s for 10 minutes, 10s for a day and 1 minute for 30 days (~420 KB)
+HISTORY_RESOLUTIONS = ((1, 600), (10, 8640), (60, 43200))
+
+
+class TrafficHistory:
+    """
+    Class that stores the number of requests over time at several resolutions.
+
+    Each resolution is a RingSeries with a fixed number of slots, so the
+    memory is known up front whatever the duration of the monitoring. Every
+    count is added to each resolution (the coarser resolutions are the
+    downsampled sums of the finer ones), so an update costs O(number of
+    resolutions). The queries use the finest resolution that still stores
+    the start of the range.
+    """
+
+    def __init__(self, resolutions=HISTORY_RESOLUTIONS):
+        """
+        Parameters
+        ----------
+        resolutions : iterable of (float, int)
+            duration of a slot in seconds and number of slots of each resolution,
+            from the finest to the coarsest.
+        """
+
+        self.levels = [RingSeries(step, length) for step, length in resolutions]
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the counts in bytes.
+        """
+
+        return sum(level.nbytes for level in self.levels)
+
+    def add(self, date, count):
+        """
+        Function that adds a number of requests at a date.
+
+        Parameters
+        ----------
+        date : float
+            date of the requests in seconds.
+        count : int
+            number of requests.
+        """
+
+        for level in self.levels:
+            level.add(date, count)
+
+    def get(self, date):
+        """
+        Function that returns the number of requests of a second.
+
+        Parameters
+        ----------
+        date : float
+            date in seconds.
+
+        Returns
+        -------
+        count : int
+            number of requests of the slot of the finest resolution.
+        """
+
+        return self.levels[0].get(date)
+
+    def level(self, start):
+        """
+        Function that returns the finest resolution that stores a date.
+
+        Parameters
+        ----------
+        start : float
+            date in seconds.
+
+        Returns
+        -------
+        level : RingSeries
+            the finest resolution storing the date, the coarsest one if none does.
+        """
+
+        for level in self.levels:
+            if level.last_slot is None or level.slot_of(start) > level.last_slot - level.length:
+                return level
+
+        return self.levels[-1]
+
+    def sum(self, start, end):
+        """
+        Function that returns the number of requests between two dates,
+        the dates are rounded to the slots of the resolution used.
+
+        Parameters
+        ----------
+        start : float
+            first date in seconds.
+        end : float
+            last date in seconds (excluded).
+
+        Returns
+        -------
+        total : int
+            number of requests of the range.
+        """
+
+        return self.level(start).sum(start, end)
+
+    def average(self, end, duration):
+        """
+        Function that returns the average traffic of a window.
+
+        Parameters
+        ----------
+        end : float
+            end date of the window in seconds (excluded).
+        duration : float
+            duration of the window in seconds.
+
+        Returns
+        -------
+        avg_traffic : float
+            average traffic of the window (in requests per second).
+        """
+
+        return self.sum(end - duration, end)/duration
+
+    def range(self, start, end):
+        """
+        Function that returns the number of requests of each slot between two dates.
+
+        Parameters
+        ----------
+        start : float
+            first date in seconds.
+        end : float
+            last date in seconds (excluded).
+
+        Returns
+        -------
+        step : float
+            duration of the slots of the resolution used.
+        counts : list of (float, int)
+            start date and number of requests of each slot.
+        """
+
+        level = self.level(start)
+        return level.step, level.range(start, end)
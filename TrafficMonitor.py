@@ -0,0 +1,196 @@
+from Alert import Alert
+from AlertHistory import AlertHistory
+from TrafficHistory import HISTORY_RESOLUTIONS, TrafficHistory
+
+
+# Windows of the average traffic reported from the history
+HISTORY_WINDOWS = (("10min", 600), ("1h", 3600))
+
+
+class TrafficMonitor:
+    """
+    Class that monitors the average traffic on a sliding window
+    and manages the high traffic alerts.
+
+    The monitor is fed every second with the number of requests received
+    during the last second, it stores them in a multi-resolution history,
+    keeps the total number of requests of the sliding window and triggers
+    (or resolves) an alert when the average traffic crosses the threshold.
+    """
+
+    def __init__(self, avg_trafic_threshold=10, window_size=120, resolutions=HISTORY_RESOLUTIONS,
+                 alert_history=None):
+        """
+        Parameters
+        ----------
+        avg_trafic_threshold : float
+            Average traffic threshold to trigger alerts (in requests per second).
+        window_size : int
+            Size of the sliding window in seconds, default to 2 minutes.
+        resolutions : iterable of (float, int)
+            resolutions of the traffic history (see TrafficHistory), the first
+            one should have slots of 1 second covering the sliding window.
+        alert_history : AlertHistory or None
+            where to record the alerts, default to a new in-memory history.
+        """
+
+        # Threshold on the average traffic
+        self.avg_trafic_threshold = avg_trafic_threshold
+        self.window_size = window_size
+
+        # variable that stores the total number of requests
+        # on the sliding window.
+        self.total_traffic = 0
+        # we store the number of requests of each second in preallocated ring buffers.
+        self.history = TrafficHistory(resolutions)
+        if self.history.levels[0].step != 1 or self.history.levels[0].span < window_size:
+            raise ValueError("The finest resolution should store each second of the sliding window")
+
+        # date of the last update
+        self.last_date = None
+
+        # Variables for alerts: alert in progress (if any) and history of the alerts
+        self.alert = None
+        self.alert_history = alert_history if alert_history is not None else AlertHistory()
+
+    def update(self, nb_logs, date):
+        """
+        Function that adds the traffic of the last second to the sliding window.
+        The function manage also alerts if any.
+
+        Parameters
+        ----------
+        nb_logs : int
+            number of new logs that appeared during the last second
+        date : float
+            date of the update in seconds
+
+        Returns
+        -------
+        avg_traffic : float
+            average traffic on the sliding window (in requests per second)
+        alert : Alert or None
+            the alert that was triggered or resolved by this update, if any
+        """
+
+        if self.last_date is not None and date - self.last_date > 1:
+            # some seconds were not fed (restart from a checkpoint), sum the window again
+            self.history.add(date, nb_logs)
+            self.total_traffic = self.history.levels[0].sum(date - self.window_size + 1, date + 1)
+        else:
+            # update the total traffic, the second that leaves the window is still in the history
+            self.total_traffic -= self.history.get(date - self.window_size)
+            self.history.add(date, nb_logs)
+            self.total_traffic += nb_logs
+        self.last_date = date
+
+        # compute the average traffic
+        avg_traffic = self.total_traffic/self.window_size
+
+        # Handle alerts
+        if self.alert is not None:
+            # resolve alert if the condition is satisfied
+            if avg_traffic < self.avg_trafic_threshold:
+                alert, self.alert = self.alert, None
+                alert.resolve(date)
+                self.alert_history.record(alert)
+                return avg_traffic, alert
+        else:
+            # trigger and alert if the threshold was exceeded
+            if avg_traffic >= self.avg_trafic_threshold:
+                self.alert = Alert(date, avg_traffic)
+                self.alert_history.record(self.alert)
+                return avg_traffic, self.alert
+
+        return avg_traffic, None
+
+    def history_averages(self, windows=HISTORY_WINDOWS):
+        """
+        Function that computes the average traffic of longer windows from the
+        history, up to the last update.
+
+        Parameters
+        ----------
+        windows : iterable of (str, float)
+            label and duration in seconds of each window
+
+        Returns
+        -------
+        averages : dict
+            average traffic of each window (in requests per second)
+        """
+
+        if self.last_date is None:
+            return {}
+
+        return {label: self.history.average(self.last_date + 1, duration) for label, duration in windows}
+
+    def history_curve(self, duration=600, width=60):
+        """
+        Function that computes the traffic curve of the last minutes from the
+        history, up to the last update.
+
+        Parameters
+        ----------
+        duration : float
+            duration of the curve in seconds
+        width : int
+            number of points of the curve
+
+        Returns
+        -------
+        rates : list of float
+            average traffic of each point of the curve (in requests per second),
+            from the oldest to the most recent, empty before the first update
+        """
+
+        if self.last_date is None:
+            return []
+
+        # the points are aligned on multiples of their duration so that the curve
+        # only changes at its end, the last point is the average of its elapsed seconds
+        end = self.last_date + 1
+        column = duration/width
+        start = (self.last_date//column + 1)*column - duration
+
+        totals = [0]*width
+        for slot_date, count in self.history.range(start, end)[1]:
+            index = int((slot_date - start)//column)
+            if 0 <= index < width:
+                totals[index] += count
+
+        rates = [total/column for total in totals]
+        rates[-1] = totals[-1]/(end - (start + duration - column))
+        return rates
+
+    def get_state(self):
+        """
+        Function that returns the state of the monitor, for a checkpoint.
+
+        Returns
+        -------
+        state : dict
+            traffic history, total of the sliding window, date of the last
+            update and alert in progress.
+        """
+
+        return {"window_size": self.window_size, "history": self.history,
+                "total_traffic": self.total_traffic, "last_date": self.last_date, "alert": self.alert}
+
+    def set_state(self, state):
+        """
+        Function that restores the state of the monitor from a checkpoint.
+
+        Parameters
+        ----------
+        state : dict
+            state returned by get_state, for a sliding window of the same size.
+        """
+
+        if state["window_size"] != self.window_size:
+            raise ValueError("The size of the sliding window changed since the checkpoint")
+
+        self.history = state["history"]
+        self.total_traffic = state["total_traffic"]
+        self.last_date = state["last_date"]
+        self.alert = state["alert"]
@@ -0,0 +1,109 @@
+import argparse
+import os
+import socket
+import time
+from multiprocessing import Barrier, Process
+
+from bench_parser import create_bench_csv, format_log
+from LogGenerator import read_logs
+from LogListener import LogListener
+
+
+# Header of the syslog messages of nginx
+SYSLOG_PREFIX = "<190>Feb  7 21:11:00 web-1 nginx: "
+
+
+def create_messages(path, nb_lines):
+    """
+    Create the syslog messages of random logs in the Common Log Format.
+
+    Parameters
+    ----------
+    path : string
+        Path where to store the csv file of the random logs.
+    nb_lines : int
+        Number of messages.
+
+    Returns
+    -------
+    messages : list of bytes
+        messages ending with a new line character.
+    """
+
+    if not os.path.exists(path):
+        create_bench_csv(path, nb_lines)
+
+    return [(SYSLOG_PREFIX + format_log(log, "clf")).encode() for log in read_logs(path)][:nb_lines]
+
+
+def send(protocol, port, messages, barrier):
+    """
+    Send messages as fast as possible, one per datagram in UDP or in large chunks in TCP.
+    """
+
+    barrier.wait()
+
+    if protocol == "udp":
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for message in messages:
+                sock.sendto(message, ("127.0.0.1", port))
+    else:
+        data = b"".join(messages)
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            for start in range(0, len(data), 1 << 16):
+                sock.sendall(data[start:start + (1 << 16)])
+
+
+def bench(protocol, messages, nb_senders):
+    """
+    Blast the messages at a listener from several processes and print the sustained
+    throughput of the listener, from the first message to the last one received.
+    """
+
+    listener = LogListener(udp_port=0 if protocol == "udp" else None, tcp_port=0 if protocol == "tcp" else None)
+    listener.start()
+    port = listener.udp_port if protocol == "udp" else listener.tcp_port
+
+    barrier = Barrier(nb_senders + 1)
+    senders = [Process(target=send, args=(protocol, port, messages[i::nb_senders], barrier))
+               for i in range(nb_senders)]
+    for sender in senders:
+        sender.start()
+    barrier.wait()
+    start_time = last_time = time.time()
+
+    # consume the batches, until nothing is received for a second after the senders stopped
+    nb_received = 0
+    while nb_received < len(messages) and \
+            (any(sender.is_alive() for sender in senders) or time.time() - last_time < 1):
+        listener.empty_buffer()
+        if listener.nb_received != nb_received:
+            nb_received = listener.nb_received
+            last_time = time.time()
+        time.sleep(0.01)
+
+    listener.stop()
+    listener.join()
+    for sender in senders:
+        sender.join()
+
+    duration = last_time - start_time
+    print(f"{protocol} x{nb_senders:<3} {len(messages)} sent, {listener.nb_received} received, "
+          f"{listener.nb_parsed} parsed, {listener.nb_invalid_lines} invalid, {listener.nb_dropped} dropped, "
+          f"{listener.nb_parsed/duration:10.0f} lines/s")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark of the network log listener")
+    parser.add_argument("--nb_lines", type=int, default=1_000_000,
+                        help="number of log lines sent")
+    parser.add_argument("--nb_senders", type=int, default=2,
+                        help="number of sending processes")
+    parser.add_argument("--path", type=str, default="data/bench_listener_csv.txt",
+                        help="path of the generated csv file of the logs to send")
+    args = parser.parse_args()
+
+    messages = create_messages(args.path, args.nb_lines)
+    for protocol in ("tcp", "udp"):
+        bench(protocol, messages, args.nb_senders)
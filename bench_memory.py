@@ -0,0 +1,98 @@
+import argparse
+import csv
+import gc
+import os
+import tracemalloc
+
+from bench_parser import create_bench_csv
+from BulkParser import BulkParser
+from LogGenerator import get_log_deserializer, read_logs
+
+
+def read_dict_logs(src_file):
+    """
+    Read the logs of a csv file as nested dictionaries, the logs of the
+    analysis before LogRecord.
+
+    Parameters
+    ----------
+    src_file : string
+        Path to the csv file containing the logs.
+
+    Returns
+    -------
+    logs : list of dict
+        the deserialized logs.
+    """
+
+    log_deserializer = get_log_deserializer(compact=False)
+    with open(src_file) as f:
+        data = csv.reader(f, quoting=csv.QUOTE_NONNUMERIC)
+        next(data)
+        return [log_deserializer(values) for values in data]
+
+
+def read_batch(src_file):
+    """
+    Read the logs of a csv file in a single columnar batch, the buffer of the network listener.
+
+    Parameters
+    ----------
+    src_file : string
+        Path to the csv file containing the logs.
+
+    Returns
+    -------
+    batch : LogBatch
+        the logs of the file.
+    """
+
+    batches = iter(BulkParser(src_file))
+    batch = next(batches)
+    for other in batches:
+        batch.extend(other)
+    return batch
+
+
+def bench_memory(name, read, nb_lines):
+    """
+    Measure and print the memory used by buffered logs.
+
+    Parameters
+    ----------
+    name : string
+        Name of the buffer.
+    read : function
+        Function that reads the whole file and returns the buffered logs.
+    nb_lines : int
+        Number of logs in the file.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    buffer = read()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<30} {len(buffer)} logs {size/nb_lines:8.1f} bytes/log "
+          f"(peak {peak/nb_lines:8.1f} bytes/log)")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark of the memory of the buffered logs")
+    parser.add_argument("--nb_lines", type=int, default=100_000,
+                        help="number of lines of the generated csv file (10 s of a busy server)")
+    parser.add_argument("--path", type=str, default="data/bench_memory_csv.txt",
+                        help="path of the generated csv file")
+    args = parser.parse_args()
+
+    # the file is only generated once
+    if not os.path.exists(args.path):
+        create_bench_csv(args.path, args.nb_lines)
+
+    # the logs between two updates of the analysis are kept in a list (see ConsoleApp.traffic_update),
+    # or in a columnar batch when they come from the network (see LogListener)
+    bench_memory("nested dicts", lambda: read_dict_logs(args.path), args.nb_lines)
+    bench_memory("LogRecord", lambda: list(read_logs(args.path)), args.nb_lines)
+    bench_memory("LogBatch", lambda: read_batch(args.path), args.nb_lines)
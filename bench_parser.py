@@ -0,0 +1,161 @@
+import argparse
+import gzip
+import json
+import os
+import random
+import time
+
+from BulkParser import BulkParser
+from log_formats import LOG_FORMATS, get_parser
+from LogBatch import read_log_batches
+from LogGenerator import read_logs
+from utils import zstandard
+
+
+def create_bench_csv(path, nb_lines, seed=0):
+    """
+    create a csv file of random logs for the benchmarks
+
+    Parameters
+    ----------
+    path : string
+        Path where to store the csv file containing the fake logs.
+    nb_lines : int
+        Number of logs in the file.
+    seed : int
+        Seed of the random generator.
+    """
+
+    rng = random.Random(seed)
+    hosts = [f"10.0.0.{i}" for i in range(1, 6)]
+    users = ["apache", "mary", "john", "-"]
+    requests = [f"{method} /api/{section} HTTP/1.0"
+                for method in ("GET", "POST") for section in ("user", "help", "report")]
+    status = [200, 200, 200, 404, 500]
+
+    date = 1549573860
+
+    with open(path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+
+        for i in range(nb_lines):
+            if rng.random() < 0.001:
+                date += 1
+            f.write(f'"{rng.choice(hosts)}","-","{rng.choice(users)}",{date},'
+                    f'"{rng.choice(requests)}",{rng.choice(status)},{rng.randint(1000, 1400)}\n')
+
+
+def format_log(log, log_format):
+    """
+    Format a deserialized log (see Deserializer) as a line of a log format.
+
+    Parameters
+    ----------
+    log : LogRecord
+        deserialized log.
+    log_format : str
+        "csv", "clf" or "jsonl".
+
+    Returns
+    -------
+    line : string
+        the line of the log, with its new line character.
+    """
+
+    request = " ".join((log.request.method, log.request.route, log.request.protocol))
+
+    if log_format == "clf":
+        date = time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime(log.date))
+        return (f'{log.remotehost} {log.rfc931} {log.authuser} [{date}] "{request}" '
+                f'{log.status} {log.bytes} "-" "bench/1.0"\n')
+
+    if log_format == "jsonl":
+        return json.dumps({"remotehost": log.remotehost, "rfc931": log.rfc931,
+                           "authuser": log.authuser, "date": log.date, "request": request,
+                           "status": log.status, "bytes": log.bytes}) + "\n"
+
+    return (f'"{log.remotehost}","{log.rfc931}","{log.authuser}",{log.date},'
+            f'"{request}",{log.status},{log.bytes}\n')
+
+
+def convert_logs(src_file, path, log_format, compression=None):
+    """
+    Write the logs of a csv file in another log format.
+
+    Parameters
+    ----------
+    src_file : string
+        Path to the csv file containing the logs.
+    path : string
+        Path where to store the converted logs.
+    log_format : str
+        "csv", "clf" or "jsonl".
+    compression : str or None
+        "gzip" or "zstd" to compress the converted logs.
+    """
+
+    lines = "".join(format_log(log, log_format) for log in read_logs(src_file, log_format="csv"))
+    if log_format == "csv":
+        lines = '"remotehost","rfc931","authuser","date","request","status","bytes"\n' + lines
+    data = lines.encode()
+
+    if compression == "gzip":
+        data = gzip.compress(data, 6)
+    elif compression == "zstd":
+        data = zstandard.ZstdCompressor(level=3).compress(data)
+
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def bench(name, read):
+    """
+    Measure and print the throughput of a parsing function.
+
+    Parameters
+    ----------
+    name : string
+        Name of the parsing method.
+    read : function
+        Function that parses the whole file and returns the number of logs.
+    """
+
+    start_time = time.time()
+    nb_lines = read()
+    duration = time.time() - start_time
+
+    print(f"{name:<30} {nb_lines} lines in {duration:8.2f}s {nb_lines/duration:12.0f} lines/s")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark of the csv parsers")
+    parser.add_argument("--nb_lines", type=int, default=10_000_000,
+                        help="number of lines of the generated csv file")
+    parser.add_argument("--path", type=str, default="data/bench_csv.txt",
+                        help="path of the generated csv file")
+    args = parser.parse_args()
+
+    # the file is only generated once
+    if not os.path.exists(args.path):
+        create_bench_csv(args.path, args.nb_lines)
+
+    bench("csv.reader + Deserializer",
+          lambda: sum(1 for _ in read_logs(args.path)))
+    bench("csv.reader + LogBatch",
+          lambda: sum(len(batch) for batch in read_log_batches(args.path)))
+    bench("BulkParser",
+          lambda: sum(len(batch) for batch in BulkParser(args.path)))
+
+    # throughput and size of the same logs in each format, to choose the format to ship
+    base, _ = os.path.splitext(args.path)
+    for log_format in LOG_FORMATS:
+        for compression, extension in ((None, ""), ("gzip", ".gz"), ("zstd", ".zst")):
+            if compression == "zstd" and zstandard is None:
+                continue
+            path = f"{base}.{log_format}{extension}"
+            if not os.path.exists(path):
+                convert_logs(args.path, path, log_format, compression)
+            print(f"{log_format + extension:<30} {os.path.getsize(path)/args.nb_lines:8.1f} bytes/line")
+            bench(f"{log_format + extension} parser",
+                  lambda: sum(len(batch) for batch in get_parser(path, log_format)))
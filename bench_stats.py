@@ -0,0 +1,29 @@
+import argparse
+import os
+
+from bench_parser import bench, create_bench_csv
+from parallel_stats import compute_parallel_stats
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark of the parallel stats computation")
+    parser.add_argument("--nb_lines", type=int, default=10_000_000,
+                        help="number of lines of the generated csv file")
+    parser.add_argument("--path", type=str, default="data/bench_csv.txt",
+                        help="path of the generated csv file")
+    parser.add_argument("--max_workers", type=int, default=os.cpu_count(),
+                        help="maximum number of processes")
+    args = parser.parse_args()
+
+    # the file is only generated once
+    if not os.path.exists(args.path):
+        create_bench_csv(args.path, args.nb_lines)
+
+    # the throughput should grow linearly with the number of workers up to the number of cores
+    nb_workers = 1
+    while nb_workers <= args.max_workers:
+        bench(f"compute_parallel_stats x{nb_workers}",
+              lambda: sum(partial.nb_logs for partial in
+                          compute_parallel_stats(args.path, nb_workers).values()))
+        nb_workers *= 2
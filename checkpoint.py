@@ -0,0 +1,72 @@
+import os
+import pickle
+import zlib
+
+
+# First bytes of a checkpoint file, with the version of its format
+CHECKPOINT_MAGIC = b"LOGMONCK"
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(path, state):
+    """
+    Function that writes the state of an analysis in a binary checkpoint file.
+
+    The state is pickled and compressed after a small header (the ring
+    buffers of the traffic history are mostly zeros). The file is first written
+    next to the checkpoint then renamed, so a crash during the writing
+    never corrupts the previous checkpoint.
+
+    Parameters
+    ----------
+    path : str
+        path to the checkpoint file.
+    state : dict
+        state of the analysis (only built-in types, arrays and objects of the project).
+
+    Returns
+    -------
+    size : int
+        size of the checkpoint in bytes.
+    """
+
+    data = zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CHECKPOINT_MAGIC)
+        f.write(CHECKPOINT_VERSION.to_bytes(2, "little"))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return len(CHECKPOINT_MAGIC) + 2 + len(data)
+
+
+def load_checkpoint(path):
+    """
+    Function that reads the state of an analysis from a checkpoint file.
+
+    Only load the checkpoints written by save_checkpoint: like any pickle,
+    a checkpoint can run code when it is loaded.
+
+    Parameters
+    ----------
+    path : str
+        path to the checkpoint file.
+
+    Returns
+    -------
+    state : dict or None
+        state of the analysis, None if there is no valid checkpoint at the path.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC or \
+                    int.from_bytes(f.read(2), "little") != CHECKPOINT_VERSION:
+                return None
+            return pickle.loads(zlib.decompress(f.read()))
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, zlib.error):
+        return None
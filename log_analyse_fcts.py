@@ -1,20 +1,30 @@
+import heapq
 import os
 import time
+from collections import Counter
 from pprint import pprint as pp
 from threading import Lock, Thread, Timer
 
+from DDSketch import DDSketch
+from HyperLogLog import HyperLogLog, hash_value
 from LogGenerator import LogGenerator
+from utils import format_time
 
 
-SECTIONS = {"help", "user", "report"}
-METHODS = {"GET", "POST"}
-STATUS = {200, 404, 500}
+# Precision of the distinct counters of hosts and users (256 registers, ~6.5% error)
+HLL_PRECISION = 8
+
+# Relative accuracy of the quantiles of the response sizes
+BYTES_ACCURACY = 0.01
 
 
 def get_section_from_route(url):
     """
     extract the section from an url or a route.
 
+    The section is the first segment of the path, for example
+    the section of "/api/user?id=1" or "http://my.site.com/api/user" is "api".
+
     Parameters
     ----------
     url : string
@@ -23,18 +33,130 @@ def get_section_from_route(url):
     Returns
     -------
     section : string
-        section accessed by the url/route
+        section accessed by the url/route ("/" for the root)
+    """
+
+    # remove the query and the scheme and host of a full url
+    path = url.split("?", 1)[0]
+    if "://" in path:
+        path = path.split("://", 1)[1].partition("/")[2]
+
+    return path.lstrip("/").split("/", 1)[0] or "/"
+
+
+def new_section_sketches():
+    """
+    Create the mergeable sketches of a section without any request.
+
+    Returns
+    -------
+    sketches : dict
+        distinct counters of the remote hosts and of the users (see HyperLogLog)
+        and distribution of the response sizes (see DDSketch).
+    """
+
+    return {"distinct_hosts": HyperLogLog(HLL_PRECISION),
+            "distinct_users": HyperLogLog(HLL_PRECISION),
+            "response_bytes": DDSketch(BYTES_ACCURACY)}
+
+
+def new_section_stats():
+    """
+    Create the stats of a section without any request.
+
+    Returns
+    -------
+    section_stats : dict
+        number of requests, number of requests per status and per method
+        (only the status and methods seen are in the dictionaries), and
+        the sketches of the section (see new_section_sketches).
+    """
+
+    section_stats = {"nb_requests": 0, "count_status": {}, "count_methods": {}}
+    section_stats.update(new_section_sketches())
+    return section_stats
+
+
+def add_distinct(stats, label, pairs, value_of=str):
+    """
+    Add the distinct (section, value) pairs to the distinct counters of the sections.
+    Each value is only hashed once.
+
+    Parameters
+    ----------
+    stats : dict
+        stats of each section (see new_section_stats).
+    label : str
+        "distinct_hosts" or "distinct_users".
+    pairs : set of tuple
+        distinct (section, value) pairs, the sections are keys of stats.
+    value_of : function
+        function that gives the string of a value (for example the value of an id).
+    """
+
+    hashes = {}
+    for section, value in pairs:
+        value_hash = hashes.get(value)
+        if value_hash is None:
+            value_hash = hashes[value] = hash_value(value_of(value))
+        stats[section][label].add_hash(value_hash)
+
+
+def add_response_bytes(stats, counts):
+    """
+    Add the response sizes to the sketches of the sections.
+
+    Parameters
+    ----------
+    stats : dict
+        stats of each section (see new_section_stats).
+    counts : Counter
+        number of responses per (section, size), the sections are keys of stats.
+    """
+
+    for (section, nb_bytes), count in counts.items():
+        stats[section]["response_bytes"].add(nb_bytes, count)
+
+
+def merge_sketches(windows, sections):
+    """
+    Merge the sketches of several windows for some sections.
+
+    Parameters
+    ----------
+    windows : iterable of dict
+        stats of each section for each window (see new_section_stats).
+    sections : iterable of str
+        sections to merge.
+
+    Returns
+    -------
+    merged : dict
+        merged sketches of each section (see new_section_sketches).
     """
-    return url.split("/")[-1]
+
+    merged = {section: new_section_sketches() for section in sections}
+
+    for window in windows:
+        for section, sketches in merged.items():
+            if section in window:
+                for label, sketch in sketches.items():
+                    sketch.merge(window[section][label])
+
+    return merged
 
 
 def compute_stats(logs):
     """
     Compute stats over a list of logs.
 
+    The logs are first counted per distinct (route, method, status), so
+    the section of each route is only extracted once. The sections,
+    methods and status are not known in advance.
+
     Parameters
     ----------
-    logs : list of dict
+    logs : list of LogRecord
         list of log objects
 
     Returns
@@ -45,29 +167,291 @@ def compute_stats(logs):
         A dictionary gathering some statistics about the given logs.
     """
 
-    stats = {sec: {"nb_requests": 0,
-                   "count_status": {"200": 0, "404": 0, "500": 0},
-                   "count_methods": {"POST": 0, "GET": 0},
-                   }
-             for sec in SECTIONS}
+    stats = {}
 
     total = 0
 
-    for log in logs:
+    requests = Counter((log.request.route, log.request.method, log.status)
+                       for log in logs)
 
-        total += 1
+    sections = {}
+    for (route, method, status), count in requests.items():
 
-        section = get_section_from_route(log["request"]["route"])
-        method = log["request"]["method"]
-        status = log["status"]
+        total += count
 
-        stats[section]["count_status"][str(status)] += 1
-        stats[section]["nb_requests"] += 1
-        stats[section]["count_methods"][method] += 1
+        section = sections.get(route)
+        if section is None:
+            section = sections[route] = get_section_from_route(route)
+        section_stats = stats.get(section)
+        if section_stats is None:
+            section_stats = stats[section] = new_section_stats()
+
+        count_status = section_stats["count_status"]
+        count_methods = section_stats["count_methods"]
+        count_status[str(status)] = count_status.get(str(status), 0) + count
+        count_methods[method] = count_methods.get(method, 0) + count
+        section_stats["nb_requests"] += count
+
+    # count the distinct hosts and users of each section
+    add_distinct(stats, "distinct_hosts",
+                 {(sections[log.request.route], log.remotehost) for log in logs})
+    add_distinct(stats, "distinct_users",
+                 {(sections[log.request.route], log.authuser) for log in logs})
+
+    # distribution of the response sizes of each section
+    add_response_bytes(stats, Counter((sections[log.request.route], log.bytes)
+                                      for log in logs))
 
     return total, stats
 
 
+def compute_batch_stats(batch):
+    """
+    Compute stats over a columnar batch of logs.
+
+    The logs are counted with a single pass over integer keys
+    (section id combined with the status or the method id),
+    which gives the same result as compute_stats without
+    going through an object per log. The strings are only
+    looked up once per distinct key.
+
+    Parameters
+    ----------
+    batch : LogBatch
+        batch of logs
+
+    Returns
+    -------
+    total : int
+        The total number of requests in the batch (=len(batch))
+    stats: dict
+        A dictionary gathering some statistics about the given logs.
+    """
+
+    # count each (section, status) and (section, method) pair
+    count_status = Counter(map(lambda section, status: section << 16 | status,
+                               batch.section_ids, batch.status))
+    count_methods = Counter(map(lambda section, method: section << 32 | method,
+                                batch.section_ids, batch.method_ids))
+
+    # stats of each section id
+    stats_by_id = {}
+
+    for key, count in count_status.items():
+        section_stats = stats_by_id.get(key >> 16)
+        if section_stats is None:
+            section_stats = stats_by_id[key >> 16] = new_section_stats()
+        section_stats["count_status"][str(key & 0xFFFF)] = count
+        section_stats["nb_requests"] += count
+
+    for key, count in count_methods.items():
+        section_stats = stats_by_id[key >> 32]
+        section_stats["count_methods"][batch.methods.value(key & 0xFFFFFFFF)] = count
+
+    # count the distinct hosts and users of each section
+    add_distinct(stats_by_id, "distinct_hosts", set(zip(batch.section_ids, batch.host_ids)),
+                 batch.hosts.value)
+    add_distinct(stats_by_id, "distinct_users", set(zip(batch.section_ids, batch.user_ids)),
+                 batch.users.value)
+
+    # distribution of the response sizes of each section
+    add_response_bytes(stats_by_id, Counter(zip(batch.section_ids, batch.bytes)))
+
+    stats = {batch.sections.value(section): section_stats
+             for section, section_stats in stats_by_id.items()}
+
+    return len(batch), stats
+
+
+def sections_stats_report(total, stats, date, verbose=False, nb_sections=3, window_stats=None,
+                          period=10, window_period=120):
+    """
+    Format the stats computed over a list of logs into a report.
+
+    Parameters
+    ----------
+    total : int
+        The total number of requests in the log list
+    stats : dict
+        A dictionary gathering some statistics about the logs (see compute_stats)
+    date : float
+        Date of the stats in seconds
+    verbose : bool
+        Define the level of detail of the stats, default to False (low level of details)
+    nb_sections : int
+        Number of sections in the report, the sections with the most requests are reported.
+    window_stats : dict or None
+        sketches of the sections over a longer window (2 minutes), if any.
+    period : float
+        Duration of the stats in seconds, to compute the bandwidth.
+    window_period : float
+        Duration of the longer window in seconds.
+
+    Returns
+    -------
+    report : string
+        The formatted report, with one line per section
+    """
+
+    # sort sections by number of requests and keep the top ones
+    infos = heapq.nlargest(nb_sections, ((stats[st]["nb_requests"], st, stats[st])
+                                         for st in stats))
+
+    # create a report
+    report = f"Top {nb_sections} websites:"
+    if True:
+        report += f" (last update: {format_time(date)})"
+    report += "\n"
+
+    nb_requests = 0
+
+    # for each section, format stats and append it to the report
+    for i, (count_req, section, section_stats) in enumerate(infos):
+
+        nb_requests = section_stats["nb_requests"]
+        ratio_requests = nb_requests/total if total else 0
+        nb_post = section_stats["count_methods"].get("POST", 0)
+        nb_get = section_stats["count_methods"].get("GET", 0)
+        nb_404 = section_stats["count_status"].get("404", 0)
+        nb_500 = section_stats["count_status"].get("500", 0)
+
+        report += f"{i+1}: Section {section}: \t traffic: {100*ratio_requests:.1f}%"
+        report += f", requests: {nb_requests}"
+        if verbose:
+            report += f" (GET:{nb_get}, POST:{nb_post})"
+            report += f", errors: {nb_404+nb_500} (404: {nb_404}, 500: {nb_500})"
+
+        # approximate number of distinct hosts (and users)
+        labels = ("distinct_hosts", "distinct_users") if verbose else ("distinct_hosts",)
+        for label in labels:
+            if label in section_stats:
+                report += f", {label[9:]}: {section_stats[label].count()}"
+                if window_stats is not None and section in window_stats:
+                    report += f" ({window_stats[section][label].count()} over 2min)"
+
+        # quantiles of the response sizes and bandwidth
+        if "response_bytes" in section_stats and section_stats["response_bytes"].count:
+            report += f", bytes {bytes_report(section_stats['response_bytes'], period)}"
+            if window_stats is not None and section in window_stats:
+                report += f" ({bytes_report(window_stats[section]['response_bytes'], window_period)}"
+                report += " over 2min)"
+        report += "\n"
+
+    return report
+
+
+def bytes_report(sketch, period):
+    """
+    Format the quantiles of the response sizes and the bandwidth.
+
+    Parameters
+    ----------
+    sketch : DDSketch
+        distribution of the response sizes
+    period : float
+        Duration of the responses in seconds
+
+    Returns
+    -------
+    report : string
+        p50/p95/p99 of the response sizes and the bandwidth
+    """
+
+    if not sketch.count:
+        return "-"
+
+    quantiles = "/".join(f"{sketch.quantile(q):.0f}" for q in (0.5, 0.95, 0.99))
+    return f"p50/p95/p99: {quantiles}, {sketch.sum/period:.0f} B/s"
+
+
+def total_traffic_report(avg_total_traffic, date):
+    """
+    Format the average total traffic into a report.
+
+    Parameters
+    ----------
+    avg_total_traffic : float
+        Average traffic on the 2min-sliding window (in requests per second)
+    date : float
+        Date of the update in seconds
+
+    Returns
+    -------
+    report : string
+        The formatted report
+    """
+
+    report = f"Average total taffic: {avg_total_traffic:.2f} req/s over 2min-sliding window"
+    report += f" (last update: {format_time(date)})"
+    report += "\n"
+    return report
+
+
+def traffic_history_report(history_averages):
+    """
+    Format the average traffic of longer windows into a report.
+
+    Parameters
+    ----------
+    history_averages : dict
+        Average traffic of each window by label (see TrafficMonitor.history_averages)
+
+    Returns
+    -------
+    report : string
+        The formatted report, empty if there is no history yet
+    """
+
+    if not history_averages:
+        return ""
+
+    report = "Average total taffic over "
+    report += ", ".join(f"{label}: {avg:.2f} req/s" for label, avg in history_averages.items())
+    report += "\n"
+    return report
+
+
+def traffic_curve_report(rates, threshold, duration=600, height=8):
+    """
+    Draw the traffic curve of the last minutes with the alert threshold line.
+
+    Parameters
+    ----------
+    rates : list of float
+        Average traffic of each point of the curve (see TrafficMonitor.history_curve)
+    threshold : float
+        Average traffic threshold of the alerts (in requests per second)
+    duration : float
+        Duration of the curve in seconds
+    height : int
+        Number of lines of the curve
+
+    Returns
+    -------
+    report : string
+        The drawn curve, empty if there is no history yet
+    """
+
+    if not rates:
+        return ""
+
+    # the top of the curve is the highest point or the threshold
+    top = max(max(rates), threshold) or 1.
+    heights = [round(rate*height/top) for rate in rates]
+    threshold_row = max(1, round(threshold*height/top))
+
+    report = f"Total traffic over the last {duration/60:g}min (req/s):\n"
+    for row in range(height, 0, -1):
+        empty = "-" if row == threshold_row else " "
+        report += f"{top*row/height:9.1f} |"
+        report += "".join("\u2588" if column_height >= row else empty for column_height in heights)
+        if row == threshold_row:
+            report += f" threshold {threshold} req/s"
+        report += "\n"
+    report += " "*10 + "+" + "-"*len(rates) + "\n"
+    return report
+
+
 if __name__ == "__main__":
 
     filename = "sample_csv.txt"
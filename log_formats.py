@@ -0,0 +1,121 @@
+import os
+
+from BulkParser import BulkParser
+from ClfParser import ClfParser
+from JsonLinesParser import JsonLinesParser
+from RotatedLogParser import RotatedLogParser
+from utils import COMPRESSIONS, open_log_file
+
+
+# Bulk parser of each log format
+LOG_FORMATS = {parser.log_format: parser for parser in (BulkParser, ClfParser, JsonLinesParser)}
+
+# Log format of the files by extension (after the extension of the compression)
+FORMAT_EXTENSIONS = {".csv": "csv", ".txt": "csv", ".log": "clf", ".jsonl": "jsonl", ".json": "jsonl"}
+
+
+def detect_format(src_file):
+    """
+    Function that finds the format of a log file from its extension, or from
+    its first line if the extension is unknown.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the log file, possibly compressed (see COMPRESSIONS).
+
+    Returns
+    -------
+    log_format : str
+        name of the format in LOG_FORMATS.
+    """
+
+    path = src_file
+    for extension in COMPRESSIONS:
+        if path.endswith(extension):
+            path = path[:-len(extension)]
+
+    log_format = FORMAT_EXTENSIONS.get(os.path.splitext(path)[1])
+    if log_format is not None:
+        return log_format
+
+    with open_log_file(src_file) as f:
+        first_line = f.readline().lstrip()
+
+    if first_line.startswith(b"{"):
+        return "jsonl"
+    if first_line.startswith(b'"'):
+        return "csv"
+    return "clf"
+
+
+def list_log_files(directory, log_format=None):
+    """
+    Function that lists the log files of a directory of rotated logs, in the
+    order of the date of their first log (the rotated files are renamed or
+    compressed, so their names and modification times are not reliable).
+
+    Parameters
+    ----------
+    directory : str
+        path to the directory.
+    log_format : str or None
+        name of the format of the files in LOG_FORMATS, detected for each file if None.
+
+    Returns
+    -------
+    files : list of (float, str)
+        date of the first log and path of each file with logs, sorted by date.
+    """
+
+    files = []
+
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+
+        # skip the hidden files, the indexes and the checkpoints being written
+        if name.startswith(".") or name.endswith((".idx", ".tmp")) or not os.path.isfile(path):
+            continue
+
+        logs = get_parser(path, log_format, block_size=1 << 16).read_logs()
+        first_log = next(logs, None)
+        logs.close()
+
+        if first_log is not None:
+            files.append((first_log.date, os.path.getmtime(path), path))
+
+    return [(date, path) for date, _, path in sorted(files)]
+
+
+def get_parser(src_file, log_format=None, **options):
+    """
+    Function that creates the bulk parser of a log file, or of a directory of rotated log files.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the log file, possibly compressed (see COMPRESSIONS), or to a directory of log files.
+    log_format : str or None
+        name of the format in LOG_FORMATS, detected from the file if None.
+    **options : dict
+        options of the parser (block_size, start_date, end_date).
+
+    Returns
+    -------
+    parser : BulkParser or RotatedLogParser
+        parser of the file, for its batches (read_batches) or its logs (read_logs).
+    """
+
+    if os.path.isdir(src_file):
+        files = list_log_files(src_file, log_format)
+        return RotatedLogParser([get_parser(path, log_format, **options) for _, path in files],
+                                [date for date, _ in files],
+                                options.get("start_date"), options.get("end_date"))
+
+    if log_format is None:
+        log_format = detect_format(src_file)
+
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format} (known formats: {', '.join(LOG_FORMATS)})")
+
+    return LOG_FORMATS[log_format](src_file, **options)
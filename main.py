@@ -1,8 +1,13 @@
 
 import argparse
+import asyncio
 import os
 import time
 
+from AlertEngine import load_rules
+from AsyncAnalyser import analyse_files
+from BatchAnalyser import BatchAnalyser
+from ClusterAggregator import ClusterAggregator
 from ConsoleApp import ConsoleApp
 
 
@@ -10,17 +15,150 @@ from ConsoleApp import ConsoleApp
 parser = argparse.ArgumentParser(
     description="HTTP log monitoring console program")
 
-parser.add_argument("--src_path", type=str, default="sample_csv.txt",
-                    help="path to the CSV-encoded HTTP access log")
+parser.add_argument("--src_path", type=str, nargs="+", default=["sample_csv.txt"],
+                    help="path(s) to the HTTP access log(s) (csv, clf or json lines, possibly .gz or .zst) "
+                         "or directories of rotated logs, "
+                         "several logs need --asyncio")
 
 parser.add_argument("--avg_trafic_threshold", type=float, default=10,
                     help="average traffic threshold to trigger alerts (in requests per second)")
 
+parser.add_argument("--speed", type=float, default=1,
+                    help="speed factor of the replay compared to the real time (0 to replay as fast as possible)")
+
+parser.add_argument("--batch", action="store_true",
+                    help="analyse the whole file as fast as possible without the console")
+
+parser.add_argument("--workers", type=int, default=1,
+                    help="number of processes of the batch analysis (0 for the number of cores)")
+
+parser.add_argument("--start_date", type=float, default=None,
+                    help="timestamp in seconds from where to start the analysis")
+
+parser.add_argument("--end_date", type=float, default=None,
+                    help="timestamp in seconds where to stop the batch analysis")
+
+parser.add_argument("--follow", action="store_true",
+                    help="follow a log file that the web server is appending to (like tail -F)")
+
+parser.add_argument("--top_k_mode", type=str, default="exact", choices=["exact", "sketch"],
+                    help="count all the sections (exact) or only the top sections with a bounded memory (sketch)")
+
+parser.add_argument("--sketch_capacity", type=int, default=1000,
+                    help="maximum number of sections counted in the sketch mode")
+
+parser.add_argument("--sketch_epsilon", type=float, default=0.001,
+                    help="relative error of the Count-Min sketch of the sketch mode (compared to the total count)")
+
+parser.add_argument("--sketch_delta", type=float, default=0.01,
+                    help="probability that a Count-Min estimate of the sketch mode is above its error bound")
+
+parser.add_argument("--asyncio", action="store_true",
+                    help="analyse all the logs concurrently with asyncio as fast as possible")
+
+parser.add_argument("--alert_rules", type=str, default=None,
+                    help="path to a json file of additional alert rules (per section, status, host...)")
+
+parser.add_argument("--alert_db", type=str, default=None,
+                    help="path to a SQLite database where all the alerts are stored")
+
+parser.add_argument("--checkpoint", type=str, default=None,
+                    help="path to a checkpoint file to resume the console from and to save its state in")
+
+parser.add_argument("--log_format", type=str, default=None, choices=["csv", "clf", "jsonl"],
+                    help="format of the logs (csv, Common/Combined Log Format or json lines), "
+                         "detected from the file if not given (clf for the logs received with --listen_port)")
+
+parser.add_argument("--metrics_port", type=int, default=None,
+                    help="port of a local HTTP endpoint serving the metrics (/metrics and /metrics.json)")
+
+parser.add_argument("--headless", action="store_true",
+                    help="run the console analysis without printing the reports (with --metrics_port)")
+
+parser.add_argument("--listen_port", type=int, default=None,
+                    help="receive the logs in syslog messages on this UDP and TCP port instead of reading a file")
+
+parser.add_argument("--listen_host", type=str, default="127.0.0.1",
+                    help="address to listen on with --listen_port or --aggregate_port")
+
+parser.add_argument("--export_address", type=str, default=None,
+                    help="host:port of the aggregator of several nodes to send the summaries of the analysis to")
+
+parser.add_argument("--node_name", type=str, default=None,
+                    help="name of the node for the aggregator (default to the host name)")
+
+parser.add_argument("--aggregate_port", type=int, default=None,
+                    help="aggregate the summaries sent by several nodes on this port instead of reading logs")
+
+parser.add_argument("--max_lag", type=float, default=5,
+                    help="maximum delay of the aggregation behind the most recent node in seconds")
+
 args = parser.parse_args()
+if len(args.src_path) > 1 and not args.asyncio:
+    parser.error("several --src_path need --asyncio")
+if not (0 < args.sketch_epsilon < 1 and 0 < args.sketch_delta < 1):
+    parser.error("--sketch_epsilon and --sketch_delta should be between 0 and 1")
+
+# Additional alert rules
+alert_rules = load_rules(args.alert_rules) if args.alert_rules else None
+
+
+# Concurrent analysis of several logs
+if args.asyncio:
+    asyncio.run(analyse_files(args.src_path, args.avg_trafic_threshold, alert_rules=alert_rules,
+                              alert_db=args.alert_db, start_date=args.start_date, end_date=args.end_date,
+                              log_format=args.log_format))
+    raise SystemExit(0)
+
+
+# Aggregation of the analyses of several nodes
+if args.aggregate_port is not None:
+    aggregator = ClusterAggregator(args.avg_trafic_threshold, host=args.listen_host, port=args.aggregate_port,
+                                   max_lag=args.max_lag, alert_rules=alert_rules, alert_db=args.alert_db)
+    try:
+        asyncio.run(aggregator.serve())
+    except KeyboardInterrupt:
+        pass
+    raise SystemExit(0)
+
+
+# Headless analysis of the whole file
+if args.batch:
+    BatchAnalyser(args.src_path[0], args.avg_trafic_threshold,
+                  csv_start_date=args.start_date, csv_end_date=args.end_date,
+                  nb_workers=args.workers if args.workers > 0 else None, alert_rules=alert_rules,
+                  alert_db=args.alert_db, log_format=args.log_format).run()
+    raise SystemExit(0)
 
 
 # Instanciate the app and the simulation
-app = ConsoleApp(args.src_path, args.avg_trafic_threshold)
+options = {} if args.start_date is None else {"csv_start_date": args.start_date}
+if args.follow:
+    options["follow"] = True
+if args.listen_port is not None:
+    options["listen_port"] = args.listen_port
+    options["listen_host"] = args.listen_host
+if args.export_address is not None:
+    options["export_address"] = args.export_address
+    options["node_name"] = args.node_name
+app = ConsoleApp(args.src_path[0], args.avg_trafic_threshold,
+                 top_k_mode=args.top_k_mode, sketch_capacity=args.sketch_capacity,
+                 sketch_epsilon=args.sketch_epsilon, sketch_delta=args.sketch_delta, alert_rules=alert_rules,
+                 alert_db=args.alert_db, checkpoint=args.checkpoint, metrics_port=args.metrics_port,
+                 console=not args.headless, log_format=args.log_format,
+                 speed=args.speed if args.speed > 0 else None, **options)
+
+
+# Run without the console until the end of the replay (or Ctrl+C)
+if args.headless:
+    app.start()
+    try:
+        while not app.replay_over():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    app.stop()
+    raise SystemExit(0)
 
 
 # Print project name in ASCII
@@ -0,0 +1,188 @@
+import math
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from BulkParser import BulkParser
+from LogBatch import LogBatch
+from StatsPartial import StatsPartial
+
+
+def split_file(src_file, nb_parts, start_date=None, end_date=None):
+    """
+    Split the lines of a csv file of logs into ranges of bytes of similar sizes.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the csv file containing the logs.
+    nb_parts : int
+        number of ranges.
+    start_date : float or None
+        if given, the ranges start close to the first log of this date (see LogIndex).
+    end_date : float or None
+        if given, the ranges stop close to the first log of this date (see LogIndex).
+
+    Returns
+    -------
+    ranges : list of (int, int)
+        offsets of the start and the end of each range, each range is made of complete lines.
+    """
+
+    parser = BulkParser(src_file, start_date=start_date, end_date=end_date)
+
+    with open(src_file, "rb") as f:
+        _, start, end = parser.read_header(f)
+        if start >= end:
+            return []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+
+            # move each limit to the beginning of the next line
+            limits = [start]
+            for i in range(1, nb_parts):
+                limit = max(start + (end - start)*i//nb_parts, limits[-1])
+                limit = min(data.find(b"\n", limit - 1, end) + 1 or end, end)
+                limits.append(limit)
+            limits.append(end)
+
+    return [(a, b) for a, b in zip(limits, limits[1:]) if a < b]
+
+
+def compute_partial_stats(src_file, start, end, origin=0, period=None, start_date=None, end_date=None):
+    """
+    Compute the partial stats of a range of lines of a csv file of logs,
+    for each stats window if a period is given.
+
+    The logs of the window i are the logs from the date origin + i*period
+    (included) to the date origin + (i+1)*period (excluded), the logs before
+    the origin are in the first window.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the csv file containing the logs.
+    start : int
+        offset of the first line of the range.
+    end : int
+        offset of the end of the range.
+    origin : float
+        start date of the first window in seconds.
+    period : float or None
+        duration of the windows in seconds, None for a single window.
+    start_date : float or None
+        if given, the logs before this date are ignored.
+    end_date : float or None
+        if given, the logs from this date are ignored.
+
+    Returns
+    -------
+    partials : dict
+        the partial stats (StatsPartial) of each window index.
+    """
+
+    parser = BulkParser(src_file)
+    partials = {}
+
+    with open(src_file, "rb") as f:
+        schema, _, _ = parser.read_header(f)
+
+        for batch in parser.read_range(f, start, end, schema, LogBatch()):
+
+            # keep the logs of the date range
+            if len(batch) and ((start_date is not None and min(batch.dates) < start_date) or
+                               (end_date is not None and max(batch.dates) >= end_date)):
+                filtered = batch.empty_copy()
+                for i, date in enumerate(batch.dates):
+                    if (start_date is None or date >= start_date) and \
+                            (end_date is None or date < end_date):
+                        filtered.extend(batch, i, i + 1)
+                batch = filtered
+
+            if period is None:
+                partials.setdefault(0, StatsPartial()).add_batch(batch)
+                continue
+
+            # cut the batch at the end of the windows
+            position = 0
+            while position < len(batch):
+                window = max(math.floor((batch.dates[position] - origin)/period), 0)
+                lower = origin + window*period if window else float("-inf")
+                upper = origin + (window + 1)*period
+                window_end = batch.find_date(upper, position)
+
+                # the dates are only roughly sorted: stop at the first log of another window
+                dates = batch.dates[position:window_end]
+                if min(dates) < lower or max(dates) >= upper:
+                    window_end = position + next(i for i, date in enumerate(dates)
+                                                 if not lower <= date < upper)
+
+                partials.setdefault(window, StatsPartial()).add_batch(batch, position, window_end)
+                position = window_end
+
+    return partials
+
+
+def compute_parallel_stats(src_file, nb_workers=None, origin=0, period=None,
+                           start_date=None, end_date=None):
+    """
+    Compute the stats of a csv file of logs with a pool of processes.
+
+    The file is split in one range of lines per worker, each worker computes
+    the partial stats of its range and the partials are merged. The result
+    is the same as a single pass over the file.
+
+    Parameters
+    ----------
+    src_file : str
+        path to the csv file containing the logs.
+    nb_workers : int or None
+        number of processes, default to the number of cores.
+    origin : float
+        start date of the first window in seconds.
+    period : float or None
+        duration of the windows in seconds, None for a single window.
+    start_date : float or None
+        if given, the logs before this date are ignored.
+    end_date : float or None
+        if given, the logs from this date are ignored.
+
+    Returns
+    -------
+    partials : dict
+        the merged partial stats (StatsPartial) of each window index.
+    """
+
+    if nb_workers is None:
+        nb_workers = os.cpu_count() or 1
+
+    ranges = split_file(src_file, nb_workers, start_date, end_date)
+
+    if nb_workers == 1 or len(ranges) <= 1:
+        results = [compute_partial_stats(src_file, start, end, origin, period, start_date, end_date)
+                   for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(nb_workers) as executor:
+            futures = [executor.submit(compute_partial_stats, src_file, start, end,
+                                       origin, period, start_date, end_date)
+                       for start, end in ranges]
+            results = [future.result() for future in futures]
+
+    # merge the partials of the same window
+    partials = {}
+    for result in results:
+        for window, partial in result.items():
+            if window in partials:
+                partials[window].merge(partial)
+            else:
+                partials[window] = partial
+
+    return partials
+
+
+if __name__ == "__main__":
+
+    # Small test
+    partials = compute_parallel_stats("data/sample_csv.txt")
+    for partial in partials.values():
+        print(partial.to_stats())
@@ -1,10 +1,16 @@
 
+import asyncio
+import io
 import time
 
-import pytest
-
+from Alert import Alert
+from AlertEngine import AlertEngine, load_rules
+from AlertHistory import AlertHistory
+from AlertRule import AlertRule
+from AsyncAnalyser import AsyncAnalyser, analyse_files
+from BatchAnalyser import BatchAnalyser
 from ConsoleApp import ConsoleApp
-from LogGenerator import LogGenerator
+from LogRecord import LogRecord, Request
 
 
 def create_test_csv(path):
@@ -29,35 +35,277 @@ def create_test_csv(path):
             f.writelines(s for _ in range(20))
 
 
-def test_alert():
-    test_path = "data/test_csv.txt"
+def run_alert_scenario(path, speed, timeout):
+    """
+    Replay the dummy csv file and return the list of alerts once the
+    simulated time reached the end of the sliding window.
 
-    create_test_csv(test_path)
+    Parameters
+    ----------
+    path : string
+        Path where to store the csv file containing the fake logs.
+    speed : float or None
+        Speed factor of the simulation (None to run as fast as possible).
+    timeout : float
+        Maximum number of real seconds to wait for the simulation.
+    """
+
+    create_test_csv(path)
 
     console_app = ConsoleApp(
-        test_path, avg_trafic_threshold=10, csv_start_date=0)
+        path, avg_trafic_threshold=10, csv_start_date=0, speed=speed)
 
     console_app.start()
 
     try:
-        time.sleep(90)
+        deadline = time.time() + timeout
+        while not (console_app.clock.is_started() and console_app.clock.now() >= 150) \
+                and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        console_app.stop()
 
-        assert len(console_app.alert_list) == 1
-        assert not console_app.alert_list[0].resolved
-        assert abs(console_app.alert_list[0].start_time - 80) <= 1.5
+    return list(console_app.alert_history)
 
-        time.sleep(40)
 
-        assert len(console_app.alert_list) == 1
-        assert console_app.alert_list[0].resolved
-        assert abs(console_app.alert_list[0].end_time - 120) <= 1.5
+def check_alerts(alert_list):
+    """
+    Check the alerts triggered by the dummy csv file: 20 req/s between
+    the 20th and the 80th second give exactly 10 req/s on average over
+    2 minutes from the 80th to the 140th second.
+    """
 
-    except AssertionError as err:
-        console_app.stop()
-        raise AssertionError(err)
-    else:
-        console_app.stop()
+    assert len(alert_list) == 1
+    assert alert_list[0].resolved
+    assert abs(alert_list[0].start_time - 80) <= 1.5
+    assert abs(alert_list[0].end_time - 141) <= 1.5
+
+
+def test_alert(tmp_path):
+    check_alerts(run_alert_scenario(str(tmp_path / "test_csv.txt"), speed=None, timeout=30))
+
+
+def test_alert_accelerated(tmp_path):
+    check_alerts(run_alert_scenario(str(tmp_path / "test_csv.txt"), speed=50, timeout=30))
+
+
+def test_alert_batch(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    with open(str(tmp_path / "report.txt"), "w") as output:
+        analyser = BatchAnalyser(test_path, avg_trafic_threshold=10,
+                                 csv_start_date=0, output=output)
+        check_alerts(analyser.run())
+
+    assert analyser.nb_rows == 1200
+
+
+def test_alert_async(tmp_path):
+    # the traffic of the dummy csv is split between two files analysed concurrently
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    with open(test_path) as f:
+        header, *lines = f.readlines()
+
+    paths = [str(tmp_path / "test_csv_0.txt"), str(tmp_path / "test_csv_1.txt")]
+    for i, path in enumerate(paths):
+        with open(path, "w") as f:
+            f.writelines([header] + lines[i::2])
+
+    check_alerts(asyncio.run(analyse_files(paths, avg_trafic_threshold=10,
+                                           output=io.StringIO(), clear=False)))
+
+    # the first 30 seconds of traffic are not enough to trigger the alert
+    assert asyncio.run(analyse_files(paths, avg_trafic_threshold=10, output=io.StringIO(), clear=False,
+                                     end_date=50, log_format="csv")) == []
+
+
+def test_alert_async_stream(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    with open(test_path, "rb") as f:
+        f.readline()
+        data = f.read()
+
+    async def scenario():
+        analyser = AsyncAnalyser(avg_trafic_threshold=10)
+        reader = asyncio.StreamReader()
+
+        async def feed():
+            for i in range(0, len(data), 1000):
+                reader.feed_data(data[i:i+1000])
+                await asyncio.sleep(0)
+            reader.feed_eof()
+
+        alert_list, *_ = await asyncio.gather(analyser.run(), analyser.read_stream(reader), feed())
+        return alert_list
+
+    check_alerts(asyncio.run(scenario()))
+
+
+def test_alert_async_file_and_stream(tmp_path):
+    # the traffic of the dummy csv is split between a file and a stream, parsed with the same Interner objects
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    with open(test_path) as f:
+        header, *lines = f.readlines()
+
+    file_path = str(tmp_path / "test_csv_0.txt")
+    with open(file_path, "w") as f:
+        f.writelines([header] + lines[0::2])
+    data = "".join(lines[1::2]).encode()
+
+    async def scenario():
+        analyser = AsyncAnalyser(avg_trafic_threshold=10)
+        reader = asyncio.StreamReader()
+
+        async def feed():
+            for i in range(0, len(data), 1000):
+                reader.feed_data(data[i:i+1000])
+                await asyncio.sleep(0)
+            reader.feed_eof()
+
+        alert_list, *_ = await asyncio.gather(analyser.run(), analyser.read_file(file_path),
+                                              analyser.read_stream(reader), feed())
+        return analyser, alert_list
+
+    analyser, alert_list = asyncio.run(scenario())
+    check_alerts(alert_list)
+    for interner in (analyser.prototype.hosts, analyser.prototype.sections):
+        assert len(set(interner.values)) == len(interner.values) == len(interner.ids)
+
+
+def test_alert_rules(tmp_path):
+    rules_path = str(tmp_path / "rules.json")
+    with open(rules_path, "w") as f:
+        f.write('{"rules": [{"name": "api", "section": "api", "threshold": 10},'
+                ' {"name": "5xx", "status_class": "5xx", "metric": "ratio", "threshold": 0.1},'
+                ' {"name": "host", "host": "10.0.0.2", "window": 10, "threshold": 15,'
+                ' "clear_threshold": 5}]}')
+    rules = load_rules(rules_path)
+    assert [rule.fields for rule in rules] == [("section",), ("status_class",), ("host",)]
+
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    with open(str(tmp_path / "report.txt"), "w") as output:
+        analyser = BatchAnalyser(test_path, avg_trafic_threshold=10, csv_start_date=0,
+                                 output=output, nb_workers=2, alert_rules=rules)
+        alerts = {alert.rule: alert for alert in analyser.run()}
+
+    # the rule on the api section is the same as the high traffic alert,
+    # the short window of the host rule triggers earlier and resolves with hysteresis
+    assert set(alerts) == {None, "api", "host"}
+    check_alerts([alerts[None]])
+    check_alerts([alerts["api"]])
+    host_alert = alerts["host"]
+    assert (host_alert.start_time, host_alert.end_time) == (28, 88)
+    assert "Rule host generated an alert" in host_alert.report()
+
+
+def test_load_rules_invalid(tmp_path):
+    rules_path = str(tmp_path / "rules.json")
+
+    # the status is read as an integer, like the status of the logs
+    with open(rules_path, "w") as f:
+        f.write('[{"name": "500", "status": "500", "threshold": 1}]')
+    assert load_rules(rules_path)[0].key == (500,)
+
+    # a status that is not a number and two rules with the same name are rejected
+    for config in ('[{"name": "a", "status": "5xx", "threshold": 1}]',
+                   '[{"name": "a", "threshold": 1}, {"name": "a", "threshold": 2}]'):
+        with open(rules_path, "w") as f:
+            f.write(config)
+        try:
+            load_rules(rules_path)
+            assert False
+        except ValueError as error:
+            assert "rule a " in str(error)
+
+
+def test_alert_rule_ratio():
+    rule = AlertRule("5xx", threshold=0.5, clear_threshold=0.2, window=4,
+                     metric="ratio", status_class=5)
+    engine = AlertEngine([rule])
+    request = Request("GET", "/api/user", "HTTP/1.0")
+    error = LogRecord("10.0.0.1", "-", "-", 0, request, 500, 1234)
+    ok = LogRecord("10.0.0.1", "-", "-", 0, request, 200, 1234)
+
+    for date, nb_errors in enumerate([0, 3, 3, 0, 0, 0, 0]):
+        engine.add_logs([error]*nb_errors + [ok]*2)
+        engine.update(date)
+
+    # 6 errors out of 10 requests at the 2nd second, 3 out of 11 at the 5th second, 0 at the 6th
+    assert [(alert.start_time, alert.end_time) for alert in engine.alert_history] == [(2, 6)]
+
+
+def test_alert_history(tmp_path):
+    db_path = str(tmp_path / "alerts.db")
+    history = AlertHistory(db_path, max_recent=3)
+    assert history.report() == "No alert triggered"
+
+    # flapping alerts: only the last 3 alerts are kept in memory
+    for i in range(10):
+        alert = Alert(100*i, 12., rule="flapping" if i % 2 else None)
+        history.record(alert)
+        alert.resolve(100*i + 50)
+        history.record(alert)
+    history.record(Alert(1000, 15.))
+
+    assert len(history) == 3 and history.nb_alerts == 11
+    assert [alert.start_time for alert in history] == [800, 900, 1000]
+    assert history.report().startswith("List of alerts (last 3 of 11):\n")
+    assert history.report().count("End of alert") == 2
+
+    # all the alerts are in the database
+    assert [(alert.start_time, alert.end_time) for alert in history.query(240, 420)] == \
+        [(200, 250), (300, 350), (400, 450)]
+    assert [alert.rule for alert in history.query(300, 400)] == ["flapping"]
+    assert history.query(2000)[0].end_time is None
+    state = history.get_state()
+    history.close()
+
+    # the history is restored from the database, the active alert of the previous run is closed
+    history = AlertHistory(db_path, max_recent=3)
+    assert history.nb_alerts == 11 and len(history.query()) == 11
+    assert [alert.start_time for alert in history] == [800, 900, 1000]
+    assert history[-1].end_time == 1000 and history.query(2000) == []
+
+    # unless it is restored from a checkpoint
+    history.set_state(state)
+    assert not history[-1].resolved and history.query(2000)[0].end_time is None
+    history.close()
+
+
+def test_alert_checkpoint(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    checkpoint_path = str(tmp_path / "checkpoint.bin")
+    create_test_csv(test_path)
+
+    def run_until(date):
+        console_app = ConsoleApp(test_path, avg_trafic_threshold=10, csv_start_date=0, speed=50,
+                                 checkpoint=checkpoint_path, checkpoint_interval=0)
+        console_app.start()
+        try:
+            deadline = time.time() + 30
+            while not (console_app.clock.is_started() and console_app.clock.now() >= date) \
+                    and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            console_app.stop()
+        return console_app
+
+    # stop during the alert, then resume from the checkpoint
+    first_app = run_until(100)
+    assert len(first_app.alert_history) == 1 and not first_app.alert_history[0].resolved
+    stop_date = first_app.traffic_monitor.last_date
+
+    second_app = run_until(150)
+    assert second_app.clock.start_date == stop_date
+    check_alerts(list(second_app.alert_history))
+    assert second_app.traffic_monitor.history.sum(0, 200) == 1200
 
 
 if __name__ == "__main__":
-    test_alert()
+    check_alerts(run_alert_scenario("data/test_csv.txt", speed=1, timeout=200))
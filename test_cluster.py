@@ -0,0 +1,141 @@
+import asyncio
+import pickle
+import time
+import multiprocessing
+import zlib
+
+from AlertRule import AlertRule
+from ClusterAggregator import ClusterAggregator
+from ConsoleApp import ConsoleApp
+from LogRecord import LogRecord, Request
+from SummaryExporter import MAX_SUMMARY_SIZE, SummaryExporter, decode_summary, encode_summary
+
+
+def create_node_csv(path, node, logs_per_second):
+    """
+    create the csv file of the logs of a node, from the date 20 to 79
+
+    Parameters
+    ----------
+    path : string
+        Path where to store the csv file containing the fake logs.
+    node : int
+        number of the node, in the remote hosts.
+    logs_per_second : int
+        Number of logs of each second.
+    """
+
+    with open(path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        for date in range(20, 80):
+            f.writelines(f'"10.0.{node}.{i}","-","apache",{date},"GET /api/user HTTP/1.0",500,1234\n'
+                         for i in range(logs_per_second))
+
+
+def run_node(path, address, node):
+    """
+    Replay the logs of a node as fast as possible and export its summaries.
+    """
+
+    app = ConsoleApp(path, avg_trafic_threshold=10, csv_start_date=0, speed=None, console=False,
+                     export_address=address, node_name=f"node{node}")
+    app.start()
+    deadline = time.time() + 30
+    while not app.replay_over() and time.time() < deadline:
+        time.sleep(0.05)
+    app.stop()
+
+
+def test_cluster_aggregator(tmp_path):
+    # 7 logs per second on each node are below the threshold, but not 21 on the cluster
+    rule = AlertRule("errors", 10, window=120, status=500)
+    aggregator = ClusterAggregator(avg_trafic_threshold=10, port=0, nb_nodes=3, max_lag=1000,
+                                   alert_rules=[rule])
+
+    # the nodes are new processes, that do not inherit the threads of the tests
+    context = multiprocessing.get_context("spawn")
+    nodes = []
+    for node in range(3):
+        path = str(tmp_path / f"node{node}.csv")
+        create_node_csv(path, node, 7)
+        nodes.append(context.Process(target=run_node, args=(path, f"127.0.0.1:{aggregator.port}", node)))
+    for process in nodes:
+        process.start()
+
+    alert_list = asyncio.run(asyncio.wait_for(aggregator.serve(render=False), 60))
+    for process in nodes:
+        process.join()
+
+    assert aggregator.nb_requests == 3*7*60
+    assert aggregator.nb_late_summaries == 0
+    assert sorted(str(alert.rule) for alert in alert_list) == ["None", "errors"]
+    assert all(alert.resolved for alert in alert_list)
+    assert "Nodes: 0 connected" in aggregator.report()
+
+
+def test_cluster_lag():
+    aggregator = ClusterAggregator(port=0, max_lag=5)
+    exporter = SummaryExporter("127.0.0.1:1", node="node")
+    request = Request("GET", "/api/user", "HTTP/1.0")
+    log = LogRecord("10.0.0.1", "-", "-", 0, request, 200, 1234)
+
+    # the second node is stuck at the date 1, the seconds more than 5 seconds
+    # before the most recent summary are analysed without waiting for it
+    fast, slow = aggregator.register_source(), aggregator.register_source()
+    aggregator.receive(slow, exporter.summarize(1, [log]))
+    for date in range(1, 11):
+        logs = [LogRecord("10.0.0.1", "-", "-", date - 1, request, 200, 1234)]*2
+        aggregator.receive(fast, exporter.summarize(date - 0.5, logs))
+    aggregator.close_periods(aggregator.now())
+    assert aggregator.next_total_requests_update == 6 and aggregator.nb_requests == 11
+
+    # a summary of a second already analysed is counted in the next one
+    aggregator.receive(slow, exporter.summarize(3, [log]))
+    assert aggregator.nb_late_summaries == 1
+    aggregator.receive(slow, exporter.summarize(10, [log]))
+    aggregator.close_periods(aggregator.now())
+    assert aggregator.next_total_requests_update == 11 and aggregator.nb_requests == 23
+    exporter.close()
+    aggregator.socket.close()
+
+
+def test_summary_encoding():
+    exporter = SummaryExporter("127.0.0.1:1", node="node")
+    request = Request("GET", "/api/user", "HTTP/1.0")
+    logs = [LogRecord(f"10.0.0.{i % 3}", "-", "-", 10, request, (200, 500)[i % 2], 1000 + i) for i in range(10)]
+    summary = exporter.summarize(10.5, logs)
+    exporter.close()
+
+    # the summary is sent as plain data and decoded to the same counters and sketches
+    decoded = decode_summary(encode_summary(summary)[4:])
+    assert (decoded["node"], decoded["date"], decoded["requests"]) == ("node", 11, summary["requests"])
+    assert decoded["partial"].to_stats() == summary["partial"].to_stats()
+    assert decoded["partial"].traffic == summary["partial"].traffic
+
+    # a pickle, a summary of wrong types and a compression bomb are rejected
+    for data in (zlib.compress(pickle.dumps(summary)),
+                 zlib.compress(b'{"version": 2, "node": "node", "date": 1, "partial": [], "requests": []}'),
+                 zlib.compress(b" "*(MAX_SUMMARY_SIZE + 1))):
+        try:
+            decode_summary(data)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_cluster_invalid_frame():
+    aggregator = ClusterAggregator(port=0)
+
+    async def scenario():
+        server = await asyncio.start_server(aggregator.read_node, sock=aggregator.socket)
+        reader, writer = await asyncio.open_connection("127.0.0.1", aggregator.port)
+
+        # a frame larger than the maximum size closes the connection without being read
+        writer.write((MAX_SUMMARY_SIZE + 1).to_bytes(4, "big"))
+        await writer.drain()
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        writer.close()
+        server.close()
+
+    asyncio.run(scenario())
+    assert aggregator.nb_invalid_frames == 1
@@ -0,0 +1,65 @@
+import time
+from threading import Thread
+
+from LogChannel import LogChannel
+
+
+def test_log_channel_drop():
+    channel = LogChannel(capacity=5)
+
+    # a full channel drops the batches that can not wait, and counts their logs
+    assert channel.publish([1, 2, 3], block=False)
+    assert not channel.publish([4, 5, 6], block=False)
+    assert channel.publish([4, 5], block=False)
+    assert (len(channel), channel.nb_published, channel.nb_dropped) == (5, 5, 3)
+
+    # a batch larger than the capacity still goes through an empty channel
+    assert channel.drain() == [[1, 2, 3], [4, 5]]
+    assert channel.publish(list(range(10)), block=False)
+    assert channel.get_batches() == [list(range(10))] and len(channel) == 10
+
+    # a full channel drops the batch after the timeout
+    assert not channel.publish([1], timeout=0.05)
+    assert channel.nb_dropped == 4
+
+
+def test_log_channel_back_pressure():
+    channel = LogChannel(capacity=10)
+    published = []
+
+    def produce():
+        for i in range(5):
+            published.append(channel.publish(list(range(i*5, i*5 + 5))))
+
+    producer = Thread(target=produce)
+    producer.start()
+
+    # the producer waits for the consumer, and no log is lost
+    logs = []
+    while producer.is_alive() or len(channel):
+        time.sleep(0.01)
+        assert len(channel) <= 10
+        logs.extend(log for batch in channel.drain() for log in batch)
+    producer.join()
+
+    assert logs == list(range(25))
+    assert all(published) and channel.nb_dropped == 0
+
+
+def test_log_channel_close():
+    channel = LogChannel(capacity=1)
+    channel.publish([0])
+    result = []
+
+    producer = Thread(target=lambda: result.append(channel.publish([1])))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive()
+
+    # closing the channel wakes up the blocked producer, its batch and the next ones are dropped
+    channel.close()
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert result == [False]
+    assert not channel.publish([2], block=False)
+    assert channel.nb_dropped == 2 and channel.drain() == [[0]]
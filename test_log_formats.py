@@ -0,0 +1,191 @@
+import gzip
+import io
+import pickle
+
+from bench_parser import convert_logs, format_log
+from BatchAnalyser import BatchAnalyser
+from BulkParser import BulkParser
+from ClfParser import ClfParser, parse_clf_date
+from DecompressionReader import DecompressionReader
+from JsonLinesParser import JsonLinesParser
+from log_analyse_fcts import compute_batch_stats, compute_stats
+from log_formats import detect_format, get_parser
+from LogGenerator import read_logs
+from LogRecord import LogRecord
+from test_stats import create_test_csv
+
+
+def test_clf_date():
+    assert parse_clf_date("10/Oct/2000:13:55:36 -0700") == 971211336
+    assert parse_clf_date("10/Oct/2000:20:55:36 +0000") == 971211336
+    for value in ("10/Oct/2000:13:55:36", "10/Foo/2000:13:55:36 -0700"):
+        try:
+            parse_clf_date(value)
+            assert False
+        except ValueError:
+            pass
+
+
+def test_log_records(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+
+    # the logs of the same request share their request line and strings
+    assert all(isinstance(log, LogRecord) for log in logs)
+    requests = {(log.request.method, log.request.route, log.request.protocol): log.request for log in logs}
+    assert all(log.request is requests[(log.request.method, log.request.route, log.request.protocol)]
+               for log in logs)
+    assert len({id(log.remotehost) for log in logs}) == len({log.remotehost for log in logs})
+
+    # the records are kept in the checkpoints
+    assert pickle.loads(pickle.dumps(logs)) == logs
+
+
+def test_log_formats(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+    expected = compute_stats(logs)
+
+    for name, log_format, compression in (("logs.log", "clf", None), ("logs.jsonl", "jsonl", None),
+                                          ("logs.csv.gz", "csv", "gzip"), ("logs.log.gz", "clf", "gzip"),
+                                          ("logs.jsonl.gz", "jsonl", "gzip")):
+        path = str(tmp_path / name)
+        convert_logs(test_path, path, log_format, compression)
+        assert detect_format(path) == log_format
+
+        # the same batches in every format, small blocks to cut the lines
+        parser = get_parser(path, block_size=500)
+        batches = list(parser)
+        batch = batches[0].empty_copy()
+        for other in batches:
+            batch.extend(other)
+        assert list(batch.dates) == [log.date for log in logs]
+        assert compute_batch_stats(batch) == expected
+        assert parser.nb_slow_blocks == 0
+
+        # the same logs for the log generator, from a date
+        assert list(read_logs(path)) == logs
+        assert list(read_logs(path, start_date=1010)) == [log for log in logs if log.date >= 1010]
+
+    # the format is detected from the first line when the extension is unknown
+    (tmp_path / "logs.log").rename(tmp_path / "access")
+    assert detect_format(str(tmp_path / "access")) == "clf"
+
+
+def test_log_formats_bad_lines(tmp_path):
+    path = str(tmp_path / "logs.log")
+    with open(path, "w") as f:
+        f.write('10.0.0.1 - - [10/Oct/2000:13:55:36 -0700] "GET /api/user HTTP/1.0" 200 2326\n')
+        f.write('not a log\n')
+        f.write('10.0.0.2 - bob [10/Oct/2000:13:55:37 -0700] "POST /help HTTP/1.1" 500 - "-" "curl"\n')
+
+    parser = ClfParser(path)
+    batch, = list(parser)
+    assert list(batch.dates) == [971211336, 971211337]
+    assert list(batch.bytes) == [2326, 0]
+    assert [batch.sections.value(i) for i in batch.section_ids] == ["api", "help"]
+    assert parser.nb_slow_blocks == 1 and parser.nb_bad_lines == 1
+
+    # the bad lines of a csv file are skipped too
+    path = str(tmp_path / "logs.csv")
+    with open(path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        f.write('"10.0.0.1","-","apache",1000,"GET /api/user HTTP/1.0",200,1234\n')
+        f.write('"10.0.0.1","-","apache",1000\n')
+    parser = BulkParser(path)
+    assert sum(len(batch) for batch in parser) == 1 and parser.nb_bad_lines == 1
+
+
+def test_json_null_values(tmp_path):
+    # the lines with null values are skipped and counted, the other lines are kept
+    path = str(tmp_path / "logs.jsonl")
+    with open(path, "w") as f:
+        f.write('{"remotehost": "10.0.0.1", "date": 1000, "request": "GET /api/user HTTP/1.0", '
+                '"status": 200, "bytes": 1234}\n')
+        f.write('{"remotehost": "10.0.0.1", "date": 1000, "request": null, "status": 200, "bytes": 1234}\n')
+        f.write('{"remotehost": "10.0.0.1", "date": 1001, "request": "GET /help HTTP/1.0", '
+                '"status": null, "bytes": 1234}\n')
+
+    parser = JsonLinesParser(path)
+    batch, = list(parser)
+    assert list(batch.dates) == [1000] and parser.nb_bad_lines == 2
+
+    parser = JsonLinesParser(path)
+    assert [log.date for log in parser.read_logs()] == [1000] and parser.nb_bad_lines == 2
+
+
+def test_incomplete_request_lines(tmp_path):
+    # a request line without protocol is a log, a request line without route is a bad line
+    path = str(tmp_path / "logs.csv")
+    with open(path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        f.write('"10.0.0.1","-","apache",1000,"GET /api/y",200,1234\n')
+        f.write('"10.0.0.1","-","apache",1001,"GET",200,1234\n')
+        f.write('"10.0.0.1","-","apache",1002,"GET /api/user HTTP/1.0",200,1234\n')
+
+    parser = BulkParser(path)
+    batch, = list(parser)
+    assert list(batch.dates) == [1000, 1002] and parser.nb_bad_lines == 1
+
+    parser = BulkParser(path)
+    logs = list(parser.read_logs())
+    assert [(log.request.route, log.request.protocol) for log in logs] == \
+        [("/api/y", "-"), ("/api/user", "HTTP/1.0")]
+    assert parser.nb_bad_lines == 1
+
+
+def test_decompression_reader(tmp_path):
+    path = str(tmp_path / "logs.gz")
+    data = b"".join(b"line %d\n" % i for i in range(10000))
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data))
+
+    # small chunks to decompress ahead of the reader
+    with DecompressionReader(path, chunk_size=1000, nb_chunks=2) as reader:
+        assert reader.readline() == b"line 0\n"
+        assert reader.read(7) == b"line 1\n"
+        assert reader.read() == data[14:]
+        assert reader.read(10) == b""
+    assert reader.nb_bytes == len(data) and reader.throughput() > 0
+
+    # a truncated file raises an error after its decompressed chunks
+    with open(path, "wb") as f:
+        f.write(gzip.compress(data)[:-100])
+    with DecompressionReader(path, chunk_size=1000) as reader:
+        try:
+            reader.read()
+            assert False
+        except EOFError:
+            pass
+
+
+def test_rotated_logs(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+
+    # rotated files, the oldest logs in the files with the greatest numbers
+    directory = tmp_path / "logs"
+    directory.mkdir()
+    for i, name in enumerate(("access.log.3.gz", "access.log.2.gz", "access.log.1", "access.log")):
+        data = "".join(format_log(log, "clf") for log in logs[i*75:(i + 1)*75]).encode()
+        (directory / name).write_bytes(gzip.compress(data) if name.endswith(".gz") else data)
+
+    # one continuous stream in the order of the dates
+    assert list(read_logs(str(directory))) == logs
+    parser = get_parser(str(directory))
+    assert [date for batch in parser for date in batch.dates] == [log.date for log in logs]
+    assert parser.nb_lines == 300 and parser.nb_decompressed_bytes > 0
+
+    # the files before the start date are not read
+    parser = get_parser(str(directory), start_date=1020)
+    assert [date for batch in parser for date in batch.dates] == \
+        [log.date for log in logs if log.date >= 1020]
+    assert parser.nb_decompressed_bytes == 0
+
+    output = io.StringIO()
+    BatchAnalyser(str(directory), output=output, nb_workers=2).run()
+    assert "Processed 300 logs" in output.getvalue()
+    assert "Decompressed" in output.getvalue()
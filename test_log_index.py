@@ -0,0 +1,62 @@
+from BulkParser import BulkParser
+from LogGenerator import read_logs
+from LogIndex import LogIndex, read_line_date
+from test_stats import create_test_csv
+
+
+def test_log_index(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    index = LogIndex(test_path, step=16)
+    assert (tmp_path / "test_csv.txt.idx").exists()
+
+    # the cached index is loaded instead of being rebuilt
+    cached_index = LogIndex(test_path, step=16)
+    assert cached_index.dates == index.dates
+    assert cached_index.offsets == index.offsets
+
+    logs = list(read_logs(test_path))
+    for date in (999, 1000, 1005, 1017, 1029, 1030):
+        # the reading starts before the first log of the date
+        first = next((i for i, log in enumerate(logs) if log.date >= date), len(logs))
+        read = list(read_logs(test_path, start_date=date))
+        assert len(read) >= len(logs) - first
+        assert read[len(read) - len(logs) + first:] == logs[first:]
+        assert all(log.date < date for log in read[:len(read) - len(logs) + first])
+
+
+def test_log_index_irregular_lines(tmp_path):
+    assert read_line_date(b'"10.0.0.1","-","apache",1000.5,"GET /api/user HTTP/1.0",200,1234', 3) == 1001
+    assert read_line_date(b'"10.0.0.1","a,b","apache",1000,"GET /api/user HTTP/1.0",200,1234', 3) == 1000
+    assert read_line_date(b'', 3) is None
+
+    # float dates, a quoted comma and blank lines
+    test_path = str(tmp_path / "test_csv.txt")
+    with open(test_path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        for i in range(100):
+            user = "a,b" if i % 7 == 0 else "apache"
+            f.write(f'"10.0.0.1","{user}","apache",{1000 + i//10}.0,"GET /api/user HTTP/1.0",200,1234\n')
+        f.write("\n")
+
+    index = LogIndex(test_path, step=16)
+    assert list(index.dates) == sorted(index.dates) and len(index.dates) == 6
+    logs = list(read_logs(test_path))
+    read = list(read_logs(test_path, start_date=1005))
+    assert read[len(read) - 50:] == logs[50:]
+
+
+def test_bulk_parser_range(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    logs = list(read_logs(test_path))
+    for start_date, end_date in ((None, 1010), (1005, None), (1012, 1021), (1020, 1020), (None, 10)):
+        parser = BulkParser(test_path, block_size=500, start_date=start_date, end_date=end_date)
+        batches = list(parser)
+        assert all(len(batch) for batch in batches)
+        dates = [date for batch in batches for date in batch.dates]
+        assert dates == [log.date for log in logs
+                         if (start_date is None or log.date >= start_date) and
+                         (end_date is None or log.date < end_date)]
@@ -0,0 +1,84 @@
+import socket
+import time
+
+from ConsoleApp import ConsoleApp
+from LogListener import LogListener, split_octet_counted_frames
+
+
+CLF_LINE = '10.0.0.{} - - [07/Feb/2019:21:11:{:02d} +0000] "GET /api/user HTTP/1.0" 200 1234'
+
+
+def wait_received(listener, nb_lines, timeout=5):
+    """
+    Wait until the listener received the given number of lines.
+    """
+
+    deadline = time.time() + timeout
+    while listener.nb_received < nb_lines and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_split_octet_counted_frames():
+    assert split_octet_counted_frames(b"5 <1>ab3 <2>12 <3>") == ([b"<1>ab", b"<2>"], b"12 <3>")
+    try:
+        split_octet_counted_frames(b"<1>not counted but long enough")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_log_listener():
+    listener = LogListener(udp_port=0, tcp_port=0)
+    listener.start()
+
+    try:
+        # syslog messages of RFC 3164 and RFC 5424 in datagrams, and an invalid one
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for message in ("<190>Feb  7 21:11:00 web-1 nginx: " + CLF_LINE.format(1, 0),
+                            "<190>1 2019-02-07T21:11:01Z web-2 httpd - - - " + CLF_LINE.format(2, 1) + "\n",
+                            "<190>Feb  7 21:11:02 web-1 nginx: not a log"):
+                sock.sendto(message.encode(), ("127.0.0.1", listener.udp_port))
+        wait_received(listener, 3)
+
+        # a stream of lines, with a line cut between two packets, and a stream framed by octet counting
+        with socket.create_connection(("127.0.0.1", listener.tcp_port)) as sock:
+            data = "".join(CLF_LINE.format(3, i) + "\n" for i in range(3, 6)).encode()
+            sock.sendall(data[:100])
+            time.sleep(0.1)
+            sock.sendall(data[100:])
+        with socket.create_connection(("127.0.0.1", listener.tcp_port)) as sock:
+            message = ("<190>" + CLF_LINE.format(4, 6)).encode()
+            sock.sendall(b"%d %s" % (len(message), message))
+        wait_received(listener, 7)
+
+        batches = listener.empty_buffer()
+        dates = sorted(date - 1549573860 for batch in batches for date in batch.dates)
+        assert dates == [0, 1, 3, 4, 5, 6]
+        assert {batch.hosts.value(host) for batch in batches for host in batch.host_ids} == \
+            {"10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"}
+        assert (listener.nb_received, listener.nb_parsed, listener.nb_invalid_lines) == (7, 6, 1)
+    finally:
+        listener.stop()
+        listener.join()
+
+
+def test_console_listener():
+    # the console analyses the logs received in real time
+    app = ConsoleApp(None, avg_trafic_threshold=10, listen_port=0, metrics_port=0, console=False)
+    app.start()
+
+    try:
+        now = time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime())
+        line = f'10.0.0.1 - - [{now}] "GET /api/user HTTP/1.0" 200 1234\n'
+        with socket.create_connection(("127.0.0.1", app.stream.tcp_port)) as sock:
+            sock.sendall(line.encode()*50)
+        wait_received(app.stream, 50)
+
+        deadline = time.time() + 5
+        while app.nb_requests < 50 and time.time() < deadline:
+            time.sleep(0.1)
+        assert app.nb_requests == 50
+        assert app.top_sections.total == 50
+        assert 'logmon_ingested_lines_total{state="parsed"} 50' in app.metrics.serialize("prometheus").decode()
+    finally:
+        app.stop()
@@ -0,0 +1,97 @@
+import os
+import time
+
+from LogTailer import LogTailer
+
+
+HEADER = '"remotehost","rfc931","authuser","date","request","status","bytes"\n'
+
+
+def log_line(date, route="/api/user"):
+    return f'"10.0.0.2","-","apache",{date},"GET {route} HTTP/1.0",200,1234\n'
+
+
+def wait_logs(tailer, nb_logs, timeout=5):
+    """
+    Wait until the tailer published the given number of logs and return them.
+    """
+
+    logs = []
+    deadline = time.time() + timeout
+    while len(logs) < nb_logs and time.time() < deadline:
+        logs.extend(tailer.empty_buffer())
+        time.sleep(0.01)
+    return logs
+
+
+def test_log_tailer(tmp_path):
+    path = str(tmp_path / "access_log.txt")
+    with open(path, "w") as f:
+        f.write(HEADER + log_line(1) + log_line(2))
+
+    tailer = LogTailer(path, from_start=True, max_poll_interval=0.05)
+    tailer.start()
+
+    try:
+        assert [log.date for log in wait_logs(tailer, 2)] == [1, 2]
+
+        # new lines, the incomplete line is only published once complete
+        with open(path, "a") as f:
+            f.write(log_line(3) + log_line(4)[:10])
+            f.flush()
+            assert [log.date for log in wait_logs(tailer, 1)] == [3]
+            f.write(log_line(4)[10:] + "not a log\n")
+        assert [log.date for log in wait_logs(tailer, 1)] == [4]
+
+        # rotation: the end of the old file is read before the new file
+        with open(path, "a") as f:
+            f.write(log_line(5))
+        os.rename(path, path + ".1")
+        with open(path, "w") as f:
+            f.write(HEADER + log_line(6))
+        assert [log.date for log in wait_logs(tailer, 2)] == [5, 6]
+
+        # truncation: the file is read again from its beginning
+        with open(path, "w") as f:
+            f.write(log_line(7, "/report"))
+        logs = wait_logs(tailer, 1)
+        assert [(log.date, log.request.route) for log in logs] == [(7, "/report")]
+
+    finally:
+        tailer.stop()
+        tailer.join()
+
+    assert tailer.nb_rotations == 1
+    assert tailer.nb_truncations == 1
+    assert tailer.nb_invalid_lines == 1
+
+
+def test_log_tailer_resume(tmp_path):
+    path = str(tmp_path / "access_log.txt")
+    with open(path, "w") as f:
+        f.write(HEADER + log_line(1) + log_line(2))
+
+    tailer = LogTailer(path, from_start=True, max_poll_interval=0.05)
+    tailer.start()
+    try:
+        logs = []
+        deadline = time.time() + 5
+        while len(logs) < 2 and time.time() < deadline:
+            batches, position = tailer.drain()
+            logs.extend(log for batch in batches for log in batch)
+            time.sleep(0.01)
+    finally:
+        tailer.stop()
+        tailer.join()
+    assert [log.date for log in logs] == [1, 2]
+
+    # the lines written while the tailer was stopped are read after a restart
+    with open(path, "a") as f:
+        f.write(log_line(3))
+    tailer = LogTailer(path, max_poll_interval=0.05, start_position=position)
+    tailer.start()
+    try:
+        assert [log.date for log in wait_logs(tailer, 1)] == [3]
+    finally:
+        tailer.stop()
+        tailer.join()
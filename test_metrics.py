@@ -0,0 +1,67 @@
+import json
+import time
+import urllib.error
+import urllib.request
+
+from ConsoleApp import ConsoleApp
+from MetricsServer import MetricsServer, prometheus_report
+from test_alert import create_test_csv
+
+
+def test_metrics_server():
+    metrics = MetricsServer(port=0)
+    metrics.start()
+    url = f"http://127.0.0.1:{metrics.port}"
+
+    try:
+        metrics.publish(traffic={"date": 100, "requests_total": 42, "average": 1.5,
+                                 "threshold": 10, "dropped_logs": 0},
+                        sections={'a"b': {"requests": 3, "distinct_hosts": 2, "status": {"200": 3},
+                                          "response_bytes": {"0.5": 1234.}}})
+
+        with urllib.request.urlopen(url + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            text = response.read().decode()
+        assert "# TYPE logmon_requests_total counter\nlogmon_requests_total 42\n" in text
+        assert 'logmon_traffic_average{window="2min"} 1.5' in text
+        assert 'logmon_section_response_bytes{section="a\\"b",quantile="0.5"} 1234.0' in text
+
+        with urllib.request.urlopen(url + "/metrics.json") as response:
+            assert json.load(response)["traffic"]["requests_total"] == 42
+
+        # the output is cached until the next publication
+        body = metrics.serialize("prometheus")
+        assert metrics.serialize("prometheus") is body
+        metrics.publish(alerts={"traffic_alert": True, "total": 1})
+        assert metrics.serialize("prometheus") is not body
+        assert 'logmon_alert_active{rule="traffic"} 1' in metrics.serialize("prometheus").decode()
+
+        try:
+            urllib.request.urlopen(url + "/other")
+            assert False
+        except urllib.error.HTTPError as error:
+            assert error.code == 404
+    finally:
+        metrics.stop()
+
+
+def test_console_metrics(tmp_path):
+    path = str(tmp_path / "test.csv")
+    create_test_csv(path)
+
+    # headless replay as fast as possible with the metrics endpoint
+    app = ConsoleApp(path, avg_trafic_threshold=10, csv_start_date=0, speed=None,
+                     metrics_port=0, console=False)
+    app.start()
+    deadline = time.time() + 30
+    while not app.replay_over() and time.time() < deadline:
+        time.sleep(0.1)
+    snapshot = app.metrics.snapshot()
+    text = app.metrics.serialize("prometheus").decode()
+    app.stop()
+
+    assert snapshot["traffic"]["requests_total"] == 1200
+    assert snapshot["alerts"]["total"] == 1 and not snapshot["alerts"]["traffic_alert"]
+    assert "sections" in snapshot and set(snapshot["history"]) == {"10min", "1h"}
+    assert "logmon_alerts_total 1" in text
+    assert prometheus_report({}) == "\n"
@@ -0,0 +1,360 @@
+import io
+import random
+from collections import Counter
+
+from BatchAnalyser import BatchAnalyser
+from BulkParser import BulkParser
+from log_analyse_fcts import compute_batch_stats, compute_stats, get_section_from_route, merge_sketches
+from LogBatch import LogBatch, read_log_batches
+from LogGenerator import read_logs
+from parallel_stats import compute_parallel_stats, split_file
+from DDSketch import DDSketch
+from HyperLogLog import HyperLogLog
+from SpaceSaving import SpaceSaving
+from StatsPartial import StatsPartial
+from TopSections import TopSections
+
+
+def create_test_csv(path):
+    """
+    create a dummy csv file with several sections, methods and status
+
+    Parameters
+    ----------
+    path : string
+        Path where to store the csv file containing the fake logs.
+    """
+
+    with open(path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+
+        for i in range(300):
+            section = ("user", "help", "report")[i % 3]
+            method = ("GET", "POST")[i % 2]
+            status = (200, 404, 500, 200)[i % 4]
+            f.write(f'"10.0.0.{i % 7}","-","apache",{1000 + i//10},'
+                    f'"{method} /{section}/page{i % 5} HTTP/1.0",{status},{1000 + i}\n')
+
+
+def test_batch_stats(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    logs = list(read_logs(test_path))
+    batches = list(read_log_batches(test_path, batch_size=128))
+
+    assert [len(batch) for batch in batches] == [128, 128, 44]
+
+    batch = batches[0].empty_copy()
+    for other in batches:
+        batch.extend(other)
+
+    assert compute_batch_stats(batch) == compute_stats(logs)
+    assert list(batch.dates) == [log.date for log in logs]
+    assert list(batch.bytes) == [log.bytes for log in logs]
+    assert len(batch.hosts) == 7
+
+
+def test_batch_from_logs(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    logs = list(read_logs(test_path))
+    batch = LogBatch()
+    for log in logs:
+        batch.append_log(log)
+
+    assert compute_batch_stats(batch) == compute_stats(logs)
+    assert batch.find_date(1010) == 100
+
+
+def test_bulk_parser(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    # a line with an escaped quote can only be parsed by the csv module
+    with open(test_path, "a") as f:
+        f.write('"""10.0.0.1""","-","apache",1030,"GET /api/help HTTP/1.0",200,10')
+
+    logs = list(read_logs(test_path))
+    parser = BulkParser(test_path, block_size=1000)
+    batches = list(parser)
+
+    assert parser.nb_lines == len(logs) == 301
+    assert parser.nb_slow_blocks == 1
+
+    batch = batches[0].empty_copy()
+    for other in batches:
+        batch.extend(other)
+
+    assert compute_batch_stats(batch) == compute_stats(logs)
+    assert list(batch.dates) == [log.date for log in logs]
+    assert list(batch.bytes) == [log.bytes for log in logs]
+    assert [batch.hosts.value(i) for i in batch.host_ids] == [log.remotehost for log in logs]
+
+
+def test_read_log_batches_irregular_lines(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    # a request line without protocol is a log, a line with a missing value is skipped
+    with open(test_path, "a") as f:
+        f.write('"10.0.0.1","-","apache",1030,"GET /api/help",200,10\n')
+        f.write('"10.0.0.1","-","apache",1030,"GET",200,10\n')
+        f.write('"10.0.0.1","-","apache",1030,200,10\n')
+
+    batches = list(read_log_batches(test_path, batch_size=128))
+    parser = BulkParser(test_path)
+    bulk_batches = list(parser)
+    assert parser.nb_bad_lines == 2
+    assert sum(len(batch) for batch in batches) == sum(len(batch) for batch in bulk_batches) == 301
+    assert [date for batch in batches for date in batch.dates] == \
+        [date for batch in bulk_batches for date in batch.dates]
+
+
+def test_batch_value_ranges(tmp_path):
+    # more than 256 distinct methods, and a status that does not fit in 2 bytes
+    test_path = str(tmp_path / "test_csv.txt")
+    with open(test_path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        for i in range(300):
+            f.write(f'"10.0.0.1","-","apache",1000,"M{i} /api/user HTTP/1.0",200,1234\n')
+        f.write('"10.0.0.1","-","apache",1001,"GET /api/user HTTP/1.0",70000,1234\n')
+
+    parser = BulkParser(test_path)
+    batch, = list(parser)
+    assert len(batch) == 300 and len(set(batch.method_ids)) == 300
+    assert batch.methods.value(batch.method_ids[-1]) == "M299"
+    assert parser.nb_bad_lines == 1
+
+    # an invalid log leaves the batch unchanged
+    try:
+        batch.append("10.0.0.1", 1001, "GET", "/api/user", 70000, 1234)
+        assert False
+    except ValueError:
+        pass
+    assert len(batch.dates) == len(batch.status) == len(batch.bytes) == len(batch.method_ids) == 300
+
+    # the stats of the batch keep the methods apart
+    logs = [log for log in read_logs(test_path) if log.status == 200]
+    assert compute_batch_stats(batch) == compute_stats(logs)
+    assert StatsPartial().add_batch(batch).to_stats() == compute_stats(logs)
+    top_sections = TopSections("exact", nb_sections=3)
+    top_sections.add_batch(batch)
+    assert top_sections.stats["api"]["count_methods"]["M299"] == 1
+
+
+def test_dynamic_stats(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    # sections, methods and status that are not in the dummy csv
+    with open(test_path, "a") as f:
+        for i in range(1000):
+            f.write(f'"10.0.0.1","-","apache",1030,"PUT /s{i % 100}/x HTTP/1.0",{300 + i % 20},10\n')
+
+    logs = list(read_logs(test_path))
+    batch = LogBatch()
+    for other in BulkParser(test_path).read_batches(batch):
+        batch.extend(other)
+
+    total, stats = compute_stats(logs)
+    assert compute_batch_stats(batch) == (total, stats)
+    assert total == 1300
+    assert len(stats) == 103
+    assert stats["s7"]["nb_requests"] == 10
+    assert stats["s7"]["count_status"] == {"307": 10}
+    assert stats["s7"]["count_methods"] == {"PUT": 10}
+    assert stats["s7"]["distinct_hosts"].count() == 1
+    assert stats["user"]["count_status"] == {"200": 50, "404": 25, "500": 25}
+
+    assert get_section_from_route("/api/user/1") == "api"
+    assert get_section_from_route("/report?page=2") == "report"
+    assert get_section_from_route("http://my.site.com/pages/create") == "pages"
+    assert get_section_from_route("/") == "/"
+
+
+def test_parallel_stats(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    logs = list(read_logs(test_path))
+
+    ranges = split_file(test_path, 4)
+    assert len(ranges) == 4
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+    partial = compute_parallel_stats(test_path, nb_workers=4)[0]
+
+    assert partial.to_stats() == compute_stats(logs)
+    assert partial.traffic == Counter(log.date for log in logs)
+    assert sum(partial.bytes.values()) == sum(log.bytes for log in logs)
+
+    # merging the partials of two halves gives the stats of the whole list
+    merged = StatsPartial().add_logs(logs[:150]).merge(StatsPartial().add_logs(logs[150:]))
+    assert merged.to_stats() == compute_stats(logs)
+    assert merged.bytes == partial.bytes
+
+
+def test_parallel_batch_analyser(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    reports = []
+    for nb_workers in (1, 3):
+        output = io.StringIO()
+        analyser = BatchAnalyser(test_path, avg_trafic_threshold=2, output=output,
+                                 nb_workers=nb_workers)
+        alert_list = analyser.run()
+        reports.append(output.getvalue().splitlines()[:-1])
+        assert analyser.nb_rows == 300
+        assert len(alert_list) == 1
+
+    assert reports[0] == reports[1]
+
+
+def test_batch_analyser_empty_range(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+
+    # no log in the range, before or after the logs of the file
+    for options in ({"csv_end_date": 10}, {"csv_start_date": 2000}):
+        for nb_workers in (1, 2):
+            output = io.StringIO()
+            analyser = BatchAnalyser(test_path, output=output, nb_workers=nb_workers, **options)
+            assert analyser.run() == []
+            assert analyser.nb_rows == 0
+            assert output.getvalue().startswith("Processed 0 logs")
+
+
+def test_parallel_batch_analyser_unsorted(tmp_path):
+    # dates only roughly sorted (+/- 2 s), some logs are dated before the first log
+    test_path = str(tmp_path / "test_csv.txt")
+    rng = random.Random(0)
+    with open(test_path, "w") as f:
+        f.write('"remotehost","rfc931","authuser","date","request","status","bytes"\n')
+        f.write('"10.0.0.1","-","apache",20,"GET /api/user HTTP/1.0",200,1234\n')
+        for i in range(20, 80):
+            f.writelines(f'"10.0.0.1","-","apache",{i + rng.randint(-2, 2)},"GET /api/user HTTP/1.0",200,1234\n'
+                         for _ in range(20))
+
+    alerts = []
+    for nb_workers in (1, 2):
+        output = io.StringIO()
+        analyser = BatchAnalyser(test_path, avg_trafic_threshold=10, output=output, nb_workers=nb_workers)
+        alerts.append(analyser.run())
+
+        # no log is lost, even before the first log
+        assert analyser.nb_rows == 1201
+        assert sum(int(line.split("requests: ")[1].split(",")[0])
+                   for line in output.getvalue().splitlines() if "requests: " in line) == 1201
+
+    # the alerts only move by the delay of the late logs
+    assert len(alerts[0]) == len(alerts[1]) == 1
+    assert abs(alerts[0][0].start_time - alerts[1][0].start_time) <= 2
+    assert abs(alerts[0][0].end_time - alerts[1][0].end_time) <= 2
+
+
+def test_top_sections(tmp_path):
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+
+    # the exact mode gives the stats of compute_stats for the top sections
+    top_sections = TopSections("exact", nb_sections=3)
+    top_sections.add_logs(logs[:100])
+    top_sections.add_logs(logs[100:])
+    total, stats = compute_stats(logs)
+    assert top_sections.result() == (total, stats)
+
+    batch = LogBatch()
+    for other in BulkParser(test_path).read_batches(batch):
+        top_sections.reset()
+        top_sections.add_batch(other)
+        assert top_sections.result() == (total, stats)
+
+    # the sketch mode finds the heavy hitters among many sections with a bounded memory
+    requests = ["a"]*500 + ["b"]*300 + ["c"]*200 + [f"s{i}" for i in range(2000)]
+    requests.sort(key=hash)
+    top_sections = TopSections("sketch", nb_sections=3, capacity=100)
+    for section in requests:
+        top_sections.add(section, 200, "GET")
+
+    total, stats = top_sections.result()
+    assert total == 3000
+    assert list(stats) == ["a", "b", "c"]
+    for section, count in (("a", 500), ("b", 300), ("c", 200)):
+        assert count <= stats[section]["nb_requests"] <= count + 3000/100
+    assert len(top_sections.stats) == 100
+
+
+def test_space_saving():
+    sketch = SpaceSaving(capacity=10)
+    for i in range(1000):
+        sketch.add(i % 100 if i % 2 else "heavy")
+
+    assert len(sketch) == 10
+    assert sketch.top(1)[0][0] == "heavy"
+    assert sketch.counts["heavy"] - sketch.errors["heavy"] <= 500 <= sketch.counts["heavy"]
+    assert sketch.max_error() == 100
+
+
+def test_hyperloglog(tmp_path):
+    first, second = HyperLogLog(precision=10), HyperLogLog(precision=10)
+    for i in range(20000):
+        first.add(f"10.0.{i // 256}.{i % 256}")
+        second.add(f"10.1.{i // 256}.{i % 256}")
+        first.add(f"10.0.{i // 256}.{i % 256}")
+
+    # the relative error is about 1.04/sqrt(1024) = 3.25%
+    assert abs(first.count() - 20000) < 0.1*20000
+    assert abs(first.copy().merge(second).count() - 40000) < 0.1*40000
+
+    small = HyperLogLog()
+    for host in ("a", "b", "c", "a"):
+        small.add(host)
+    assert small.count() == 3
+
+    # the distinct counters of the sections can be merged over several windows
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+    windows = [compute_stats(logs[:150])[1], compute_stats(logs[150:])[1]]
+    _, stats = compute_stats(logs)
+    merged = merge_sketches(windows, stats)
+    assert merged["user"]["distinct_hosts"] == stats["user"]["distinct_hosts"]
+    assert merged["user"]["distinct_hosts"].count() == 7
+    assert merged["user"]["distinct_users"].count() == 1
+
+
+def test_ddsketch(tmp_path):
+    first, second = DDSketch(0.01), DDSketch(0.01)
+    for i in range(1, 10001):
+        first.add(i)
+        second.add(10000 + i)
+
+    # the quantiles are within the relative accuracy
+    for q in (0.5, 0.95, 0.99):
+        expected = q*9999 + 1
+        assert abs(first.quantile(q) - expected) <= 0.01*expected + 1
+    merged = first.copy().merge(second)
+    assert merged.count == 20000
+    assert abs(merged.quantile(0.5) - 10000) <= 0.01*10000 + 1
+
+    # the number of buckets is bounded, only the lowest quantiles lose accuracy
+    small = DDSketch(0.01, max_buckets=64)
+    for i in range(1, 10001):
+        small.add(i)
+    assert len(small.buckets) <= 64
+    assert abs(small.quantile(0.99) - 9900) <= 0.01*9900 + 1
+
+    # the response sizes of the sections can be merged over several windows
+    test_path = str(tmp_path / "test_csv.txt")
+    create_test_csv(test_path)
+    logs = list(read_logs(test_path))
+    windows = [compute_stats(logs[:150])[1], compute_stats(logs[150:])[1]]
+    _, stats = compute_stats(logs)
+    merged = merge_sketches(windows, stats)
+    assert merged["help"]["response_bytes"] == stats["help"]["response_bytes"]
+    assert stats["help"]["response_bytes"].count == 100
+    assert stats["help"]["response_bytes"].sum == sum(1000 + i for i in range(1, 300, 3))
@@ -0,0 +1,51 @@
+from io import StringIO
+
+from log_analyse_fcts import traffic_curve_report
+from TerminalRenderer import TerminalRenderer
+from TrafficMonitor import TrafficMonitor
+
+
+def test_terminal_renderer():
+    output = StringIO()
+    renderer = TerminalRenderer(output, width=80)
+
+    # the first render clears the screen and draws every line
+    renderer.update("header", "Title\n\n")
+    renderer.update("traffic", "avg 1.00 req/s\n10min: 1.00 req/s\n")
+    assert renderer.render() == 4
+    assert output.getvalue().startswith("\033[?25l\033[H\033[2J")
+
+    # an unchanged section is not split again and nothing is drawn
+    assert not renderer.update("header", "Title\n\n")
+    output.truncate(0)
+    output.seek(0)
+    assert renderer.render() == 0 and output.getvalue() == ""
+
+    # only the changed line is redrawn, at its position
+    renderer.update("traffic", "avg 2.00 req/s\n10min: 1.00 req/s\n")
+    assert renderer.render() == 1
+    assert output.getvalue() == "\033[3;1Havg 2.00 req/s\033[K"
+
+    # a shorter screen erases the end of the previous one, long lines are cut
+    output.truncate(0)
+    output.seek(0)
+    renderer.update("traffic", "x"*100)
+    assert renderer.render() == 1
+    assert output.getvalue() == "\033[3;1H" + "x"*80 + "\033[K\033[4;1H\033[J"
+
+
+def test_traffic_curve():
+    monitor = TrafficMonitor(avg_trafic_threshold=10)
+    assert traffic_curve_report(monitor.history_curve(), 10) == ""
+
+    # 20 requests per second during the last 5 minutes
+    for date in range(1000, 1600):
+        monitor.update(20 if date >= 1300 else 0, date)
+    rates = monitor.history_curve(duration=600, width=60)
+    assert len(rates) == 60
+    assert rates[:30] == [0]*30 and rates[30:] == [20]*30
+
+    lines = traffic_curve_report(rates, 10, duration=600, height=4).split("\n")
+    assert lines[0] == "Total traffic over the last 10min (req/s):"
+    assert lines[1] == "     20.0 |" + " "*30 + "█"*30
+    assert lines[3] == "     10.0 |" + "-"*30 + "█"*30 + " threshold 10 req/s"
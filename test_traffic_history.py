@@ -0,0 +1,53 @@
+from RingSeries import RingSeries
+from TrafficHistory import TrafficHistory
+from TrafficMonitor import TrafficMonitor
+
+
+def test_ring_series():
+    series = RingSeries(step=10, length=6)
+    assert series.nbytes == 48 and series.span == 60
+
+    for date in range(1000, 1060):
+        series.add(date, 1)
+    assert series.get(1005) == 10
+    assert series.sum(1000, 1060) == 60
+    assert series.range(1020, 1040) == [(1020, 10), (1030, 10)]
+
+    # the oldest slots are overwritten, a gap clears the skipped slots
+    series.add(1075, 3)
+    assert series.get(1000) == 0 and series.get(1010) == 0
+    assert series.get(1060) == 0 and series.get(1070) == 3
+    assert series.sum(0, 2000) == 40 + 3
+    assert not series.add(1000, 1)
+
+    # a gap longer than the series clears everything
+    series.add(5000, 2)
+    assert series.sum(0, 10000) == 2
+
+
+def test_traffic_history():
+    history = TrafficHistory(((1, 60), (10, 60), (60, 60)))
+    assert history.nbytes == 3*60*8
+
+    # 2 requests per second during 30 minutes
+    for date in range(0, 1800):
+        history.add(date, 2)
+
+    assert history.get(1799) == 2 and history.get(1000) == 0
+    assert history.average(1800, 60) == 2
+    # the 10s resolution is used for the last 10 minutes, the 1 minute one for 30 minutes
+    assert history.range(1500, 1800)[0] == 10
+    assert history.average(1800, 600) == 2
+    assert history.level(0).step == 60
+    assert history.sum(0, 1800) == 3600
+
+
+def test_traffic_monitor_history():
+    monitor = TrafficMonitor(avg_trafic_threshold=10, window_size=120)
+    for date in range(0, 400):
+        monitor.update(20 if 20 <= date < 80 else 0, date)
+
+    # 20 req/s during 60 seconds give 10 req/s over 2 minutes until 2 minutes later
+    assert [(alert.start_time, alert.end_time) for alert in monitor.alert_history] == [(79, 140)]
+    assert monitor.total_traffic == 0
+    assert monitor.history_averages() == {"10min": 1200/600, "1h": 1200/3600}
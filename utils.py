@@ -1,5 +1,20 @@
+import gzip
 import time
 
+# zstd is optional, only needed to read the .zst files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Header of the csv files of logs
+LOG_HEADER = ('remotehost', 'rfc931', 'authuser', 'date', 'request', 'status', 'bytes')
+
+# Compression of the log files by extension
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+
 def format_time(nb_sec):
     """
     Function to format a number of seconds into a string
@@ -16,4 +31,53 @@ def format_time(nb_sec):
     """
 
     time_string = time.strftime("%m/%d/%Y, %H:%M:%S", time.localtime(nb_sec))
-    return f"{time_string}.{int((nb_sec-int(nb_sec))*100):02d}"
\ No newline at end of file
+    return f"{time_string}.{int((nb_sec-int(nb_sec))*100):02d}"
+
+
+def get_compression(path):
+    """
+    Function that returns the compression of a log file from its extension.
+
+    Parameters
+    ----------
+    path : str
+        path to the log file.
+
+    Returns
+    -------
+    compression : str or None
+        "gzip", "zstd" or None if the file is not compressed.
+    """
+
+    for extension, compression in COMPRESSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def open_log_file(path):
+    """
+    Function that opens a log file in binary mode, decompressing it on the fly if needed.
+
+    Parameters
+    ----------
+    path : str
+        path to the log file.
+
+    Returns
+    -------
+    f : file object
+        the (decompressed) content of the file.
+    """
+
+    compression = get_compression(path)
+
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("The zstandard package is needed to read the .zst files")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True, closefd=True)
+
+    return open(path, "rb")